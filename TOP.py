@@ -651,3 +651,4 @@ common.display_special_thanks()
 
 # メインコンテナ終了
 st.html('</div>')
+common.display_startup_report()
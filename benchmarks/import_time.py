@@ -0,0 +1,265 @@
+"""起動時間（import と初回描画）のベンチマーク
+
+common と pages/*.py をそれぞれ新しいインタプリタで実行し、
+``-X importtime`` の内訳と実行時間を JSON に記録する。Streamlit は
+何も描画しないスタブに差し替えるため、ウィジェットはすべて未入力
+（データ未選択）の初回表示に相当する。
+
+使い方（リポジトリのルートで実行）::
+
+    python benchmarks/import_time.py                       # 計測して JSON を保存
+    python benchmarks/import_time.py --repeat 5            # 5回計測して最小値を採用
+    python benchmarks/import_time.py --compare base.json   # 比較して悪化があれば終了コード 1
+
+比較では、実行時間が閾値（既定: 20% かつ 50 ms）を超えて悪化したページと、
+新たに読み込まれるようになった重いライブラリを報告する。
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 読み込まれた場合に報告する重いライブラリ
+HEAVY_MODULES = (
+    'matplotlib', 'japanize_matplotlib', 'seaborn', 'scipy.stats', 'statsmodels',
+    'pingouin', 'sklearn', 'factor_analyzer', 'nlplot', 'networkx', 'wordcloud',
+    'plotly.express', 'plotly.figure_factory', 'janome', 'requests',
+)
+
+# 新しいインタプリタで実行するスクリプト（Streamlit をスタブに差し替えてページを実行）
+BOOTSTRAP = r'''
+import os, runpy, sys, time, types
+
+# ウィジェットは未操作のときの値を返す
+_WIDGETS = {
+    'file_uploader': lambda args, kwargs: None,
+    'checkbox': lambda args, kwargs: kwargs.get('value', False),
+    'toggle': lambda args, kwargs: kwargs.get('value', False),
+    'button': lambda args, kwargs: False,
+    'download_button': lambda args, kwargs: False,
+    'selectbox': lambda args, kwargs: None,
+    'radio': lambda args, kwargs: None,
+    'multiselect': lambda args, kwargs: list(kwargs.get('default') or []),
+    'text_input': lambda args, kwargs: kwargs.get('value', ''),
+    'text_area': lambda args, kwargs: kwargs.get('value', ''),
+    'number_input': lambda args, kwargs: kwargs.get('value', 0),
+    'slider': lambda args, kwargs: kwargs.get('value', kwargs.get('min_value', 0)),
+}
+
+def _widget(name):
+    return lambda *args, **kwargs: _WIDGETS[name](args, kwargs)
+
+class _Stub:
+    """あらゆる呼び出し・属性アクセスに応じる何もしないオブジェクト"""
+    def __init__(self, *args, **kwargs):
+        pass
+    def __call__(self, *args, **kwargs):
+        # デコレータ（@st.cache_data など）は関数をそのまま返す
+        if len(args) == 1 and not kwargs and callable(args[0]) and not isinstance(args[0], _Stub):
+            return args[0]
+        return _Stub()
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name in _WIDGETS:
+            return _widget(name)
+        if name in ('columns', 'tabs'):
+            return _split
+        return _Stub()
+    def __getitem__(self, key):
+        return _Stub()
+    def __bool__(self):
+        return False
+    def __len__(self):
+        return 0
+    def __iter__(self):
+        return iter(())
+    def __str__(self):
+        return ''
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        return False
+
+class _SessionState(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+    def __setattr__(self, name, value):
+        self[name] = value
+
+def _split(spec, *args, **kwargs):
+    n = spec if isinstance(spec, int) else len(spec)
+    return [_Stub() for _ in range(n)]
+
+class _Streamlit(types.ModuleType):
+    __getattr__ = _Stub.__getattr__
+
+st = _Streamlit('streamlit')
+st.session_state = _SessionState()
+st.sidebar = _Stub()
+sys.modules['streamlit'] = st
+
+target = sys.argv[1]
+sys.argv = [target]
+sys.path.insert(0, os.getcwd())
+start = time.perf_counter()
+if target == 'common':
+    import common  # noqa: F401
+else:
+    runpy.run_path(target, run_name='__main__')
+elapsed = time.perf_counter() - start
+sys.stderr.write(f'@@wall {elapsed}\n')
+'''
+
+
+def list_targets() -> List[str]:
+    """計測対象（common、TOP.py、pages/*.py）"""
+    pages = sorted(os.path.relpath(p, ROOT) for p in glob.glob(os.path.join(ROOT, 'pages', '*.py')))
+    return ['common', 'TOP.py'] + pages
+
+
+def parse_importtime(stderr: str) -> Dict[str, Dict[str, float]]:
+    """-X importtime の出力を {モジュール: {self, cumulative（秒）, depth}} に変換"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        head, cumulative_us, raw_name = line.split('|', 2)
+        self_us = head.split(':', 1)[1]
+        # 名前の字下げ（2文字ごと）が import の入れ子の深さ
+        depth = (len(raw_name) - len(raw_name.lstrip(' ')) - 1) // 2
+        modules[raw_name.strip()] = {
+            'self': int(self_us) / 1e6,
+            'cumulative': int(cumulative_us) / 1e6,
+            'depth': depth,
+        }
+    return modules
+
+
+def measure(target: str) -> Dict:
+    """新しいインタプリタで1回計測"""
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='1')
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOTSTRAP, target],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    process_seconds = time.perf_counter() - start
+    wall = None
+    for line in proc.stderr.splitlines():
+        if line.startswith('@@wall '):
+            wall = float(line.split()[1])
+    modules = parse_importtime(proc.stderr)
+    top_level = sorted(
+        ((name, info['cumulative']) for name, info in modules.items() if info['depth'] == 0),
+        key=lambda item: item[1], reverse=True,
+    )
+    return {
+        'ok': proc.returncode == 0 and wall is not None,
+        'error': proc.stderr.strip().splitlines()[-1] if proc.returncode != 0 and proc.stderr.strip() else None,
+        'wall_seconds': wall,
+        'process_seconds': process_seconds,
+        'import_seconds': sum(info['self'] for info in modules.values()),
+        'module_count': len(modules),
+        'heavy_modules': sorted(
+            name for name in HEAVY_MODULES
+            if name in modules
+        ),
+        'top_imports': [{'module': name, 'cumulative_seconds': seconds} for name, seconds in top_level[:15]],
+    }
+
+
+def run(targets: List[str], repeat: int) -> Dict:
+    """各対象を repeat 回計測し、実行時間が最小の回を採用"""
+    results = {}
+    for target in targets:
+        runs = [measure(target) for _ in range(repeat)]
+        ok_runs = [r for r in runs if r['ok']]
+        best = min(ok_runs, key=lambda r: r['wall_seconds']) if ok_runs else runs[-1]
+        best['repeat'] = repeat
+        results[target] = best
+        status = f"{best['wall_seconds']:.3f} s" if best['ok'] else f"ERROR: {best['error']}"
+        print(f"{target:45s} {status}", file=sys.stderr)
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(base: Dict, current: Dict, ratio: float, min_seconds: float) -> List[str]:
+    """悪化した項目（実行時間・新たな重いライブラリ）の一覧"""
+    regressions = []
+    for target, now in current['results'].items():
+        before = base['results'].get(target)
+        if not before or not before.get('ok') or not now.get('ok'):
+            continue
+        delta = now['wall_seconds'] - before['wall_seconds']
+        line = (f"{target:45s} {before['wall_seconds']:.3f} s -> {now['wall_seconds']:.3f} s "
+                f"({delta * 1000:+.0f} ms)")
+        print(line)
+        if delta > min_seconds and now['wall_seconds'] > before['wall_seconds'] * (1 + ratio):
+            regressions.append(f"{target}: {delta * 1000:+.0f} ms")
+        added = sorted(set(now['heavy_modules']) - set(before['heavy_modules']))
+        if added:
+            regressions.append(f"{target}: 新たに読み込まれるライブラリ {', '.join(added)}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='common と各ページの起動時間を計測')
+    parser.add_argument('targets', nargs='*', help='計測対象（既定: common, TOP.py, pages/*.py）')
+    parser.add_argument('--repeat', type=int, default=3, help='計測回数（最小値を採用）')
+    parser.add_argument('--output', help='結果の保存先（既定: benchmarks/results/import_time_<revision>.json）')
+    parser.add_argument('--compare', metavar='BASE_JSON', help='比較対象の結果ファイル')
+    parser.add_argument('--max-ratio', type=float, default=0.2, help='許容する悪化率')
+    parser.add_argument('--min-delta', type=float, default=0.05, help='許容する悪化量（秒）')
+    args = parser.parse_args(argv)
+
+    revision = git_revision()
+    current = {
+        'revision': revision,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': run(args.targets or list_targets(), args.repeat),
+    }
+
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', f"import_time_{revision or 'working'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(current, f, ensure_ascii=False, indent=2)
+    print(f"結果を保存しました: {output}", file=sys.stderr)
+
+    failed = [target for target, result in current['results'].items() if not result['ok']]
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            base = json.load(f)
+        regressions = compare(base, current, args.max_ratio, args.min_delta)
+        if regressions:
+            print('\n悪化を検出しました:')
+            for line in regressions:
+                print(f'  - {line}')
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""二要因混合分散分析の一致性と速度のベンチマーク（engine と pingouin の比較）
+
+乱数で作ったワイド形式のデータ（1行1被験者）について、engine.mixed_anova で
+全変数の組をまとめて計算した結果と、組ごとにロング形式へ変換して
+pingouin.mixed_anova を呼んだ結果を比べる。
+
+使い方（リポジトリのルートで実行）::
+
+    python benchmarks/mixed_anova.py                         # 既定の条件で比較
+    python benchmarks/mixed_anova.py --subjects 5000 --sets 50 --levels 3
+
+結果が許容誤差を超えて一致しない場合は終了コード 1 を返す。
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from easystat import engine  # noqa: E402
+
+# 比較する列（pingouin と共通の数値列）
+COMPARED_COLUMNS = ('SS', 'DF1', 'DF2', 'MS', 'F', 'p-unc', 'np2', 'eps')
+
+
+def make_data(subjects: int, sets: int, levels: int, groups: int, missing: float,
+              seed: int) -> Tuple[pd.DataFrame, List[List[str]]]:
+    """群の効果・水準の効果・被験者の個人差を含むワイド形式のデータ"""
+    rng = np.random.default_rng(seed)
+    group = rng.integers(groups, size=subjects)
+    df = pd.DataFrame({
+        'ID': np.arange(subjects),
+        '群': np.array([f'群{g + 1}' for g in range(groups)], dtype=object)[group],
+    })
+    within_sets = []
+    for s in range(sets):
+        person = rng.normal(size=subjects)
+        cols = [f'変数{s + 1}_{level + 1}' for level in range(levels)]
+        for level, col in enumerate(cols):
+            values = person + 0.2 * group + 0.1 * level * (group == 0) + rng.normal(size=subjects)
+            values[rng.random(subjects) < missing] = np.nan
+            df[col] = values
+        within_sets.append(cols)
+    return df, within_sets
+
+
+def run_engine(df: pd.DataFrame, within_sets: List[List[str]]) -> List[pd.DataFrame]:
+    return engine.mixed_anova(df, '群', within_sets)
+
+
+def run_pingouin(df: pd.DataFrame, within_sets: List[List[str]]) -> List[pd.DataFrame]:
+    import pingouin as pg
+
+    tables = []
+    for cols in within_sets:
+        df_long = engine.wide_to_long(df, 'ID', '群', cols, cols)
+        # pingouin は欠損値を含む被験者を除外して計算する
+        tables.append(pg.mixed_anova(dv='value', within='Time', between='群', subject='ID', data=df_long))
+    return tables
+
+
+def best_time(func, repeat: int):
+    """repeat 回実行して最短の時間と最後の結果を返す"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def max_difference(ours: List[pd.DataFrame], theirs: List[pd.DataFrame]) -> float:
+    """共通の列について、相対誤差（値が小さい場合は絶対誤差）の最大値"""
+    worst = 0.0
+    for a, b in zip(ours, theirs):
+        for col in COMPARED_COLUMNS:
+            if col not in b.columns:
+                continue
+            x = a[col].to_numpy(dtype=np.float64)
+            y = b[col].to_numpy(dtype=np.float64)
+            if not np.array_equal(np.isnan(x), np.isnan(y)):
+                return float('inf')
+            both = ~np.isnan(x)
+            diff = np.abs(x[both] - y[both]) / np.maximum(np.abs(y[both]), 1.0)
+            worst = max(worst, float(diff.max(initial=0.0)))
+    return worst
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='混合分散分析の engine と pingouin を比較')
+    parser.add_argument('--subjects', type=int, default=2000, help='被験者数')
+    parser.add_argument('--sets', type=int, default=20, help='変数の組の数（従属変数の数）')
+    parser.add_argument('--levels', type=int, default=2, help='被験者内因子の水準数')
+    parser.add_argument('--groups', type=int, default=3, help='被験者間因子の群数')
+    parser.add_argument('--missing', type=float, default=0.01, help='欠損値の割合')
+    parser.add_argument('--repeat', type=int, default=3, help='計測回数（最短を採用）')
+    parser.add_argument('--seed', type=int, default=0, help='乱数の種')
+    parser.add_argument('--tol', type=float, default=1e-8, help='許容する相対誤差')
+    args = parser.parse_args(argv)
+
+    df, within_sets = make_data(args.subjects, args.sets, args.levels, args.groups, args.missing, args.seed)
+    print(f"被験者 {args.subjects} 人 × 変数の組 {args.sets} × 水準 {args.levels}（群 {args.groups}）")
+
+    # ライブラリの読み込み時間を計測に含めないよう、先に1組だけ実行しておく
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        run_engine(df, within_sets[:1])
+        run_pingouin(df, within_sets[:1])
+
+    engine_seconds, ours = best_time(lambda: run_engine(df, within_sets), args.repeat)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        pingouin_seconds, theirs = best_time(lambda: run_pingouin(df, within_sets), args.repeat)
+
+    difference = max_difference(ours, theirs)
+    print(f"engine   : {engine_seconds * 1000:10.1f} ms")
+    print(f"pingouin : {pingouin_seconds * 1000:10.1f} ms")
+    print(f"速度比   : {pingouin_seconds / engine_seconds:10.1f} 倍")
+    print(f"最大誤差 : {difference:10.2e}（許容 {args.tol:.0e}）")
+    if difference > args.tol:
+        print('結果が一致しません')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,28 @@
-import matplotlib.pyplot as plt
+import time
+
+_COMMON_IMPORT_START = time.perf_counter()
+
 import os
+import sys
 import streamlit as st
-import japanize_matplotlib
-import matplotlib.font_manager as font_manager
 import pandas as pd
 import numpy as np
-from scipy import stats
 import warnings
+import hashlib
+import tempfile
+from dataclasses import replace
 from typing import Optional, Dict, Any, Tuple
-import requests
 import json
 
+from easystat.cache import ArrowDiskCache, LRUCache, estimate_nbytes
+from easystat.csv_format import read_csv_sniffed, sniff_source
+from easystat.lazy import lazy_import, startup_report
+
+# 重いライブラリは使う時点で読み込む
+plt = lazy_import('matplotlib.pyplot', requires=('japanize_matplotlib',))
+stats = lazy_import('scipy.stats')
+requests = lazy_import('requests')
+
 
 def display_header():
     st.caption('Created by Dit-Lab.(Daiki Ito)')
@@ -20,7 +32,11 @@ def set_font():
     # font_path = '../ipaexg.ttf'  # pages フォルダから一つ上を見る
     font_path = os.path.join(os.path.dirname(__file__), '..', 'ipaexg.ttf')
 
-    plt.rcParams['font.family'] = 'IPAexGothic'
+    # matplotlib を使うまで読み込みを遅らせる
+    plt.on_load(lambda pyplot: pyplot.rcParams.__setitem__('font.family', 'IPAexGothic'))
+    # ほかで matplotlib.pyplot が読み込み済みなら遅らせる意味がないため、すぐに適用する
+    if 'matplotlib.pyplot' in sys.modules:
+        plt.rcParams['font.family'] = 'IPAexGothic'
 
 
 def display_guide():
@@ -178,8 +194,13 @@ class StatisticalValidator:
     """統計分析のデータ検証クラス"""
     
     @staticmethod
-    def safe_file_load(uploaded_file) -> Optional[pd.DataFrame]:
-        """安全なファイル読み込み"""
+    def safe_file_load(uploaded_file, format_key: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """安全なファイル読み込み
+
+        CSVは先頭サンプルから文字コードと読み込みエンジンを判定して一度だけ
+        パースする。判定結果は format_key を指定すれば記録し（load_data が
+        表示）、指定しなければその場で表示する。
+        """
         try:
             if uploaded_file is None:
                 return None
@@ -188,15 +209,23 @@ class StatisticalValidator:
             
             if file_extension == 'csv':
                 # CSVの場合、エンコーディングを自動判定
-                try:
-                    df = pd.read_csv(uploaded_file, encoding='utf-8')
-                except UnicodeDecodeError:
-                    uploaded_file.seek(0)  # ファイルポインタをリセット
-                    df = pd.read_csv(uploaded_file, encoding='shift_jis')
+                df, csv_format = read_csv_sniffed(uploaded_file, size=getattr(uploaded_file, 'size', None))
+                if format_key is None:
+                    st.caption(f"📄 {csv_format.describe()}")
+                else:
+                    get_csv_formats()[format_key] = csv_format
             elif file_extension in ['xlsx', 'xls']:
                 df = pd.read_excel(uploaded_file)
+            elif file_extension == 'parquet':
+                df = pd.read_parquet(uploaded_file)
+            elif file_extension == 'feather':
+                df = pd.read_feather(uploaded_file)
+            elif file_extension == 'txt':
+                # 空白区切りのテキストファイル
+                csv_format = sniff_source(uploaded_file)
+                df = pd.read_csv(uploaded_file, sep=r'\s+', encoding=csv_format.encoding)
             else:
-                st.error("⚠️ 対応していないファイル形式です。CSV、Excel(.xlsx/.xls)ファイルをアップロードしてください。")
+                st.error("⚠️ 対応していないファイル形式です。CSV、Excel(.xlsx/.xls)、Parquet、Featherファイルをアップロードしてください。")
                 return None
             
             # 基本的なデータ検証
@@ -205,7 +234,7 @@ class StatisticalValidator:
                 return None
             
             # 列名の日本語対応確認
-            if any(col.startswith('Unnamed:') for col in df.columns):
+            if any(str(col).startswith('Unnamed:') for col in df.columns):
                 st.warning("⚠️ 列名が正しく読み込まれていない可能性があります。ファイルの1行目に列名が含まれているか確認してください。")
             
             return df
@@ -293,6 +322,260 @@ class StatisticalValidator:
             return {'error': str(e), 'equal_variances': False}
 
 
+# ==========================================
+# データ読み込み（キャッシュ付き）
+# ==========================================
+
+# アップロードを受け付けるファイル形式
+SUPPORTED_FILE_TYPES = ["csv", "xlsx", "parquet", "feather"]
+
+# セッション内で保持するデータセットの上限
+DATA_CACHE_MAX_ENTRIES = 8
+DATA_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# 解析済みデータセットのディスクキャッシュ（Arrow形式、アプリ再起動後も有効）
+DISK_CACHE_DIR = os.environ.get(
+    'EASYSTAT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'easystat_cache')
+)
+DISK_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+_disk_cache = ArrowDiskCache(DISK_CACHE_DIR, max_bytes=DISK_CACHE_MAX_BYTES)
+
+
+def get_data_cache() -> LRUCache:
+    """セッション共有のデータセットキャッシュを取得（全ページ共通）"""
+    if '_data_cache' not in st.session_state:
+        st.session_state['_data_cache'] = LRUCache(
+            max_entries=DATA_CACHE_MAX_ENTRIES,
+            max_bytes=DATA_CACHE_MAX_BYTES,
+        )
+    return st.session_state['_data_cache']
+
+
+TOKEN_STORE_MAX_DOCUMENTS = 200_000
+TOKEN_STORE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def get_token_store():
+    """セッション共有の形態素解析結果のキャッシュ（easystat.engine.TokenStore）"""
+    if '_token_store' not in st.session_state:
+        from easystat.engine import TokenStore
+        st.session_state['_token_store'] = TokenStore(
+            max_entries=TOKEN_STORE_MAX_DOCUMENTS,
+            max_bytes=TOKEN_STORE_MAX_BYTES,
+        )
+    return st.session_state['_token_store']
+
+
+# 共起ネットワークの配置を保持するグラフの数
+LAYOUT_CACHE_MAX_ENTRIES = 64
+
+
+def get_layout_cache() -> LRUCache:
+    """セッション共有の共起ネットワークの配置のキャッシュ（グラフの構造のハッシュがキー）"""
+    if '_layout_cache' not in st.session_state:
+        st.session_state['_layout_cache'] = LRUCache(max_entries=LAYOUT_CACHE_MAX_ENTRIES)
+    return st.session_state['_layout_cache']
+
+
+# ワードクラウドの画像を保持する上限
+WORDCLOUD_CACHE_MAX_ENTRIES = 32
+WORDCLOUD_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+
+def get_wordcloud_cache() -> LRUCache:
+    """セッション共有のワードクラウド画像のキャッシュ（度数のハッシュ・大きさ・最大単語数がキー）"""
+    if '_wordcloud_cache' not in st.session_state:
+        st.session_state['_wordcloud_cache'] = LRUCache(
+            max_entries=WORDCLOUD_CACHE_MAX_ENTRIES,
+            max_bytes=WORDCLOUD_CACHE_MAX_BYTES,
+        )
+    return st.session_state['_wordcloud_cache']
+
+
+def _load_cached(key: str, loader) -> Optional[pd.DataFrame]:
+    """メモリ → ディスク（Arrow） → loader の順にデータセットを取得"""
+    cache = get_data_cache()
+    df = cache.get(key)
+    if df is None:
+        df = _disk_cache.get(key)
+        if df is None:
+            df = loader()
+            if df is None:
+                return None
+            _disk_cache.put(key, df)
+        cache.put(key, df)
+    # 呼び出し側で変更できるようコピーを返す
+    return df.copy()
+
+
+def get_csv_formats() -> Dict[str, Any]:
+    """読み込んだCSVの文字コード・エンジンの判定結果（キャッシュキーごと）"""
+    if '_csv_formats' not in st.session_state:
+        st.session_state['_csv_formats'] = {}
+    return st.session_state['_csv_formats']
+
+
+def _content_hash(uploaded_file) -> str:
+    """アップロードファイル内容の SHA-256（バッファをコピーせずに計算）"""
+    try:
+        buffer = uploaded_file.getbuffer()
+    except AttributeError:
+        return hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+    try:
+        return hashlib.sha256(buffer).hexdigest()
+    finally:
+        buffer.release()
+
+
+def load_data(uploaded_file) -> Optional[pd.DataFrame]:
+    """アップロードファイルの読み込み
+
+    ファイル内容のハッシュをキーにキャッシュするため、再実行やページ移動、
+    アプリの再起動のたびに再パースしない。
+    """
+    if uploaded_file is None:
+        return None
+
+    extension = uploaded_file.name.split('.')[-1].lower()
+    key = f"{_content_hash(uploaded_file)}-{extension}"
+
+    def parse():
+        uploaded_file.seek(0)
+        return StatisticalValidator.safe_file_load(uploaded_file, format_key=key)
+
+    df = _load_cached(key, parse)
+    csv_format = get_csv_formats().get(key)
+    if df is not None and csv_format is not None:
+        st.caption(f"📄 {csv_format.describe()}")
+    return df
+
+
+def load_demo_data(path: str) -> Optional[pd.DataFrame]:
+    """デモデータの読み込み（ファイルの更新日時ごとにキャッシュ）"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        st.error(f"デモデータファイルが見つかりません: {path}")
+        return None
+    key = hashlib.sha256(f"{os.path.abspath(path)}:{mtime}".encode()).hexdigest() + "-demo"
+    return _load_cached(key, lambda: pd.read_excel(path, sheet_name=0))
+
+
+# 大容量CSVの分割読み込み（既定でストリーミング集計に切り替えるサイズ）
+STREAMING_THRESHOLD_BYTES = 100 * 1024 * 1024
+STREAMING_CHUNK_ROWS = 100_000
+STREAMING_SAMPLE_ROWS = 20_000
+
+
+def is_large_csv(uploaded_file) -> bool:
+    """ストリーミング集計を既定とすべき大容量CSVか"""
+    return (
+        uploaded_file is not None
+        and uploaded_file.name.lower().endswith('.csv')
+        and uploaded_file.size >= STREAMING_THRESHOLD_BYTES
+    )
+
+
+def summarize_large_csv(uploaded_file):
+    """CSVを分割して読み込み、全体を保持せずに要約統計量を集計
+
+    結果（easystat.engine.StreamingSummary）はファイル内容のハッシュを
+    キーにセッション内でキャッシュする。
+    """
+    from easystat.engine import summarize_csv
+
+    if uploaded_file is None:
+        return None
+    key = f"{_content_hash(uploaded_file)}-stream"
+    cache = get_data_cache()
+    summary = cache.get(key)
+    if summary is not None:
+        csv_format = get_csv_formats().get(key)
+        if csv_format is not None:
+            st.caption(f"📄 {csv_format.describe()}")
+        return summary
+
+    try:
+        uploaded_file.seek(0)
+        # 分割読み込みは C エンジンのみ対応
+        csv_format = sniff_source(uploaded_file)
+        csv_format = replace(csv_format, engine='c')
+        summary = summarize_csv(
+            uploaded_file,
+            chunksize=STREAMING_CHUNK_ROWS,
+            sample_size=STREAMING_SAMPLE_ROWS,
+            encoding=csv_format.encoding,
+        )
+    except Exception as e:
+        st.error(f"⚠️ ファイルの読み込み中にエラーが発生しました: {str(e)}")
+        return None
+
+    if summary.n_rows == 0:
+        st.error("⚠️ アップロードされたファイルにデータが含まれていません。")
+        return None
+    cache.put(key, summary, nbytes=estimate_nbytes(summary.sample))
+    get_csv_formats()[key] = csv_format
+    st.caption(f"📄 {csv_format.describe()}")
+    return summary
+
+
+# ==========================================
+# ブートストラップ信頼区間
+# ==========================================
+
+BOOTSTRAP_METHODS = {'BCa法': 'bca', 'パーセンタイル法': 'percentile'}
+# 再実行しても同じ区間になるよう乱数の種を固定する
+BOOTSTRAP_SEED = 0
+
+
+def bootstrap_options(label: str) -> Optional[Dict[str, Any]]:
+    """ブートストラップ信頼区間の設定（チェックボックスが外れていれば None）
+
+    返り値はそのまま engine.bootstrap_* のキーワード引数に渡せる。
+    """
+    if not st.checkbox(label):
+        return None
+    col1, col2 = st.columns(2)
+    method = col1.selectbox('信頼区間の方法', list(BOOTSTRAP_METHODS))
+    n_boot = col2.number_input('リサンプリング回数', min_value=200, max_value=20000, value=2000, step=500)
+    return {'n_boot': int(n_boot), 'method': BOOTSTRAP_METHODS[method], 'seed': BOOTSTRAP_SEED}
+
+
+def show_bootstrap_table(table: pd.DataFrame, options: Dict[str, Any]):
+    """ブートストラップ信頼区間の表と計算条件を表示"""
+    st.write(table.style.format('{:.3f}'))
+    method = next(name for name, key in BOOTSTRAP_METHODS.items() if key == options['method'])
+    st.caption(f"{method}・リサンプリング {options['n_boot']} 回（SE はブートストラップ標準誤差）")
+
+
+# ==========================================
+# 並べ替え検定
+# ==========================================
+
+PERMUTATION_SEED = 0
+
+
+def permutation_options(label: str) -> Optional[Dict[str, Any]]:
+    """並べ替え検定の設定（チェックボックスが外れていれば None）
+
+    返り値はそのまま engine.permutation_* のキーワード引数に渡せる。
+    """
+    if not st.checkbox(label, help='正規性が疑われるデータでも使える、分布を仮定しない検定です。'):
+        return None
+    n_perm = st.number_input('並べ替えの回数（上限）', min_value=1000, max_value=200000, value=10000, step=1000)
+    return {'n_perm': int(n_perm), 'seed': PERMUTATION_SEED}
+
+
+def show_permutation_table(table: pd.DataFrame):
+    """並べ替え検定の結果表と注記を表示"""
+    numeric_columns = table.select_dtypes(include=['float64', 'int64']).columns
+    formats = {col: '{:.3f}' for col in numeric_columns}
+    formats['並べ替え回数'] = '{:d}'
+    st.write(table.style.format(formats))
+    st.caption('モンテカルロ法では、p 値の信頼区間が有意水準（0.05）をまたがなくなった時点で並べ替えを打ち切ります。')
+
+
 # ==========================================
 # 結果解釈支援機能
 # ==========================================
@@ -1364,3 +1647,23 @@ def export_plotly_to_excel(fig, filename="graph.xlsx", sheet_name="グラフ"):
     excel_buffer.seek(0)
     
     return excel_buffer.getvalue()
+
+
+# ==========================================
+# 起動時間レポート
+# ==========================================
+
+# 環境変数 EASYSTAT_STARTUP_REPORT=1 のときサイドバーに表示
+SHOW_STARTUP_REPORT = os.environ.get('EASYSTAT_STARTUP_REPORT', '') not in ('', '0')
+
+
+def display_startup_report():
+    """common の読み込み時間と、遅延読み込みしたライブラリの読み込み時間を表示"""
+    if not SHOW_STARTUP_REPORT:
+        return
+    with st.sidebar.expander('⏱️ 起動時間レポート'):
+        st.markdown(f'- common: {_COMMON_IMPORT_SECONDS * 1000:.0f} ms')
+        st.markdown(startup_report())
+
+
+_COMMON_IMPORT_SECONDS = time.perf_counter() - _COMMON_IMPORT_START
@@ -0,0 +1 @@
+"""easyStat の解析ロジック（Streamlit 非依存）"""
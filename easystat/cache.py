@@ -0,0 +1,199 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def estimate_nbytes(value: Any) -> int:
+    """キャッシュする値のおおよそのメモリ使用量（バイト）"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """件数と合計サイズの上限を持つ LRU キャッシュ
+
+    上限を超えると、最も長く参照されていないものから破棄する。
+    単体で上限サイズを超える値はキャッシュしない。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 8,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = estimate_nbytes,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """値を取得し、最近使用したものとして記録"""
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any, nbytes: Optional[int] = None) -> None:
+        """値を格納し、上限を超えた分を古い順に破棄"""
+        if nbytes is None:
+            nbytes = self._sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                return
+            self._data[key] = value
+            self._sizes[key] = nbytes
+            self.total_bytes += nbytes
+            self._evict()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            value = self._data[key]
+            self._remove(key)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        del self._data[key]
+        self.total_bytes -= self._sizes.pop(key)
+
+    def _evict(self) -> None:
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._data)))
+
+
+class ArrowDiskCache:
+    """Feather（Arrow IPC）形式でデータセットを保存するディスクキャッシュ
+
+    非圧縮で書き出し、読み込みはメモリマップで行うため、CSV/Excel を
+    再パースするより大幅に速い。合計サイズが上限を超えると最終参照の
+    古いファイルから削除する。pyarrow がない環境では何もしない。
+    """
+
+    SUFFIX = '.feather'
+
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def available() -> bool:
+        """pyarrow が利用可能か"""
+        try:
+            import pyarrow.feather  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}{self.SUFFIX}')
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """キャッシュ済みの DataFrame を読み込む（なければ None）"""
+        path = self._path(key)
+        if not os.path.exists(path) or not self.available():
+            return None
+        import pyarrow.feather as feather
+        try:
+            table = feather.read_table(path, memory_map=True)
+            df = table.to_pandas()
+        except Exception:
+            # 壊れたキャッシュは削除して読み直させる
+            self._unlink(path)
+            return None
+        # 最終参照日時を更新（削除の優先順位に使う）
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> bool:
+        """DataFrame を保存（Arrow に変換できない場合は保存しない）"""
+        if not self.available() or not self._storable(df):
+            return False
+        import pyarrow.feather as feather
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            feather.write_feather(df, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)
+        except Exception:
+            self._unlink(tmp_path)
+            return False
+        self._evict()
+        return True
+
+    @staticmethod
+    def _storable(df: pd.DataFrame) -> bool:
+        # Feather は文字列の列名と既定の RangeIndex のみ扱える
+        return (
+            all(isinstance(col, str) for col in df.columns)
+            and df.columns.is_unique
+            and isinstance(df.index, pd.RangeIndex)
+            and df.index.start == 0 and df.index.step == 1
+        )
+
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        try:
+            entries = [
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith(self.SUFFIX)
+            ]
+            stats = sorted(((os.stat(p).st_mtime, os.stat(p).st_size, p) for p in entries))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in stats:
+            if total <= self.max_bytes:
+                break
+            self._unlink(path)
+            total -= size
@@ -0,0 +1,173 @@
+"""CSVの文字コード判定と読み込みエンジンの選択
+
+ファイル先頭のサンプルだけで文字コード（UTF-8 / BOM付きUTF-8 / CP932 /
+EUC-JP）を判定し、読み込みを一度で済ませる。
+"""
+import codecs
+import csv
+import io
+import re
+from dataclasses import dataclass
+
+import pandas as pd
+from typing import Optional, Tuple
+
+# 判定に使う先頭サンプルのサイズ
+SNIFF_BYTES = 64 * 1024
+
+# これより小さいファイルは C エンジンの方が速い
+PYARROW_MIN_BYTES = 1024 * 1024
+
+# pyarrow は日時らしい文字列を自動で日時型に変換するため、含む場合は C エンジンを使う
+_DATETIME_PATTERN = re.compile(rb'\d{4}[-/]\d{1,2}[-/]\d{1,2}|\d{1,2}:\d{2}')
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig', 'UTF-8（BOM付き）'),
+    (codecs.BOM_UTF16_LE, 'utf-16', 'UTF-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16', 'UTF-16'),
+)
+
+_ENCODING_LABELS = {
+    'utf-8': 'UTF-8',
+    'cp932': 'Shift_JIS（CP932）',
+    'euc_jp': 'EUC-JP',
+}
+
+
+@dataclass(frozen=True)
+class CsvFormat:
+    """判定したCSVの読み込み設定"""
+    encoding: str  # pandas に渡す文字コード名
+    engine: str  # 'pyarrow' または 'c'
+    label: str  # 表示用の文字コード名
+
+    def describe(self) -> str:
+        return f"文字コード: {self.label} ／ 読み込みエンジン: {self.engine}"
+
+
+def _decodes(sample: bytes, encoding: str) -> Optional[str]:
+    """サンプルを復号できればその文字列を返す（末尾で切れた文字は許容）"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        return decoder.decode(sample, final=False)
+    except UnicodeDecodeError:
+        return None
+
+
+def _japanese_ratio(text: str) -> float:
+    """ひらがな・カタカナ・漢字・全角英数の割合
+
+    EUC-JP のバイト列を CP932 として読むと半角カナが並ぶため、半角カナは数えない。
+    """
+    non_ascii = [ch for ch in text if ord(ch) > 0x7F]
+    if not non_ascii:
+        return 0.0
+    japanese = sum(
+        1 for ch in non_ascii
+        if '　' <= ch <= 'ヿ' or '一' <= ch <= '鿿' or '！' <= ch <= '～'
+    )
+    return japanese / len(non_ascii)
+
+
+def detect_encoding(sample: bytes) -> Tuple[str, str]:
+    """先頭サンプルから文字コードを判定し、(pandas用の名前, 表示名) を返す"""
+    for bom, encoding, label in _BOMS:
+        if sample.startswith(bom):
+            return encoding, label
+    if _decodes(sample, 'utf-8') is not None:
+        return 'utf-8', _ENCODING_LABELS['utf-8']
+
+    # CP932 と EUC-JP はどちらでも復号できる場合があるため、日本語らしさで選ぶ
+    candidates = []
+    for encoding in ('cp932', 'euc_jp'):
+        text = _decodes(sample, encoding)
+        if text is not None:
+            candidates.append((_japanese_ratio(text), encoding))
+    if candidates:
+        # 同率なら Excel の既定である CP932 を優先
+        encoding = max(candidates, key=lambda c: c[0])[1]
+    else:
+        encoding = 'cp932'
+    return encoding, _ENCODING_LABELS[encoding]
+
+
+def _header_is_safe(sample: bytes, encoding: str) -> bool:
+    """pyarrow と C エンジンで列名の扱いが変わらないか（空欄・重複がない）"""
+    text = _decodes(sample, encoding) or ''
+    first_line = text.lstrip('﻿').split('\n', 1)[0]
+    header = next(csv.reader([first_line]), [])
+    names = [name.strip() for name in header]
+    return bool(names) and all(names) and len(set(names)) == len(names)
+
+
+def pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def sniff_csv(sample: bytes, size: Optional[int] = None) -> CsvFormat:
+    """先頭サンプルから文字コードと最速の読み込みエンジンを決める
+
+    pyarrow エンジンは、ファイルが十分大きく、結果が C エンジンと
+    変わらない場合（列名に空欄・重複がなく、日時らしい値がない）に選ぶ。
+    """
+    encoding, label = detect_encoding(sample)
+    size = len(sample) if size is None else size
+    use_pyarrow = (
+        size >= PYARROW_MIN_BYTES
+        and encoding != 'utf-16'
+        and pyarrow_available()
+        and _header_is_safe(sample, encoding)
+        and not _DATETIME_PATTERN.search(sample)
+    )
+    return CsvFormat(encoding=encoding, engine='pyarrow' if use_pyarrow else 'c', label=label)
+
+
+def sniff_source(source, size: Optional[int] = None) -> CsvFormat:
+    """ファイルオブジェクトの先頭を読んで判定（位置は先頭に戻す）"""
+    sample = source.read(SNIFF_BYTES)
+    source.seek(0)
+    return sniff_csv(sample, size=size)
+
+
+def read_csv_sniffed(source, size: Optional[int] = None, **kwargs) -> Tuple[pd.DataFrame, CsvFormat]:
+    """文字コードとエンジンを判定してCSVを一度だけ読み込む
+
+    pyarrow で読めない行（列数の不一致など）があれば C エンジンで読み直す。
+    サンプルより後ろに判定と異なる文字コードの部分があれば、ファイル全体で
+    判定し直した文字コード・CP932・EUC-JP・UTF-8 の順に試し、いずれでも
+    復号できない場合に限り、復号できない文字を置換して読み込む。
+    """
+    fmt = sniff_source(source, size=size)
+    if fmt.engine == 'pyarrow':
+        try:
+            return pd.read_csv(source, encoding=fmt.encoding, engine='pyarrow', **kwargs), fmt
+        except Exception:
+            fmt = CsvFormat(encoding=fmt.encoding, engine='c', label=fmt.label)
+            source.seek(0)
+    try:
+        return pd.read_csv(source, encoding=fmt.encoding, engine='c', **kwargs), fmt
+    except UnicodeDecodeError:
+        pass
+
+    # サンプルより後ろに判定と異なる文字コードの部分がある。全体で判定し直し、
+    # 候補の文字コードを順に試す
+    source.seek(0)
+    data = source.read()
+    detected, detected_label = detect_encoding(data)
+    labels = {**_ENCODING_LABELS, detected: detected_label}
+    for encoding in dict.fromkeys([detected, 'cp932', 'euc_jp', 'utf-8']):
+        if encoding == fmt.encoding:
+            continue
+        try:
+            df = pd.read_csv(io.BytesIO(data), encoding=encoding, engine='c', **kwargs)
+        except UnicodeDecodeError:
+            continue
+        return df, CsvFormat(encoding=encoding, engine='c', label=labels[encoding])
+
+    # どの文字コードでも復号できない場合だけ、復号できない文字を置換する
+    fmt = CsvFormat(encoding=fmt.encoding, engine='c', label=f'{fmt.label}（復号できない文字を置換）')
+    return pd.read_csv(io.BytesIO(data), encoding=fmt.encoding, encoding_errors='replace', **kwargs), fmt
@@ -0,0 +1,95 @@
+"""統計解析エンジン
+
+ページ（Streamlit）から独立した純粋な関数群。結果は DataFrame または
+dataclass で返し、描画は各ページが担当する。
+"""
+from .anova import (
+    GroupMoments,
+    anova_oneway_from_moments,
+    anova_oneway_table,
+    anova_rm,
+    anova_twoway,
+    grouped_moments,
+    mixed_anova,
+    sphericity_epsilon,
+    wide_to_long,
+)
+from .bootstrap import (
+    bootstrap_d_ind,
+    bootstrap_d_rel,
+    bootstrap_eta_squared,
+    bootstrap_ols,
+    bootstrap_table,
+    bca_interval,
+    percentile_interval,
+)
+from .chi_square import ChiSquareResult, chi_square
+from .cooccurrence import CooccurrenceNetwork, DocumentTermMatrix, document_term_matrix, wordcloud_frequencies
+from .multivariate import (
+    FactorAnalysisResult,
+    PCAResult,
+    cronbach_alpha,
+    factor_analysis,
+    factor_means,
+    ml_fit_indices,
+    pca,
+    sampling_adequacy,
+)
+from .model_search import ModelSearchResult, model_search
+from .network_layout import cached_network_layout, force_layout, layout_key
+from .permutation import (
+    permutation_anova_oneway,
+    permutation_test,
+    permutation_ttest_ind,
+    permutation_ttest_rel,
+)
+from .posthoc import (
+    adjust_pvalues,
+    games_howell,
+    paired_pairwise_table,
+    posthoc_table,
+    studentized_range_isf,
+    studentized_range_sf,
+    tukey_hsd,
+)
+from .regression import OLSResult, build_design, ols_multi
+from .streaming import StreamingSummary, TDigest, summarize_csv
+from .text_mining import (
+    TextMiningResult,
+    TokenizedCorpus,
+    TokenStore,
+    analyze,
+    analyze_mecab,
+    extract_words,
+    get_tagger,
+    get_tokenizer,
+    iter_analyze,
+    mecab_available,
+    text_mining,
+    tokenize_texts,
+    word_frequencies,
+)
+from .ttest import ttest_ind_table, ttest_rel_table
+from .utils import significance_caption, significance_mark, summary_table
+
+__all__ = [
+    'GroupMoments', 'anova_oneway_from_moments', 'anova_oneway_table', 'anova_rm', 'anova_twoway',
+    'grouped_moments', 'mixed_anova', 'sphericity_epsilon', 'wide_to_long',
+    'bootstrap_d_ind', 'bootstrap_d_rel', 'bootstrap_eta_squared', 'bootstrap_ols', 'bootstrap_table',
+    'bca_interval', 'percentile_interval',
+    'ChiSquareResult', 'chi_square',
+    'CooccurrenceNetwork', 'DocumentTermMatrix', 'document_term_matrix', 'wordcloud_frequencies',
+    'FactorAnalysisResult', 'PCAResult', 'cronbach_alpha', 'factor_analysis',
+    'factor_means', 'ml_fit_indices', 'pca', 'sampling_adequacy',
+    'ModelSearchResult', 'model_search',
+    'cached_network_layout', 'force_layout', 'layout_key',
+    'permutation_anova_oneway', 'permutation_test', 'permutation_ttest_ind', 'permutation_ttest_rel',
+    'adjust_pvalues', 'games_howell', 'paired_pairwise_table', 'posthoc_table', 'studentized_range_isf', 'studentized_range_sf', 'tukey_hsd',
+    'OLSResult', 'build_design', 'ols_multi',
+    'StreamingSummary', 'TDigest', 'summarize_csv',
+    'TextMiningResult', 'TokenizedCorpus', 'TokenStore', 'analyze', 'analyze_mecab', 'extract_words',
+    'get_tagger', 'get_tokenizer', 'iter_analyze', 'mecab_available', 'text_mining',
+    'tokenize_texts', 'word_frequencies',
+    'ttest_ind_table', 'ttest_rel_table',
+    'significance_caption', 'significance_mark', 'summary_table',
+]
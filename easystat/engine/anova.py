@@ -0,0 +1,384 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence
+
+from ..lazy import lazy_import
+from .linalg import lstsq_multi, missing_patterns
+from .utils import significance_mark
+
+stats = lazy_import('scipy.stats')
+
+
+@dataclass
+class GroupMoments:
+    """群 × 従属変数ごとの件数・平均・偏差平方和
+
+    分散分析と多重比較で共有する。配列の形はいずれも（群数, 変数数）。
+    """
+    groups: List
+    columns: List[str]
+    n: np.ndarray
+    mean: np.ndarray
+    m2: np.ndarray  # 群内の偏差平方和
+
+    @property
+    def var(self) -> np.ndarray:
+        """群ごとの不偏分散"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.m2 / (self.n - 1)
+
+    def take(self, groups: Sequence) -> 'GroupMoments':
+        """指定した群だけを指定の順に並べ替えた集計値"""
+        index = [self.groups.index(group) for group in groups]
+        return GroupMoments(groups=list(groups), columns=self.columns,
+                            n=self.n[index], mean=self.mean[index], m2=self.m2[index])
+
+
+def grouped_moments(
+    df: pd.DataFrame,
+    group_col: str,
+    value_cols: Sequence[str],
+    groups: Optional[Sequence] = None,
+) -> GroupMoments:
+    """群分けを一度だけ行い、全従属変数の群ごとの件数・平均・偏差平方和を集計
+
+    欠損値は変数ごとに除外し、groups に含まれない行（群が欠損の行など）は使わない。
+    """
+    if groups is None:
+        groups = df[group_col].unique().tolist()
+    groups = [group for group in groups if not pd.isna(group)]
+    k = len(groups)
+    value_cols = list(value_cols)
+
+    codes = pd.Categorical(df[group_col], categories=groups).codes
+    keep = codes >= 0
+    codes = codes[keep]
+    X = df[value_cols].to_numpy(dtype=np.float64, na_value=np.nan)[keep]
+    valid = ~np.isnan(X)
+
+    # 群の指示行列との積で群ごとの和を一括計算
+    indicator = np.zeros((k, len(codes)))
+    indicator[codes, np.arange(len(codes))] = 1.0
+    n = indicator @ valid
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (indicator @ np.where(valid, X, 0.0)) / n
+    # 平均を引いてから二乗和をとる（桁落ちを避ける）
+    dev = np.where(valid, X - mean[codes], 0.0)
+    m2 = indicator @ (dev * dev)
+    return GroupMoments(groups=groups, columns=value_cols, n=n, mean=mean, m2=m2)
+
+
+def anova_oneway_from_moments(moments: GroupMoments) -> pd.DataFrame:
+    """群ごとの集計値から一要因分散分析（対応なし）の結果表を作成"""
+    n, mean, m2 = moments.n, moments.mean, moments.m2
+    N = n.sum(axis=0)
+    k = (n > 0).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grand_mean = np.nansum(n * mean, axis=0) / N
+        ss_between = np.nansum(n * (mean - grand_mean) ** 2, axis=0)
+        ss_within = m2.sum(axis=0)
+        ss_total = ss_between + ss_within
+
+        # 自由度の計算
+        df_between = k - 1  # 群間自由度
+        df_within = N - k  # 群内自由度
+        ms_within = ss_within / df_within
+        fval = (ss_between / df_between) / ms_within
+        pval = stats.f.sf(fval, df_between, df_within)
+
+        # 効果量の計算
+        eta_squared = ss_between / ss_total
+        omega_squared = (ss_between - df_between * ms_within) / (ss_total + ms_within)
+        overall_std = np.sqrt(ss_total / (N - 1))
+        stds = np.sqrt(moments.var)
+
+    table = {'全体M': grand_mean, '全体S.D': overall_std}
+    for i, group in enumerate(moments.groups):
+        table[f'{group}M'] = mean[i]
+    for i, group in enumerate(moments.groups):
+        table[f'{group}S.D'] = stds[i]
+    table.update({
+        '群間自由度': df_between,
+        '群内自由度': df_within.astype(np.int64),
+        'F': fval,
+        'p': pval,
+        'sign': [significance_mark(p) for p in pval],
+        'η²': eta_squared,
+        'ω²': omega_squared,
+    })
+    return pd.DataFrame(table, index=moments.columns)
+
+
+def anova_oneway_table(
+    df: pd.DataFrame,
+    group_col: str,
+    value_cols: List[str],
+    groups: Optional[Sequence] = None,
+) -> pd.DataFrame:
+    """一要因分散分析（対応なし）の結果表を作成
+
+    行は従属変数、列は 全体M・全体S.D・各群のM・各群のS.D・
+    群間自由度・群内自由度・F・p・sign・η²・ω²。
+    全従属変数をまとめて集計する。
+    """
+    return anova_oneway_from_moments(grouped_moments(df, group_col, value_cols, groups))
+
+
+def _sum_coding(values: pd.Series):
+    """因子を効果（和がゼロ）コーディングした列と水準の一覧を返す"""
+    cat = pd.Categorical(values)
+    levels = list(cat.categories)
+    codes = cat.codes
+    columns = np.zeros((len(codes), len(levels) - 1))
+    for i in range(len(levels) - 1):
+        columns[:, i] = (codes == i).astype(np.float64) - (codes == len(levels) - 1)
+    return columns, levels
+
+
+def anova_twoway(
+    df: pd.DataFrame,
+    factor1: str,
+    factor2: str,
+    value_cols: Sequence[str],
+    typ: int = 2,
+) -> Dict[str, pd.DataFrame]:
+    """二要因分散分析（対応なし・交互作用あり）を全従属変数について一括計算
+
+    計画行列（効果コーディング）は一度だけ作り、欠損のパターンが同じ従属変数は
+    一度の QR 分解でまとめて解く。戻り値は従属変数ごとの表で、行は
+    factor1・factor2・factor1:factor2・Residual（typ=3 では先頭に Intercept）、
+    列は statsmodels の anova_lm と同じ sum_sq・df・F・PR(>F)。
+    有効な行が計画行列の列より少ない従属変数は戻り値に含めない。
+    """
+    if typ not in (2, 3):
+        raise ValueError('平方和のタイプは 2 または 3 を指定してください')
+    value_cols = list(value_cols)
+    data = df.dropna(subset=[factor1, factor2])
+    A, _ = _sum_coding(data[factor1])
+    B, _ = _sum_coding(data[factor2])
+    AB = (A[:, :, None] * B[:, None, :]).reshape(len(data), -1)
+    ones = np.ones((len(data), 1))
+    blocks = {'Intercept': ones, factor1: A, factor2: B, f'{factor1}:{factor2}': AB}
+    interaction = f'{factor1}:{factor2}'
+
+    # 比較する部分モデル（含む項の組）
+    if typ == 2:
+        models = {
+            'full': ['Intercept', factor1, factor2, interaction],
+            'main': ['Intercept', factor1, factor2],
+            'only1': ['Intercept', factor1],
+            'only2': ['Intercept', factor2],
+        }
+        # 項ごとに (項を除いたモデル, 項を加えたモデル)
+        comparisons = {factor1: ('only2', 'main'), factor2: ('only1', 'main'), interaction: ('main', 'full')}
+    else:
+        terms = ['Intercept', factor1, factor2, interaction]
+        models = {'full': terms}
+        models.update({f'-{term}': [t for t in terms if t != term] for term in terms})
+        comparisons = {term: (f'-{term}', 'full') for term in terms}
+
+    Y = data[value_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+    n_params = sum(blocks[term].shape[1] for term in models['full'])
+    tables = {}
+    for rows, cols in missing_patterns(~np.isnan(Y)):
+        if rows.sum() < n_params:
+            # 有効な行が計画行列の列より少ない従属変数は推定できないため結果に含めない
+            continue
+        Yg = Y[rows][:, cols]
+        rss, rank = {}, {}
+        for name, terms in models.items():
+            X = np.hstack([blocks[term][rows] for term in terms])
+            _, resid, rank[name] = lstsq_multi(X, Yg)
+            rss[name] = (resid * resid).sum(axis=0)
+
+        df_resid = rows.sum() - rank['full']
+        index = list(comparisons) + ['Residual']
+        sum_sq = np.vstack([rss[reduced] - rss[fuller] for reduced, fuller in comparisons.values()] + [rss['full']])
+        dof = np.array([rank[fuller] - rank[reduced] for reduced, fuller in comparisons.values()] + [df_resid],
+                       dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fval = (sum_sq[:-1] / dof[:-1, None]) / (sum_sq[-1] / df_resid)
+            pval = stats.f.sf(fval, dof[:-1, None], df_resid)
+        for j, col in enumerate(cols):
+            tables[value_cols[col]] = pd.DataFrame({
+                'sum_sq': sum_sq[:, j],
+                'df': dof,
+                'F': np.append(fval[:, j], np.nan),
+                'PR(>F)': np.append(pval[:, j], np.nan),
+            }, index=index)
+    return {col: tables[col] for col in value_cols if col in tables}
+
+
+def sphericity_epsilon(X: np.ndarray):
+    """被験者 × 条件の行列から Greenhouse-Geisser と Huynh-Feldt の ε を計算"""
+    n, k = X.shape
+    # 条件の共分散行列を二重中心化
+    S = np.cov(X, rowvar=False)
+    C = np.eye(k) - 1.0 / k
+    S = C @ S @ C
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gg = np.trace(S) ** 2 / ((k - 1) * (S * S).sum())
+        hf = (n * (k - 1) * gg - 2) / ((k - 1) * (n - 1 - (k - 1) * gg))
+    return gg, min(hf, 1.0)
+
+
+def anova_rm(
+    wide: pd.DataFrame,
+    conditions: Optional[Sequence[str]] = None,
+    within_name: str = '条件',
+) -> pd.DataFrame:
+    """一要因分散分析（対応あり）をワイド形式（1行1被験者、条件が列）のまま計算
+
+    列は statsmodels の AnovaRM と同じ F Value・Num DF・Den DF・Pr > F に、
+    Greenhouse-Geisser／Huynh-Feldt の ε と補正後の p 値を加えたもの。
+    欠損値を含む被験者は除外する。
+    """
+    if conditions is None:
+        conditions = list(wide.columns)
+    X = wide[list(conditions)].to_numpy(dtype=np.float64, na_value=np.nan)
+    X = X[~np.isnan(X).any(axis=1)]
+    n, k = X.shape
+    if n < 2 or k < 2:
+        raise ValueError('2人以上の被験者と2つ以上の条件が必要です')
+
+    # 平均からの偏差で平方和を分解（全体 = 条件 + 被験者 + 誤差）
+    dev = X - X.mean()
+    cond_dev = dev.mean(axis=0)
+    subj_dev = dev.mean(axis=1)
+    ss_cond = n * (cond_dev ** 2).sum()
+    ss_subj = k * (subj_dev ** 2).sum()
+    ss_error = (dev * dev).sum() - ss_cond - ss_subj
+
+    df_cond = k - 1
+    df_error = (n - 1) * (k - 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fval = (ss_cond / df_cond) / (ss_error / df_error)
+    gg, hf = sphericity_epsilon(X)
+    return pd.DataFrame({
+        'F Value': [fval],
+        'Num DF': [float(df_cond)],
+        'Den DF': [float(df_error)],
+        'Pr > F': [stats.f.sf(fval, df_cond, df_error)],
+        'GG ε': [gg],
+        'Pr > F (GG)': [stats.f.sf(fval, df_cond * gg, df_error * gg)],
+        'HF ε': [hf],
+        'Pr > F (HF)': [stats.f.sf(fval, df_cond * hf, df_error * hf)],
+    }, index=[within_name])
+
+
+def wide_to_long(
+    df: pd.DataFrame,
+    subject_col: str,
+    between_col: str,
+    within_cols: Sequence[str],
+    labels: Sequence[str],
+    value_name: str = 'value',
+    within_name: str = 'Time',
+) -> pd.DataFrame:
+    """被験者×条件のワイド形式をロング形式に変換（条件の順に並ぶ）"""
+    n = len(df)
+    k = len(within_cols)
+    df_long = pd.DataFrame()
+    df_long[subject_col] = np.repeat(df[subject_col].values, k)
+    df_long[between_col] = np.repeat(df[between_col].values, k)
+    df_long[within_name] = list(labels) * n
+    df_long[value_name] = df[list(within_cols)].to_numpy().ravel()
+    return df_long
+
+
+def mixed_anova(
+    df: pd.DataFrame,
+    between_col: str,
+    within_sets: Sequence[Sequence[str]],
+    within_name: str = 'Time',
+) -> List[Optional[pd.DataFrame]]:
+    """二要因混合分散分析（被験者間1要因 × 被験者内1要因）を複数の変数組について一括計算
+
+    ワイド形式（1行1被験者）のまま、within_sets の各組（被験者内の各水準の列）に
+    ついて pingouin.mixed_anova と同じ形式の表（Source・SS・DF1・DF2・MS・F・
+    p-unc・np2・eps、水準が3つ以上なら p-GG-corr も）を返す。
+    全組の平方和は配列演算でまとめて計算し、欠損値を含む被験者は組ごとに除外する。
+    欠損を除いた被験者が2群以上にわたらない、または群の数以下しかない組は
+    推定できないため、表の代わりに None を返す。
+    """
+    within_sets = [list(cols) for cols in within_sets]
+    if not within_sets:
+        return []
+    k = len(within_sets[0])
+    if k < 2 or any(len(cols) != k for cols in within_sets):
+        raise ValueError('被験者内因子の水準数は2以上で、すべての組で同じにしてください')
+
+    cat = pd.Categorical(df[between_col])
+    codes = cat.codes
+    a = len(cat.categories)
+    # Y: 被験者 × 変数の組 × 水準
+    Y = np.stack([df[cols].to_numpy(dtype=np.float64, na_value=np.nan) for cols in within_sets], axis=1)
+    valid = ~np.isnan(Y).any(axis=2) & (codes >= 0)[:, None]
+    Y = np.where(valid[:, :, None], Y, 0.0)
+    w = valid.astype(np.float64)
+
+    indicator = np.zeros((a, len(codes)))
+    indicator[codes[codes >= 0], np.flatnonzero(codes >= 0)] = 1.0
+    n_total = w.sum(axis=0)
+    n_group = indicator @ w  # 群 × 組
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cell_mean = np.einsum('gi,imj->gmj', indicator, Y) / n_group[:, :, None]
+        cond_mean = Y.sum(axis=0) / n_total[:, None]
+        grand_mean = cond_mean.mean(axis=1)
+        group_mean = cell_mean.mean(axis=2)
+        subject_mean = Y.mean(axis=2)
+        subject_group_mean = group_mean[np.maximum(codes, 0)]
+
+        # 被験者間の層：群 + 群内の被験者
+        ss_between = k * np.nansum(n_group * (group_mean - grand_mean) ** 2, axis=0)
+        ss_resid_between = k * (w * (subject_mean - subject_group_mean) ** 2).sum(axis=0)
+        # 被験者内の層：水準 + 交互作用 + 残差
+        ss_within_subjects = (w[:, :, None] * (Y - subject_mean[:, :, None]) ** 2).sum(axis=(0, 2))
+        ss_time = n_total * ((cond_mean - grand_mean[:, None]) ** 2).sum(axis=1)
+        inter = cell_mean - group_mean[:, :, None] - cond_mean[None] + grand_mean[None, :, None]
+        ss_inter = np.nansum(n_group[:, :, None] * inter ** 2, axis=(0, 2))
+        ss_resid_within = ss_within_subjects - ss_time - ss_inter
+
+        n_groups = (n_group > 0).sum(axis=0)
+        df_between = n_groups - 1
+        df_resid_between = n_total - n_groups
+        df_time = k - 1
+        df_inter = df_time * df_between
+        df_resid_within = df_time * df_resid_between
+
+        ms = np.array([ss_between / df_between, ss_time / df_time, ss_inter / df_inter])
+        ms_error = np.array([ss_resid_between / df_resid_between, ss_resid_within / df_resid_within,
+                             ss_resid_within / df_resid_within])
+        ss = np.array([ss_between, ss_time, ss_inter])
+        ss_error = np.array([ss_resid_between, ss_resid_within, ss_resid_within])
+        df1 = np.array([df_between, np.full_like(n_total, df_time), df_inter])
+        df2 = np.array([df_resid_between, df_resid_within, df_resid_within])
+        fval = ms / ms_error
+        pval = stats.f.sf(fval, df1, df2)
+        np2 = ss / (ss + ss_error)
+
+    tables = []
+    for m in range(len(within_sets)):
+        if n_groups[m] < 2 or df_resid_between[m] < 1:
+            tables.append(None)
+            continue
+        X = Y[valid[:, m], m]
+        eps = sphericity_epsilon(X)[0] if k > 2 else 1.0
+        table = {
+            'Source': [between_col, within_name, 'Interaction'],
+            'SS': ss[:, m],
+            'DF1': df1[:, m].astype(np.int64),
+            'DF2': df2[:, m].astype(np.int64),
+            'MS': ms[:, m],
+            'F': fval[:, m],
+            'p-unc': pval[:, m],
+        }
+        if k > 2:
+            # 被験者内の主効果のみ Greenhouse-Geisser で補正
+            table['p-GG-corr'] = [np.nan, stats.f.sf(fval[1, m], df_time * eps, df_resid_within[m] * eps), np.nan]
+        table['np2'] = np2[:, m]
+        table['eps'] = [np.nan, eps, np.nan]
+        tables.append(pd.DataFrame(table))
+    return tables
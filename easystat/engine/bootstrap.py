@@ -0,0 +1,332 @@
+"""ブートストラップ信頼区間（効果量・重回帰分析）
+
+リサンプリングの添字はリサンプルの一部（チャンク）ずつ作り、各リサンプルを
+「各行が何回選ばれたか」の重み行列に変換する。統計量は重み付きの和（行列積）
+だけで求めるため、数千回分のリサンプルを全変数まとめて配列演算で計算できる。
+チャンクごとの乱数は SeedSequence から派生させるため、並列に計算しても結果は
+seed だけで決まる。信頼区間はパーセンタイル法と BCa 法（加速度はジャックナイフで
+推定）。
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from ..lazy import lazy_import
+from .regression import build_design
+
+special = lazy_import('scipy.special')
+
+METHODS = ('bca', 'percentile')
+
+# 一度に作る重み行列の要素数の上限（メモリ使用量の目安）
+_CHUNK_ELEMENTS = 1 << 22
+# ジャックナイフで1つずつ除く単位の数の上限（超える場合は行をまとめて除く）
+_JACKKNIFE_BLOCKS = 2000
+# BCa 法の偏り補正 z0 の絶対値がこれを超える場合はパーセンタイル法の区間を使う
+_MAX_BIAS = 3.0
+# 計算量（リサンプル数 × 行数 × 1行あたりの演算量）がこれ以上なら複数プロセスに分ける
+PARALLEL_MIN_WORK = 2e8
+
+
+def bootstrap_indices(strata: np.ndarray, n_boot: int, seed=None) -> np.ndarray:
+    """リサンプリングの添字行列（リサンプル数 × 行数）
+
+    strata は行ごとの層（群）の番号。層ごとに同じ件数を復元抽出するため、
+    群の大きさはリサンプルでも変わらない。seed は np.random.default_rng に渡せる値。
+    """
+    rng = np.random.default_rng(seed)
+    strata = np.asarray(strata)
+    idx = np.empty((n_boot, len(strata)), dtype=np.int64)
+    for stratum in np.unique(strata):
+        rows = np.flatnonzero(strata == stratum)
+        idx[:, rows] = rows[rng.integers(len(rows), size=(n_boot, len(rows)))]
+    return idx
+
+
+def _counts(idx: np.ndarray, n: int) -> np.ndarray:
+    """添字行列を、各行が選ばれた回数の重み行列に変換"""
+    b = idx.shape[0]
+    offset = (idx + np.arange(b)[:, None] * n).ravel()
+    return np.bincount(offset, minlength=b * n).reshape(b, n).astype(np.float64)
+
+
+def _bootstrap_chunk(statistic: Callable, data: tuple, strata: np.ndarray, size: int,
+                     seed: np.random.SeedSequence) -> np.ndarray:
+    # 添字はチャンクの分だけ作る（全リサンプルの添字行列は持たない）
+    return statistic(data, _counts(bootstrap_indices(strata, size, seed), len(strata)))
+
+
+def _jackknife_chunk(statistic: Callable, data: tuple, blocks: np.ndarray, start: int, stop: int) -> np.ndarray:
+    # ブロックを1つずつ除いた重み（除いた行は 0、それ以外は 1）
+    W = (blocks[None, :] != np.arange(start, stop)[:, None]).astype(np.float64)
+    return statistic(data, W)
+
+
+def _run_chunks(func, jobs: List[tuple], parallel: bool, max_workers: Optional[int]) -> np.ndarray:
+    if parallel and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            return np.concatenate(list(pool.map(func, *zip(*jobs))))
+    return np.concatenate([func(*job) for job in jobs])
+
+
+def percentile_interval(boot: np.ndarray, conf_level: float = 0.95) -> Tuple[np.ndarray, np.ndarray]:
+    """パーセンタイル法の信頼区間（boot はリサンプル × 統計量、欠損値は除く）"""
+    alpha = (1 - conf_level) / 2
+    with np.errstate(invalid='ignore'):
+        return np.nanquantile(boot, alpha, axis=0), np.nanquantile(boot, 1 - alpha, axis=0)
+
+
+def bca_interval(boot: np.ndarray, estimate: np.ndarray, jackknife: np.ndarray,
+                 conf_level: float = 0.95) -> Tuple[np.ndarray, np.ndarray]:
+    """BCa 法の信頼区間
+
+    偏り補正 z0 は推定値を下回るリサンプルの割合（同値は半分と数える）から、
+    加速度 a はジャックナイフ値の歪みから求める（scipy.stats.bootstrap と同じ式）。
+    z0 が求まらないか極端な場合（|z0| > _MAX_BIAS）や、補正後の区間が推定値を
+    含まない場合は、その統計量についてはパーセンタイル法の区間を返す。
+    """
+    alpha = (1 - conf_level) / 2
+    finite = np.isfinite(boot)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        below = ((boot < estimate) & finite).sum(axis=0) + ((boot <= estimate) & finite).sum(axis=0)
+        z0 = special.ndtri(below / (2 * finite.sum(axis=0)))
+        dev = np.nanmean(jackknife, axis=0) - jackknife
+        a = np.nansum(dev ** 3, axis=0) / (6 * np.nansum(dev ** 2, axis=0) ** 1.5)
+        bounds = []
+        for z_alpha in special.ndtri([alpha, 1 - alpha]):
+            adjusted = special.ndtr(z0 + (z0 + z_alpha) / (1 - a * (z0 + z_alpha)))
+            bounds.append(adjusted)
+    lower, upper = percentile_interval(boot, conf_level)
+    for j in range(boot.shape[1]):
+        values = boot[finite[:, j], j]
+        if len(values) == 0 or not abs(z0[j]) <= _MAX_BIAS \
+                or not (np.isfinite(bounds[0][j]) and np.isfinite(bounds[1][j])):
+            continue
+        lo, hi = np.quantile(values, [bounds[0][j], bounds[1][j]])
+        # 推定値を含まない区間は補正が不安定なため採用しない
+        if np.isnan(estimate[j]) or lo <= estimate[j] <= hi:
+            lower[j], upper[j] = lo, hi
+    return lower, upper
+
+
+def bootstrap_table(
+    statistic: Callable,
+    data: tuple,
+    strata: np.ndarray,
+    names: Sequence[str],
+    n_boot: int = 2000,
+    method: str = 'bca',
+    conf_level: float = 0.95,
+    seed=None,
+    max_workers: Optional[int] = None,
+    cost: float = 1.0,
+) -> pd.DataFrame:
+    """重み付き統計量 statistic(data, W) → (重みの数 × 統計量の数) のブートストラップ信頼区間
+
+    W は各行の重み（リサンプルで選ばれた回数）を並べた行列。列は 推定値・SE・
+    信頼区間の下限と上限。cost は1行あたりの演算量の目安で、総計算量が
+    PARALLEL_MIN_WORK 以上かつ複数の CPU が使える場合はプロセスプールで分担する。
+    """
+    if method not in METHODS:
+        raise ValueError(f"未対応の信頼区間の方法です: {method}")
+    n = len(strata)
+    estimate = statistic(data, np.ones((1, n)))[0]
+    workers = max_workers or os.cpu_count() or 1
+    parallel = workers > 1 and n_boot * n * cost >= PARALLEL_MIN_WORK
+    step = max(1, _CHUNK_ELEMENTS // max(n, 1))
+
+    # チャンクごとに乱数の系列を派生させ、添字はチャンクの中で作る
+    sizes = [min(step, n_boot - start) for start in range(0, n_boot, step)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(statistic, data, strata, size, child) for size, child in zip(sizes, seeds)]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        boot = _run_chunks(_bootstrap_chunk, jobs, parallel, workers)
+
+    level = f'{conf_level * 100:g}%'
+    if method == 'bca':
+        # 行数が多い場合は行をブロックにまとめて除くジャックナイフで加速度を近似する
+        n_blocks = min(n, _JACKKNIFE_BLOCKS)
+        blocks = np.arange(n) * n_blocks // n
+        jobs = [(statistic, data, blocks, start, min(start + step, n_blocks))
+                for start in range(0, n_blocks, step)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            jackknife = _run_chunks(_jackknife_chunk, jobs, parallel, workers)
+        lower, upper = bca_interval(boot, estimate, jackknife, conf_level)
+    else:
+        lower, upper = percentile_interval(boot, conf_level)
+    with np.errstate(invalid='ignore'):
+        se = np.nanstd(np.where(np.isfinite(boot), boot, np.nan), axis=0, ddof=1)
+    return pd.DataFrame({
+        '推定値': estimate,
+        'SE': se,
+        f'{level}CI下限': lower,
+        f'{level}CI上限': upper,
+    }, index=list(names))
+
+
+def _group_codes(df: pd.DataFrame, group_col: str, groups: Sequence) -> np.ndarray:
+    """行ごとの群の番号（groups に含まれない行は -1）"""
+    return pd.Categorical(df[group_col], categories=list(groups)).codes
+
+
+def _moment_data(X: np.ndarray, codes: np.ndarray, k: int) -> tuple:
+    """群の番号と、群ごとの平均からの偏差（欠損は 0）・二乗偏差・有効フラグ"""
+    valid = ~np.isnan(X)
+    base = np.zeros((k, X.shape[1]))
+    for g in range(k):
+        rows = codes == g
+        with np.errstate(invalid='ignore', divide='ignore'):
+            base[g] = np.where(valid[rows], X[rows], 0.0).sum(axis=0) / valid[rows].sum(axis=0)
+    # 元の群平均を引いておくと、重み付きの和から偏差平方和を求めても桁落ちしにくい
+    dev = np.where(valid, X - base[codes], 0.0)
+    return codes, k, base, dev, dev * dev, valid.astype(np.float64)
+
+
+def _weighted_group_moments(data: tuple, W: np.ndarray):
+    """重み付きの群ごとの件数・平均・偏差平方和（形は 群 × 重み × 変数）"""
+    codes, k, base, dev, dev2, valid = data
+    shape = (k, W.shape[0], dev.shape[1])
+    n, mean, m2 = np.empty(shape), np.empty(shape), np.empty(shape)
+    for g in range(k):
+        rows = codes == g
+        Wg = W[:, rows]
+        n[g] = Wg @ valid[rows]
+        s1 = Wg @ dev[rows]
+        mean[g] = base[g] + s1 / n[g]
+        m2[g] = Wg @ dev2[rows] - s1 * s1 / n[g]
+    return n, mean, m2
+
+
+def _cohen_d_ind(data: tuple, W: np.ndarray) -> np.ndarray:
+    # 符号付き（群0 − 群1）。絶対値にすると分布が 0 で折り返され、区間が 0 を含まなくなる
+    n, mean, m2 = _weighted_group_moments(data, W)
+    return (mean[0] - mean[1]) / np.sqrt((m2[0] + m2[1]) / (n[0] + n[1] - 2))
+
+
+def _eta_squared(data: tuple, W: np.ndarray) -> np.ndarray:
+    n, mean, m2 = _weighted_group_moments(data, W)
+    grand = np.nansum(n * mean, axis=0) / n.sum(axis=0)
+    ss_between = np.nansum(n * (mean - grand) ** 2, axis=0)
+    return ss_between / (ss_between + m2.sum(axis=0))
+
+
+def _cohen_d_rel(data: tuple, W: np.ndarray) -> np.ndarray:
+    _, _, base, dev, dev2, valid = data
+    n = W @ valid
+    s1 = W @ dev
+    mean = base[0] + s1 / n
+    var = (W @ dev2 - s1 * s1 / n) / (n - 1)
+    # 符号付き（観測 − 測定）
+    return mean / np.sqrt(var)
+
+
+def _fold_sign(table: pd.DataFrame) -> pd.DataFrame:
+    """符号付きの d の表を、推定値が 0 以上になる向きにそろえる
+
+    t 検定の結果表の d（絶対値）と同じ向きで表示するため、推定値が負の行は
+    推定値と区間の符号を反転し、下限と上限を入れ替える。
+    """
+    lower_col, upper_col = table.columns[2], table.columns[3]
+    negative = (table['推定値'] < 0).to_numpy()
+    lower, upper = table[lower_col].to_numpy(), table[upper_col].to_numpy()
+    table['推定値'] = np.where(negative, -table['推定値'], table['推定値'])
+    table[lower_col] = np.where(negative, -upper, lower)
+    table[upper_col] = np.where(negative, -lower, upper)
+    return table
+
+
+def _ols_statistics(data: tuple, W: np.ndarray) -> np.ndarray:
+    """重み付きの積和行列から R²・偏回帰係数・標準化係数を計算（列は R², b..., β...）"""
+    Z, products = data
+    q = Z.shape[1]
+    total = W.sum(axis=1)
+    s1 = W @ Z
+    # 中心化した積和行列（重み × q × q）
+    C = (W @ products).reshape(-1, q, q) - s1[:, :, None] * s1[:, None, :] / total[:, None, None]
+    Cxx, Cxy, Cyy = C[:, :-1, :-1], C[:, :-1, -1], C[:, -1, -1]
+    try:
+        beta = np.linalg.solve(Cxx, Cxy[:, :, None])[:, :, 0]
+    except np.linalg.LinAlgError:
+        # 一次従属なリサンプルが含まれる場合は擬似逆行列で解く
+        beta = (np.linalg.pinv(Cxx) @ Cxy[:, :, None])[:, :, 0]
+    rss = Cyy - (beta * Cxy).sum(axis=1)
+    r2 = 1 - rss / Cyy
+    standardized = beta * np.sqrt(np.diagonal(Cxx, axis1=1, axis2=2) / Cyy[:, None])
+    return np.column_stack([r2, beta, standardized])
+
+
+def _grouped_table(statistic: Callable, df: pd.DataFrame, group_col: str, value_cols: Sequence[str],
+                   groups: Sequence, cost: float, **kwargs) -> pd.DataFrame:
+    codes = _group_codes(df, group_col, groups)
+    keep = codes >= 0
+    X = df[list(value_cols)].to_numpy(dtype=np.float64, na_value=np.nan)[keep]
+    data = _moment_data(X, codes[keep], len(groups))
+    return bootstrap_table(statistic, data, codes[keep], value_cols, cost=cost, **kwargs)
+
+
+def bootstrap_d_ind(df: pd.DataFrame, group_col: str, value_cols: Sequence[str],
+                    groups: Optional[Sequence] = None, **kwargs) -> pd.DataFrame:
+    """対応なし t 検定の効果量 d（プールした標準偏差）の信頼区間
+
+    群ごとに復元抽出する。区間は符号付きの d で求め、推定値が正になる向きで
+    表示する（効果がなければ区間は 0 をまたぐ）。kwargs は bootstrap_table と同じ。
+    """
+    if groups is None:
+        groups = df[group_col].unique().tolist()
+    groups = list(groups)
+    if len(groups) != 2:
+        raise ValueError('独立変数が2群になっていません')
+    return _fold_sign(_grouped_table(_cohen_d_ind, df, group_col, value_cols, groups,
+                                     len(value_cols), **kwargs))
+
+
+def bootstrap_eta_squared(df: pd.DataFrame, group_col: str, value_cols: Sequence[str],
+                          groups: Optional[Sequence] = None, **kwargs) -> pd.DataFrame:
+    """一要因分散分析（対応なし）の効果量 η² の信頼区間（群ごとに復元抽出）"""
+    if groups is None:
+        groups = df[group_col].unique().tolist()
+    groups = [group for group in groups if not pd.isna(group)]
+    return _grouped_table(_eta_squared, df, group_col, value_cols, groups,
+                          len(groups) * len(value_cols), **kwargs)
+
+
+def bootstrap_d_rel(df: pd.DataFrame, pre_cols: Sequence[str], post_cols: Sequence[str],
+                    **kwargs) -> pd.DataFrame:
+    """対応あり t 検定の効果量 d（差の標準偏差）の信頼区間
+
+    被験者（行）を復元抽出し、ペアごとに両方がそろった行のみを使う。
+    区間は符号付きの d で求め、推定値が正になる向きで表示する。
+    """
+    pre_cols, post_cols = list(pre_cols), list(post_cols)
+    if len(pre_cols) != len(post_cols):
+        raise ValueError('観測変数と測定変数の数は同じでなければなりません')
+    diff = (df[pre_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+            - df[post_cols].to_numpy(dtype=np.float64, na_value=np.nan))
+    codes = np.zeros(len(diff), dtype=np.int64)
+    names = [f'{pre} → {post}' for pre, post in zip(pre_cols, post_cols)]
+    return _fold_sign(bootstrap_table(_cohen_d_rel, _moment_data(diff, codes, 1), codes, names,
+                                      cost=len(names), **kwargs))
+
+
+def bootstrap_ols(df: pd.DataFrame, x_cols: List[str], y_col: str,
+                  interactions: Optional[Sequence[Tuple[str, str, str]]] = None,
+                  **kwargs) -> pd.DataFrame:
+    """重回帰分析の R²・偏回帰係数・標準化係数の信頼区間
+
+    説明変数と目的変数がそろった行（リストワイズ削除）を復元抽出する。
+    行は R²・「変数（偏回帰係数）」・「変数（標準化係数）」の順。
+    """
+    X = build_design(df, x_cols, interactions)
+    names = list(X.columns)
+    data = pd.concat([X, df[y_col]], axis=1).dropna().to_numpy(dtype=np.float64)
+    if len(data) <= len(names) + 1:
+        raise ValueError('有効なデータの件数が説明変数の数に対して不足しています')
+    Z = data - data.mean(axis=0)
+    products = (Z[:, :, None] * Z[:, None, :]).reshape(len(Z), -1)
+    labels = (['R²'] + [f'{name}（偏回帰係数）' for name in names]
+              + [f'{name}（標準化係数）' for name in names])
+    return bootstrap_table(_ols_statistics, (Z, products), np.zeros(len(Z)), labels,
+                           cost=products.shape[1], **kwargs)
@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from ..lazy import lazy_import
+
+stats = lazy_import('scipy.stats')
+
+
+@dataclass
+class ChiSquareResult:
+    """カイ二乗検定の結果"""
+    chi2: float
+    p_value: float
+    dof: int
+    expected: pd.DataFrame  # 期待度数
+    contributions: pd.DataFrame  # (観測度数 - 期待度数)^2 / 期待度数
+    residuals: pd.DataFrame  # 標準化残差
+    significant: pd.DataFrame  # 残差が有意なセル（bool）
+
+
+def chi_square(crosstab: pd.DataFrame, alpha: float = 0.05) -> ChiSquareResult:
+    """クロス表に対するカイ二乗検定と残差分析"""
+    chi2, p_value, dof, expected = stats.chi2_contingency(crosstab)
+    expected_df = pd.DataFrame(expected, columns=crosstab.columns, index=crosstab.index)
+
+    residuals = (crosstab - expected_df) / np.sqrt(expected_df)
+    # 有意水準alphaでのz値の閾値
+    threshold = stats.norm.ppf(1 - alpha / 2)
+
+    return ChiSquareResult(
+        chi2=chi2,
+        p_value=p_value,
+        dof=dof,
+        expected=expected_df,
+        contributions=((crosstab - expected_df) ** 2) / expected_df,
+        residuals=residuals,
+        significant=residuals.abs() > threshold,
+    )
@@ -0,0 +1,205 @@
+"""文書-単語行列と共起ネットワーク
+
+形態素解析済みのコーパスから疎行列（CSR）の文書-単語行列を一度だけ作り、
+出現度数は列和、カテゴリ別の度数は指示行列との積、共起度数は二値化した
+行列の XᵀX として求める。
+"""
+import re
+from dataclasses import dataclass, field
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from ..cache import LRUCache
+from ..lazy import lazy_import
+from .network_layout import ITERATIONS, cached_network_layout
+
+sparse = lazy_import('scipy.sparse')
+nx = lazy_import('networkx')
+
+# WordCloud.process_text が単語を切り出すパターン（min_word_length が 1 以下の場合）
+_WORDCLOUD_PATTERN = re.compile(r"\w[\w']*")
+
+
+def _frequency_table(terms: List[str], counts: np.ndarray) -> pd.DataFrame:
+    """度数の降順（同数は列の順＝初出順）の度数表。度数 0 の単語は含めない"""
+    columns = np.flatnonzero(counts > 0)
+    order = columns[np.lexsort((columns, -counts[columns]))]
+    return pd.DataFrame({
+        '単語': pd.Series([terms[j] for j in order], dtype=object),
+        '度数': counts[order].astype(np.int64),
+    }, index=np.arange(len(order)))
+
+
+@dataclass
+class CooccurrenceNetwork:
+    """共起ネットワーク（ノードは辺を持つ単語のみ）"""
+    nodes: pd.DataFrame  # 単語・度数・次数・コミュニティ（初出順）
+    edges: pd.DataFrame  # 単語1・単語2・共起度数（共起度数の降順）
+    edge_index: np.ndarray  # 辺の両端のノード番号（nodes の行位置、辺 × 2）
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def to_networkx(self):
+        """ノード番号を頂点とする networkx のグラフ"""
+        G = nx.Graph()
+        G.add_nodes_from(range(len(self.nodes)))
+        G.add_edges_from(map(tuple, self.edge_index.tolist()))
+        return G
+
+    def layout(self, cache: Optional[LRUCache] = None, iterations: int = ITERATIONS, seed: int = 0) -> np.ndarray:
+        """ノードの配置（ノード × 2）。cache を渡すと同じ構造のグラフでは再計算しない"""
+        return cached_network_layout(len(self.nodes), self.edge_index, cache, iterations, seed)
+
+
+@dataclass
+class DocumentTermMatrix:
+    """文書 × 単語の出現回数の疎行列（列は初出順の単語）"""
+    matrix: Any  # scipy.sparse.csr_matrix
+    terms: List[str]
+    _columns: Dict[str, int] = field(default=None, init=False, repr=False)
+
+    @property
+    def n_documents(self) -> int:
+        return self.matrix.shape[0]
+
+    def column(self, term: str) -> int:
+        """単語の列番号（ない場合は -1）"""
+        if self._columns is None:
+            self._columns = {term: j for j, term in enumerate(self.terms)}
+        return self._columns.get(term, -1)
+
+    def take(self, rows: Sequence[int]) -> 'DocumentTermMatrix':
+        """指定した文書（位置）だけの行列（列はそのまま）"""
+        return DocumentTermMatrix(self.matrix[np.asarray(rows, dtype=np.int64)], self.terms)
+
+    def counts(self) -> np.ndarray:
+        """単語ごとの出現度数（列和）"""
+        return np.asarray(self.matrix.sum(axis=0)).ravel().astype(np.int64)
+
+    def frequencies(self) -> pd.DataFrame:
+        """出現度数表（度数の降順、同数は初出順）"""
+        return _frequency_table(self.terms, self.counts())
+
+    def group_frequencies(self, labels: Iterable) -> Dict[Any, pd.DataFrame]:
+        """文書のラベル（欠損は除外）ごとの出現度数表
+
+        ラベルの指示行列（ラベル × 文書）と文書-単語行列の積で全ラベルを一度に集計する。
+        """
+        codes, uniques = pd.factorize(pd.Series(list(labels)), sort=True)
+        rows = np.flatnonzero(codes >= 0)
+        indicator = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int64), (codes[rows], rows)),
+            shape=(len(uniques), self.n_documents),
+        )
+        grouped = (indicator @ self.matrix).toarray()
+        return {label: _frequency_table(self.terms, grouped[g]) for g, label in enumerate(uniques)}
+
+    def stopwords(self, top_n: int = 10, min_freq: int = 5) -> List[str]:
+        """出現度数の上位 top_n 語と、度数が min_freq 以下の語（nlplot の get_stopword と同じ規則）"""
+        counts = self.counts()
+        table = _frequency_table(self.terms, counts)
+        common = table['単語'].head(top_n).tolist()
+        rare = [self.terms[j] for j in np.flatnonzero((counts > 0) & (counts <= min_freq))]
+        return list(dict.fromkeys(common + rare))
+
+    def cooccurrence(self, stopwords: Iterable[str] = (), min_edge_frequency: int = 1,
+                     max_edges: Optional[int] = None) -> CooccurrenceNetwork:
+        """同じ文書に現れた単語の組の共起ネットワーク
+
+        共起度数は単語を含む文書の数（二値化した行列 B の BᵀB）。stopwords を除き、
+        共起度数が min_edge_frequency より大きい組を辺とする。max_edges を指定すると
+        共起度数の上位（同数は初出順）の辺だけを残し、次数とコミュニティはその辺で求める。
+        """
+        counts = self.counts()
+        keep = counts > 0
+        for term in stopwords:
+            j = self.column(term)
+            if j >= 0:
+                keep[j] = False
+        columns = np.flatnonzero(keep)
+        B = self.matrix[:, columns].tocsr()
+        B.data = np.ones_like(B.data)
+        C = sparse.triu(B.T @ B, k=1).tocoo()
+        selected = C.data > min_edge_frequency
+        rows, cols, weights = C.row[selected], C.col[selected], C.data[selected]
+        order = np.lexsort((cols, rows, -weights))[:max_edges]
+        rows, cols, weights = rows[order], cols[order], weights[order]
+
+        nodes = np.unique(np.concatenate([rows, cols]))
+        edge_index = np.column_stack([np.searchsorted(nodes, rows), np.searchsorted(nodes, cols)])
+        node_columns = columns[nodes]
+        names = [self.terms[j] for j in node_columns]
+
+        network = CooccurrenceNetwork(
+            nodes=pd.DataFrame({
+                '単語': pd.Series(names, dtype=object),
+                '度数': counts[node_columns],
+                '次数': np.bincount(edge_index.ravel(), minlength=len(nodes)).astype(np.int64),
+                'コミュニティ': np.zeros(len(nodes), dtype=np.int64),
+            }),
+            edges=pd.DataFrame({
+                '単語1': pd.Series([names[i] for i in edge_index[:, 0]], dtype=object),
+                '単語2': pd.Series([names[i] for i in edge_index[:, 1]], dtype=object),
+                '共起度数': weights.astype(np.int64),
+            }),
+            edge_index=edge_index.astype(np.int64),
+        )
+        if len(edge_index):
+            # 貪欲法によるモジュラリティ最大化（大きいコミュニティから番号を付ける）
+            communities = nx.community.greedy_modularity_communities(network.to_networkx())
+            for number, members in enumerate(communities):
+                network.nodes.loc[sorted(members), 'コミュニティ'] = number
+        return network
+
+
+def wordcloud_frequencies(table: pd.DataFrame, stopwords: Iterable[str] = (),
+                          normalize_plurals: bool = True) -> Dict[str, int]:
+    """度数表（単語・度数）から WordCloud.generate_from_frequencies に渡す度数を作る
+
+    分かち書きを WordCloud.generate（collocations=False）に渡した場合と同じ度数になる。
+    \\w[\\w']* で切り出し、末尾の 's・数字だけの語・ストップワード（大文字小文字を
+    区別しない）を除いてから、wordcloud の process_tokens と同じ規則で大文字小文字の
+    表記ゆれと英語の複数形（末尾の s）をまとめる。代表の表記は度数の最も多いもの。
+    ただし度数が同じ表記の間では、WordCloud は文中で先に現れた表記を、ここでは
+    度数表で先に現れた表記を選ぶため、代表の表記が異なる場合がある（度数は同じ）。
+    """
+    stopwords = {word.lower() for word in stopwords}
+    # 小文字にした語 → 表記ごとの度数
+    cases: Dict[str, Dict[str, int]] = {}
+    for word, count in zip(table['単語'], table['度数']):
+        for part in _WORDCLOUD_PATTERN.findall(word):
+            if part.lower().endswith("'s"):
+                part = part[:-2]
+            if part.isdigit() or part.lower() in stopwords:
+                continue
+            case = cases.setdefault(part.lower(), {})
+            case[part] = case.get(part, 0) + int(count)
+    if normalize_plurals:
+        for key in list(cases):
+            if key.endswith('s') and not key.endswith('ss') and key[:-1] in cases:
+                singular = cases[key[:-1]]
+                for word, count in cases.pop(key).items():
+                    singular[word[:-1]] = singular.get(word[:-1], 0) + count
+    return {max(case.items(), key=itemgetter(1))[0]: sum(case.values()) for case in cases.values()}
+
+
+def document_term_matrix(corpus) -> DocumentTermMatrix:
+    """TokenizedCorpus の対象品詞の原形から文書-単語行列を作る"""
+    mask = corpus.target_mask()
+    ids = corpus.tokens[mask]
+    documents = np.repeat(np.arange(len(corpus), dtype=np.int64), np.diff(corpus.offsets))[mask]
+    unique, first, inverse = np.unique(ids, return_index=True, return_inverse=True)
+    # 列を初出順に並べる
+    order = np.argsort(first, kind='stable')
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    words = corpus.store.words
+    matrix = sparse.csr_matrix(
+        (np.ones(len(ids), dtype=np.int64), (documents, rank[inverse.ravel()])),
+        shape=(len(corpus), len(unique)),
+    )
+    return DocumentTermMatrix(matrix, [words[t] for t in unique[order]])
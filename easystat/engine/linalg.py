@@ -0,0 +1,55 @@
+"""線形モデルの共通計算
+
+計画行列を一度だけ分解し、複数の目的変数（列）をまとめて解く。
+"""
+import numpy as np
+from typing import List, Tuple
+
+# QR 分解の対角成分がこの比率より小さければ階数落ちとみなす
+RANK_TOL = 1e-10
+
+
+def lstsq_multi(X: np.ndarray, Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, int]:
+    """X（n × p）で Y（n × m）の全列を同時に最小二乗推定し、(係数, 残差, 階数) を返す
+
+    QR 分解を一度だけ行う。階数落ちの場合は特異値分解（最小ノルム解）に切り替える。
+    """
+    if X.shape[0] == 0 or X.shape[1] == 0:
+        return np.zeros((X.shape[1], Y.shape[1])), Y.copy(), 0
+    Q, R = np.linalg.qr(X)
+    diag = np.abs(np.diag(R))
+    if diag.min() > RANK_TOL * max(diag.max(), 1.0):
+        effects = Q.T @ Y
+        return np.linalg.solve(R, effects), Y - Q @ effects, X.shape[1]
+    beta, _, rank, _ = np.linalg.lstsq(X, Y, rcond=None)
+    return beta, Y - X @ beta, int(rank)
+
+
+def ols_fit(X: np.ndarray, Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, int, np.ndarray]:
+    """lstsq_multi に加えて (XᵀX)⁻¹ も返す（係数の標準誤差の計算用）
+
+    QR 分解の R から求め、階数落ちの場合は擬似逆行列を使う。
+    """
+    p = X.shape[1]
+    Q, R = np.linalg.qr(X)
+    diag = np.abs(np.diag(R))
+    if p and diag.min() > RANK_TOL * max(diag.max(), 1.0):
+        effects = Q.T @ Y
+        beta = np.linalg.solve(R, effects)
+        R_inv = np.linalg.solve(R, np.eye(p))
+        return beta, Y - Q @ effects, p, R_inv @ R_inv.T
+    beta, resid, rank = lstsq_multi(X, Y)
+    return beta, resid, rank, np.linalg.pinv(X.T @ X)
+
+
+def missing_patterns(valid: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """列ごとの有効行（n × m の真偽値）を欠損パターンでまとめ、(行マスク, 列番号) の一覧を返す
+
+    同じ行を使う目的変数は一度の分解でまとめて解ける。
+    """
+    if valid.shape[1] == 0:
+        return []
+    packed = np.packbits(valid, axis=0)
+    _, first, inverse = np.unique(packed.T, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    return [(valid[:, first[g]], np.flatnonzero(inverse == g)) for g in range(len(first))]
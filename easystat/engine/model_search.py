@@ -0,0 +1,286 @@
+"""重回帰分析のモデル探索（変数選択）
+
+前進選択・後退除去・ステップワイズ・総当たり（最良部分集合）で、
+AIC・BIC・自由度調整済み決定係数が最良となる説明変数の組を探す。
+中心化した積和行列に掃き出し（sweep）演算を行い、変数の追加・削除を
+係数の再推定なしに一変数ずつ更新する。
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Sequence, Tuple
+
+from .regression import build_design
+
+CRITERIA = ('aic', 'bic', 'adj_r2')
+METHODS = ('forward', 'backward', 'stepwise', 'exhaustive')
+
+# 総当たりで扱える候補の数の上限（2^上限 通りのモデル）
+MAX_EXHAUSTIVE_TERMS = 20
+# 候補がこの数以上なら総当たりを複数プロセスに分ける
+PARALLEL_MIN_TERMS = 14
+# 掃き出しの対角成分が元の値（その変数の中心化平方和）のこの比率以下の変数は、
+# ほかの変数と一次従属とみなして追加しない
+_SINGULAR_TOL = 1e-10
+# 総当たりで元の行列から作り直す間隔（モデル数）
+_RESET_INTERVAL = 4096
+
+
+@dataclass
+class ModelSearchResult:
+    """1つの目的変数に対するモデル探索の結果"""
+    target: str
+    method: str
+    criterion: str
+    selected: List[str]  # 選ばれた説明変数（候補の順）
+    n_obs: int
+    history: pd.DataFrame  # 逐次法は各ステップ、総当たりは上位のモデル
+
+
+def sweep(A: np.ndarray, k: int) -> None:
+    """積和行列 A の k 番目を掃き出す（その場で更新、同じ k で再度掃き出すと元に戻る）"""
+    pivot = A[k, k]
+    row = A[k].copy()
+    A -= np.outer(A[:, k], row) / pivot
+    A[k] = row / pivot
+    A[:, k] = row / pivot
+    A[k, k] = -1.0 / pivot
+
+
+def _scores(rss, k, n: int, tss: float):
+    """残差平方和と説明変数の数から AIC・BIC・自由度調整済み決定係数を計算
+
+    AIC・BIC は statsmodels と同じ定義（定数項を含むパラメータ数で罰則）。
+    """
+    rss = np.maximum(np.asarray(rss, dtype=np.float64), np.finfo(float).tiny)
+    k = np.asarray(k, dtype=np.float64)
+    llf = -n / 2 * (np.log(2 * np.pi * rss / n) + 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        adj_r2 = 1 - (rss / (n - k - 1)) / (tss / (n - 1))
+    return {
+        'aic': -2 * llf + 2 * (k + 1),
+        'bic': -2 * llf + np.log(n) * (k + 1),
+        'adj_r2': adj_r2,
+    }
+
+
+def _loss(criterion: str, rss, k, n: int, tss: float):
+    """小さいほど良い評価値（自由度調整済み決定係数は符号を反転）"""
+    value = _scores(rss, k, n, tss)[criterion]
+    return -value if criterion == 'adj_r2' else value
+
+
+def _cross_products(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """中心化した [X, y] の積和行列（定数項は常にモデルに含める）"""
+    Z = np.column_stack([X, y])
+    Z = Z - Z.mean(axis=0)
+    return Z.T @ Z
+
+
+def _stepwise(A: np.ndarray, n: int, criterion: str, allow_add: bool, allow_remove: bool,
+              start: Sequence[int], names: List[str]) -> Tuple[List[int], pd.DataFrame]:
+    """掃き出しで一変数ずつ追加・削除し、評価値が改善しなくなるまで続ける"""
+    p = A.shape[0] - 1
+    tss = A[p, p]
+    # 一次従属の判定は変数ごとに元の平方和と比べる（単位に依存しない）
+    tol = _SINGULAR_TOL * np.diag(A)[:p].copy()
+    in_model = np.zeros(p, dtype=bool)
+    for j in start:
+        if A[j, j] > tol[j]:
+            sweep(A, j)
+            in_model[j] = True
+
+    def record(step, action, term):
+        k = int(in_model.sum())
+        rss = A[p, p]
+        scores = _scores(rss, k, n, tss)
+        return {
+            'ステップ': step, '操作': action, '変数': term, '変数の数': k,
+            'AIC': float(scores['aic']), 'BIC': float(scores['bic']),
+            '調整済みR²': float(scores['adj_r2']), 'R²': float(1 - rss / tss),
+        }
+
+    history = [record(0, '開始', '')]
+    current = _loss(criterion, A[p, p], in_model.sum(), n, tss)
+    step = 0
+    while True:
+        diag = np.diag(A)[:p]
+        cross = A[:p, p]
+        k = in_model.sum()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # 追加: 残差平方和は a_jy² / a_jj だけ減る
+            add_rss = np.where(~in_model & (diag > tol), A[p, p] - cross ** 2 / diag, np.nan)
+            # 削除: 掃き出し済みの a_jj = -[(XᵀX)⁻¹]_jj、a_jy = β_j なので β_j² / [(XᵀX)⁻¹]_jj だけ増える
+            remove_rss = np.where(in_model, A[p, p] + cross ** 2 / -diag, np.nan)
+        candidates = []
+        if allow_add and np.isfinite(add_rss).any():
+            losses = _loss(criterion, add_rss, k + 1, n, tss)
+            j = int(np.nanargmin(losses))
+            candidates.append((losses[j], j, '追加'))
+        if allow_remove and np.isfinite(remove_rss).any():
+            losses = _loss(criterion, remove_rss, k - 1, n, tss)
+            j = int(np.nanargmin(losses))
+            candidates.append((losses[j], j, '削除'))
+        if not candidates:
+            break
+        loss, j, action = min(candidates)
+        if not loss < current - 1e-12:
+            break
+        sweep(A, j)
+        in_model[j] = not in_model[j]
+        current = loss
+        step += 1
+        history.append(record(step, action, names[j]))
+    return [j for j in range(p) if in_model[j]], pd.DataFrame(history)
+
+
+def _gray_search(A: np.ndarray, n: int, criterion: str, fixed: Sequence[int], free: Sequence[int],
+                 top: int) -> List[Tuple[float, Tuple[int, ...], float]]:
+    """fixed を含み free の全部分集合を加えたモデルを Gray 符号順に評価
+
+    隣り合うモデルは1変数だけ異なるため、1回の掃き出しで次のモデルに移れる。
+    戻り値は評価値の良い順の (評価値, 変数番号の組, 残差平方和)。
+    """
+    original = A
+    p = A.shape[0] - 1
+    tss = A[p, p]
+    tol = _SINGULAR_TOL * np.diag(original)[:p]
+    in_model = np.zeros(p, dtype=bool)
+    skipped = np.zeros(p, dtype=bool)  # 一次従属のため掃き出さずに含めたことにした変数
+
+    def reset():
+        # 掃き出しの繰り返しによる丸め誤差をためないよう、元の行列から作り直す
+        fresh = original.copy()
+        for j in np.flatnonzero(in_model):
+            if fresh[j, j] <= tol[j]:
+                in_model[j] = False
+                skipped[j] = True
+            else:
+                sweep(fresh, j)
+        return fresh
+
+    in_model[list(fixed)] = True
+    A = reset()
+
+    best: List[Tuple[float, Tuple[int, ...], float]] = []
+    # モデル数が多いため、評価値は配列を使わずスカラーで計算する
+    penalty = {'aic': 2.0, 'bic': math.log(n)}.get(criterion)
+    const = n * (math.log(2 * math.pi / n) + 1)
+
+    def consider():
+        if skipped.any():
+            return
+        k = int(in_model.sum())
+        rss = max(float(A[p, p]), np.finfo(float).tiny)
+        if penalty is None:
+            loss = -(1 - (rss / (n - k - 1)) / (tss / (n - 1))) if n - k - 1 > 0 else math.nan
+        else:
+            loss = n * math.log(rss) + const + penalty * (k + 1)
+        if math.isfinite(loss) and (len(best) < top or loss < best[-1][0]):
+            best.append((loss, tuple(np.flatnonzero(in_model)), float(rss)))
+            best.sort(key=lambda item: item[0])
+            del best[top:]
+
+    consider()
+    free = list(free)
+    for i in range(1, 2 ** len(free)):
+        # i 番目の Gray 符号で反転するビット
+        j = free[(i & -i).bit_length() - 1]
+        if skipped[j]:
+            skipped[j] = False
+        elif not in_model[j] and A[j, j] <= tol[j]:
+            # 一次従属な変数を含む部分集合は評価しない
+            skipped[j] = True
+            continue
+        else:
+            sweep(A, j)
+            in_model[j] = not in_model[j]
+        if i % _RESET_INTERVAL == 0:
+            A = reset()
+        consider()
+    return best
+
+
+def _gray_search_job(args):
+    return _gray_search(*args)
+
+
+def _exhaustive(A: np.ndarray, n: int, criterion: str, names: List[str], top: int,
+                max_workers: Optional[int]) -> Tuple[List[int], pd.DataFrame]:
+    """総当たり（最良部分集合）。候補が多い場合は先頭の変数の有無で分割して並列に評価"""
+    p = A.shape[0] - 1
+    if p > MAX_EXHAUSTIVE_TERMS:
+        raise ValueError(f'総当たりで扱える説明変数は{MAX_EXHAUSTIVE_TERMS}個までです（{p}個）')
+    tss = A[p, p]
+    workers = max_workers or os.cpu_count() or 1
+    if p >= PARALLEL_MIN_TERMS and workers > 1:
+        split = min(p - 1, max(1, (workers - 1).bit_length() + 1))
+        jobs = []
+        for mask in range(2 ** split):
+            fixed = [j for j in range(split) if mask >> j & 1]
+            jobs.append((A, n, criterion, fixed, range(split, p), top))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_gray_search_job, jobs))
+        best = sorted((item for part in parts for item in part), key=lambda item: item[0])[:top]
+    else:
+        best = _gray_search(A, n, criterion, [], range(p), top)
+
+    rows = []
+    for rank, (_, terms, rss) in enumerate(best, start=1):
+        scores = _scores(rss, len(terms), n, tss)
+        rows.append({
+            '順位': rank, '変数': ', '.join(names[j] for j in terms), '変数の数': len(terms),
+            'AIC': float(scores['aic']), 'BIC': float(scores['bic']),
+            '調整済みR²': float(scores['adj_r2']), 'R²': float(1 - rss / tss),
+        })
+    selected = list(best[0][1]) if best else []
+    return selected, pd.DataFrame(rows)
+
+
+def model_search(
+    df: pd.DataFrame,
+    x_cols: List[str],
+    y_col: str,
+    interactions: Optional[Sequence[Tuple[str, str, str]]] = None,
+    method: str = 'stepwise',
+    criterion: str = 'aic',
+    top: int = 10,
+    max_workers: Optional[int] = None,
+) -> ModelSearchResult:
+    """説明変数（と交互作用項）の候補から最良のモデルを探す
+
+    method は 'forward'・'backward'・'stepwise'・'exhaustive'、
+    criterion は 'aic'・'bic'・'adj_r2'。定数項は常に含める。
+    欠損値は候補と目的変数のいずれかが欠けた行を除外する（リストワイズ削除）。
+    """
+    if method not in METHODS:
+        raise ValueError(f"未対応の探索方法です: {method}")
+    if criterion not in CRITERIA:
+        raise ValueError(f"未対応の評価基準です: {criterion}")
+
+    X = build_design(df, x_cols, interactions)
+    names = list(X.columns)
+    data = pd.concat([X, df[y_col]], axis=1).dropna()
+    n = len(data)
+    if n <= len(names) + 1:
+        raise ValueError('有効なデータの件数が説明変数の数に対して不足しています')
+    A = _cross_products(data[names].to_numpy(dtype=np.float64), data[y_col].to_numpy(dtype=np.float64))
+
+    if method == 'exhaustive':
+        selected, history = _exhaustive(A, n, criterion, names, top, max_workers)
+    else:
+        start = range(len(names)) if method == 'backward' else []
+        selected, history = _stepwise(
+            A, n, criterion,
+            allow_add=method in ('forward', 'stepwise'),
+            allow_remove=method in ('backward', 'stepwise'),
+            start=start, names=names,
+        )
+    return ModelSearchResult(
+        target=y_col, method=method, criterion=criterion,
+        selected=[names[j] for j in selected], n_obs=n, history=history,
+    )
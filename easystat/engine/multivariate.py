@@ -0,0 +1,159 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from ..lazy import lazy_import
+
+stats = lazy_import('scipy.stats')
+
+
+# ==========================================
+# 因子分析
+# ==========================================
+
+@dataclass
+class FactorAnalysisResult:
+    """因子分析の結果"""
+    loadings: pd.DataFrame  # 因子負荷量と共通性（列: Factor1..FactorN, 共通性）
+    eigenvalues: np.ndarray
+    factor_corr: Optional[pd.DataFrame]
+    assignments: Dict[str, List[str]]  # 各因子に割り当てられた項目
+    final_loadings: pd.DataFrame  # 項目・因子番号・負荷量
+
+
+def sampling_adequacy(data: pd.DataFrame) -> Tuple[float, float, float]:
+    """KMO値とBartlettの球面性検定（カイ二乗値, p値）"""
+    from factor_analyzer.factor_analyzer import calculate_kmo, calculate_bartlett_sphericity
+
+    _, kmo_model = calculate_kmo(data)
+    chi_square_value, p_value = calculate_bartlett_sphericity(data)
+    return kmo_model, chi_square_value, p_value
+
+
+def factor_analysis(
+    data: pd.DataFrame,
+    n_factors: int,
+    method: str = 'ml',
+    rotation: Optional[str] = 'promax',
+    threshold: float = 0.4,
+) -> FactorAnalysisResult:
+    """因子分析を実行し、負荷量と項目の因子への割り当てを返す
+
+    各項目は絶対値が最大の因子に割り当て、その負荷量が threshold 未満なら割り当てない。
+    """
+    from factor_analyzer import FactorAnalyzer
+
+    fa = FactorAnalyzer(rotation=rotation, n_factors=n_factors, method=method)
+    fa.fit(data)
+
+    factor_names = [f'Factor{i+1}' for i in range(n_factors)]
+    loadings = pd.DataFrame(fa.loadings_, columns=factor_names, index=data.columns)
+    loadings['共通性'] = fa.get_communalities()
+
+    assignments = {name: [] for name in factor_names}
+    for idx in loadings.index:
+        factor_loadings = loadings.loc[idx, factor_names]
+        max_factor = factor_loadings.abs().idxmax()
+        if abs(factor_loadings[max_factor]) >= threshold:
+            assignments[max_factor].append(idx)
+
+    max_loading_info = [
+        {'項目': item, '因子番号': factor, '負荷量': loadings.loc[item, factor]}
+        for factor, items in assignments.items()
+        for item in items
+    ]
+    final_loadings = pd.DataFrame(max_loading_info, columns=['項目', '因子番号', '負荷量']).set_index('項目')
+
+    factor_corr = None
+    if hasattr(fa, 'corr_'):
+        factor_corr = pd.DataFrame(fa.corr_[:n_factors, :n_factors],
+                                   columns=factor_names, index=factor_names)
+
+    ev, _ = fa.get_eigenvalues()
+    return FactorAnalysisResult(
+        loadings=loadings,
+        eigenvalues=ev,
+        factor_corr=factor_corr,
+        assignments=assignments,
+        final_loadings=final_loadings,
+    )
+
+
+def ml_fit_indices(data: pd.DataFrame, result: FactorAnalysisResult) -> Dict[str, float]:
+    """最尤法の適合度指標（カイ二乗値・自由度・p値・RMSEA）"""
+    factor_names = [c for c in result.loadings.columns if c != '共通性']
+    p = data.shape[1]
+    n_factors = len(factor_names)
+    N_samples = len(data)
+
+    # サンプル相関行列 S とモデルが再現する相関行列 Σ_model
+    S = data.corr().values
+    Lambda = result.loadings[factor_names].values
+    Psi = np.diag(1 - result.loadings['共通性'].values)
+    Sigma_model = Lambda @ Lambda.T + Psi
+
+    det_Sigma_model = np.linalg.det(Sigma_model)
+    det_S = np.linalg.det(S)
+    if det_Sigma_model <= 0 or det_S <= 0:
+        raise ValueError("行列式が非正値です。標本サイズや変数の分散を確認してください。")
+
+    F_val = np.log(det_Sigma_model) + np.trace(np.linalg.inv(Sigma_model) @ S) - np.log(det_S) - p
+    chi_square = (N_samples - 1 - (2*p + 5)/6) * F_val
+    # 自由度：df = 0.5 * [(p - m)² - p - m]
+    df_model = 0.5 * ((p - n_factors)**2 - p - n_factors)
+    if df_model > 0:
+        p_value = 1 - stats.chi2.cdf(chi_square, df_model)
+        rmsea = np.sqrt(max(chi_square - df_model, 0) / (df_model * (N_samples - 1)))
+    else:
+        p_value = np.nan
+        rmsea = np.nan
+    return {'chi_square': chi_square, 'df': df_model, 'p_value': p_value, 'rmsea': rmsea}
+
+
+def cronbach_alpha(items: pd.DataFrame) -> float:
+    """標準化Cronbachのα（平均相関係数から算出）"""
+    n = items.shape[1]
+    if n <= 1:
+        return np.nan
+    corr_matrix = items.corr().values
+    mean_corr = (corr_matrix.sum() - n) / (n * (n-1))
+    return (n * mean_corr) / (1 + (n-1) * mean_corr)
+
+
+def factor_means(data: pd.DataFrame, assignments: Dict[str, List[str]]) -> pd.DataFrame:
+    """各因子に割り当てられた項目の平均値（列名: Factor1_mean など）"""
+    means = pd.DataFrame(index=data.index)
+    for factor, items in assignments.items():
+        means[f'{factor}_mean'] = data[items].mean(axis=1) if items else np.nan
+    return means
+
+
+# ==========================================
+# 主成分分析
+# ==========================================
+
+@dataclass
+class PCAResult:
+    """主成分分析の結果"""
+    explained_variance_ratio: np.ndarray
+    scores: pd.DataFrame  # 主成分得点（列: PC1..PCn）
+    loadings: pd.DataFrame  # 行: 変数、列: PC1..PCn
+
+
+def pca(data: pd.DataFrame, n_components: int) -> PCAResult:
+    """標準化したデータに対する主成分分析"""
+    from sklearn.decomposition import PCA
+    from sklearn.preprocessing import StandardScaler
+
+    scaled = StandardScaler().fit_transform(data)
+    model = PCA(n_components=n_components)
+    components = model.fit_transform(scaled)
+
+    pc_names = [f"PC{i+1}" for i in range(n_components)]
+    return PCAResult(
+        explained_variance_ratio=model.explained_variance_ratio_,
+        scores=pd.DataFrame(components, columns=pc_names),
+        loadings=pd.DataFrame(model.components_.T, index=data.columns, columns=pc_names),
+    )
@@ -0,0 +1,167 @@
+"""共起ネットワークの配置（力学モデル）
+
+Fruchterman-Reingold 法で、引力は辺ごと（疎）に計算する。斥力はノードが
+少なければ全ての組について、多ければ四分木の各階層の格子で遠くのマスを
+重心にまとめて近似する（Barnes-Hut 法）。配置はグラフの構造のハッシュを
+キーにキャッシュできる。
+"""
+import hashlib
+
+import numpy as np
+from typing import Optional
+
+from ..cache import LRUCache
+
+# 反復回数
+ITERATIONS = 50
+# ノード数がこれ以下なら斥力を全ての組で計算する
+EXACT_MAX_NODES = 200
+# 近似で格子を細かくするのは、1マスのノードがこの数以下になるまで
+LEAF_NODES = 8
+# 格子の階層の上限（ノードが重なっている場合に細分化を打ち切る）
+MAX_DEPTH = 24
+# 全ての組の斥力を一度に計算する行数（メモリ使用量の上限）
+_BLOCK_ROWS = 512
+# 距離の二乗の下限（重なったノードでの発散を防ぐ）
+_MIN_D2 = 1e-9
+
+
+def _accumulate(rows: np.ndarray, force: np.ndarray, n: int) -> np.ndarray:
+    """行ごとに力を合計（ノード × 2）"""
+    return np.column_stack([np.bincount(rows, force[:, 0], n), np.bincount(rows, force[:, 1], n)])
+
+
+def _attraction(xy: np.ndarray, edge_index: np.ndarray, k: float) -> np.ndarray:
+    """辺の両端を引き寄せる力（大きさ d² / k）"""
+    i, j = edge_index[:, 0], edge_index[:, 1]
+    delta = xy[i] - xy[j]
+    force = delta * (np.sqrt((delta ** 2).sum(axis=1)) / k)[:, None]
+    n = len(xy)
+    return _accumulate(j, force, n) - _accumulate(i, force, n)
+
+
+def _exact_repulsion(xy: np.ndarray, k2: float) -> np.ndarray:
+    """全てのノードの組の斥力（大きさ k² / d）"""
+    out = np.empty_like(xy)
+    for start in range(0, len(xy), _BLOCK_ROWS):
+        delta = xy[start:start + _BLOCK_ROWS, None, :] - xy[None, :, :]
+        d2 = np.maximum((delta ** 2).sum(axis=2), _MIN_D2)
+        out[start:start + _BLOCK_ROWS] = (delta * (k2 / d2)[..., None]).sum(axis=1)
+    return out
+
+
+def _cells(unit: np.ndarray, level: int):
+    """階層 level の格子でのマスの位置（ノード × 2）と、使われているマスの番号（昇順）・各ノードのマス"""
+    size = 2 ** level
+    cell = np.minimum((unit * size).astype(np.int64), size - 1)
+    occupied, inverse = np.unique(cell[:, 0] * size + cell[:, 1], return_inverse=True)
+    return cell, occupied, inverse.ravel()
+
+
+def _lookup(occupied: np.ndarray, ids: np.ndarray):
+    """マスの番号から occupied 内の位置と、ノードがあるかどうか"""
+    position = np.minimum(np.searchsorted(occupied, ids), len(occupied) - 1)
+    return position, occupied[position] == ids
+
+
+def _approx_repulsion(xy: np.ndarray, k2: float) -> np.ndarray:
+    """Barnes-Hut 法による斥力の近似
+
+    階層 l の格子では、親のマスに隣接するマス（自身を含む）の子のうち、
+    自身のマスに隣接しないものを重心と質量（ノード数）で近似する。
+    1マスのノードが LEAF_NODES 以下になる階層まで細かくし、最後の階層で
+    隣接するマスのノードとは組ごとに計算する。
+    """
+    n = len(xy)
+    lower = xy.min(axis=0)
+    extent = max(float((xy.max(axis=0) - lower).max()), 1e-12)
+    unit = (xy - lower) / extent
+    out = np.zeros_like(xy)
+
+    # 親の隣接マスの子は、親の位置 p に対して 2p - 2 〜 2p + 3
+    offsets = np.arange(-2, 4)
+    level = 1
+    while True:
+        level += 1
+        size = 2 ** level
+        cell, occupied, inverse = _cells(unit, level)
+        mass = np.bincount(inverse).astype(np.float64)
+        centroid = _accumulate(inverse, xy, len(occupied)) / mass[:, None]
+        base = cell // 2 * 2
+        gx = np.repeat(base[:, 0, None] + offsets, len(offsets), axis=1)
+        gy = np.tile(base[:, 1, None] + offsets, (1, len(offsets)))
+        far = (np.abs(gx - cell[:, 0, None]) > 1) | (np.abs(gy - cell[:, 1, None]) > 1)
+        valid = far & (gx >= 0) & (gx < size) & (gy >= 0) & (gy < size)
+        rows, slots = np.nonzero(valid)
+        target, found = _lookup(occupied, gx[rows, slots] * size + gy[rows, slots])
+        rows, target = rows[found], target[found]
+        delta = xy[rows] - centroid[target]
+        d2 = np.maximum((delta ** 2).sum(axis=1), _MIN_D2)
+        out += _accumulate(rows, delta * (k2 * mass[target] / d2)[:, None], n)
+        if mass.max() <= LEAF_NODES or level >= MAX_DEPTH:
+            break
+
+    order = np.argsort(inverse, kind='stable')
+    starts = np.searchsorted(inverse[order], np.arange(len(occupied)), side='left')
+    stops = np.searchsorted(inverse[order], np.arange(len(occupied)), side='right')
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            x, y = cell[:, 0] + dx, cell[:, 1] + dy
+            inside = (x >= 0) & (x < size) & (y >= 0) & (y < size)
+            neighbor, found = _lookup(occupied, x * size + y)
+            counts = np.where(inside & found, stops[neighbor] - starts[neighbor], 0)
+            i = np.repeat(np.arange(n), counts)
+            within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            j = order[np.repeat(starts[neighbor], counts) + within]
+            i, j = i[i != j], j[i != j]
+            delta = xy[i] - xy[j]
+            d2 = np.maximum((delta ** 2).sum(axis=1), _MIN_D2)
+            out += _accumulate(i, delta * (k2 / d2)[:, None], n)
+    return out
+
+
+def force_layout(n_nodes: int, edge_index: np.ndarray, iterations: int = ITERATIONS,
+                 seed: int = 0) -> np.ndarray:
+    """Fruchterman-Reingold 法による配置（ノード × 2、原点を中心に ±1 に収める）
+
+    初期配置は seed による乱数で、同じグラフと seed なら同じ配置になる。
+    """
+    if n_nodes <= 1:
+        return np.zeros((n_nodes, 2))
+    edge_index = np.asarray(edge_index, dtype=np.int64).reshape(-1, 2)
+    xy = np.random.default_rng(seed).random((n_nodes, 2))
+    k = np.sqrt(1.0 / n_nodes)
+    repulsion = _exact_repulsion if n_nodes <= EXACT_MAX_NODES else _approx_repulsion
+    # 1回に動かせる距離（温度）は反復ごとに線形に下げる
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        displacement = repulsion(xy, k * k) + _attraction(xy, edge_index, k)
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 0.01)
+        xy += displacement * (temperature / length)[:, None]
+        temperature -= cooling
+    xy -= xy.mean(axis=0)
+    scale = np.abs(xy).max()
+    return xy / scale if scale > 0 else xy
+
+
+def layout_key(n_nodes: int, edge_index: np.ndarray, iterations: int, seed: int) -> bytes:
+    """グラフの構造と配置の条件のハッシュ"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.array([n_nodes, iterations, seed], dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(edge_index, dtype=np.int64).tobytes())
+    return digest.digest()
+
+
+def cached_network_layout(n_nodes: int, edge_index: np.ndarray, cache: Optional[LRUCache] = None,
+                          iterations: int = ITERATIONS, seed: int = 0) -> np.ndarray:
+    """force_layout の配置（cache を渡すと同じグラフでは再計算しない）"""
+    key = layout_key(n_nodes, edge_index, iterations, seed)
+    if cache is not None:
+        xy = cache.get(key)
+        if xy is not None:
+            return xy
+    xy = force_layout(n_nodes, edge_index, iterations, seed)
+    if cache is not None:
+        cache.put(key, xy)
+    return xy
@@ -0,0 +1,254 @@
+"""並べ替え検定（パーミュテーション検定）
+
+群のラベル（対応ありの場合は差の符号）を並べ替えた行列をまとめて作り、
+群ごとの件数・和・二乗和を行列積で求めてから検定統計量を計算する。
+並べ替えの総数が少なければ全通りを調べる正確検定、多ければモンテカルロ法で
+近似し、p 値の信頼区間が有意水準の片側に収まった変数から打ち切る。
+"""
+import itertools
+import math
+
+import numpy as np
+import pandas as pd
+from typing import Callable, Optional, Sequence
+
+from ..lazy import lazy_import
+from .utils import significance_mark
+
+stats = lazy_import('scipy.stats')
+
+# 並べ替えの総数がこれ以下なら全通りを調べる（正確検定）
+EXACT_MAX = 20000
+# モンテカルロ法で一度に作る並べ替えの数
+BATCH_SIZE = 1000
+# 打ち切りの判定に使う p 値の信頼係数
+STOP_CONF_LEVEL = 0.99
+# 並べ替えた統計量が観測値以上かを判定するときの相対誤差（丸め誤差による取りこぼしを防ぐ）
+_REL_TOL = 1e-12
+
+
+def _pooled_data(X: np.ndarray):
+    """全体平均からの偏差（欠損は 0）・二乗偏差・有効フラグ"""
+    valid = ~np.isnan(X)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        base = np.where(valid, X, 0.0).sum(axis=0) / valid.sum(axis=0)
+    dev = np.where(valid, X - base, 0.0)
+    return dev, dev * dev, valid.astype(np.float64)
+
+
+def _group_sums(labels: np.ndarray, k: int, data):
+    """並べ替えたラベル（並べ替え × 行）ごとの群の件数・偏差の和・偏差平方和（群 × 並べ替え × 変数）"""
+    dev, dev2, valid = data
+    shape = (k, labels.shape[0], dev.shape[1])
+    n, s1, m2 = np.empty(shape), np.empty(shape), np.empty(shape)
+    for g in range(k):
+        indicator = (labels == g).astype(np.float64)
+        n[g] = indicator @ valid
+        s1[g] = indicator @ dev
+        m2[g] = indicator @ dev2 - s1[g] * s1[g] / n[g]
+    return n, s1 / n, m2
+
+
+def _welch_t(labels: np.ndarray, data) -> np.ndarray:
+    n, mean, m2 = _group_sums(labels, 2, data)
+    se = m2[0] / (n[0] - 1) / n[0] + m2[1] / (n[1] - 1) / n[1]
+    return np.abs(mean[0] - mean[1]) / np.sqrt(se)
+
+
+def _f_value(labels: np.ndarray, data, k: int) -> np.ndarray:
+    n, mean, m2 = _group_sums(labels, k, data)
+    N = n.sum(axis=0)
+    groups = (n > 0).sum(axis=0)
+    grand = np.nansum(n * mean, axis=0) / N
+    ss_between = np.nansum(n * (mean - grand) ** 2, axis=0)
+    return (ss_between / (groups - 1)) / (m2.sum(axis=0) / (N - groups))
+
+
+def _paired_t(signs: np.ndarray, data) -> np.ndarray:
+    # 差の符号を反転しても二乗和は変わらないため、変わるのは和だけ
+    D, D2, valid = data
+    n = valid.sum(axis=0)
+    mean = (signs @ D) / n
+    var = (D2.sum(axis=0) - n * mean * mean) / (n - 1)
+    return np.abs(mean) / np.sqrt(var / n)
+
+
+def _group_arrangements(codes: np.ndarray, k: int) -> np.ndarray:
+    """群の大きさを保った全てのラベルの並べ方（並べ方 × 行）"""
+    N = len(codes)
+    sizes = [int((codes == g).sum()) for g in range(k)]
+    rows = []
+
+    def assign(labels, remaining, g):
+        if g == k - 1:
+            labels[list(remaining)] = g
+            rows.append(labels.copy())
+            return
+        for chosen in itertools.combinations(remaining, sizes[g]):
+            labels[list(chosen)] = g
+            assign(labels, [r for r in remaining if r not in set(chosen)], g + 1)
+
+    assign(np.empty(N, dtype=np.int64), list(range(N)), 0)
+    return np.array(rows)
+
+
+def _log_n_arrangements(codes: np.ndarray, k: int) -> float:
+    """群の大きさを保ったラベルの並べ方の総数（多項係数）の対数"""
+    log_count = math.lgamma(len(codes) + 1)
+    for g in range(k):
+        log_count -= math.lgamma(int((codes == g).sum()) + 1)
+    return log_count
+
+
+def _p_interval(count: np.ndarray, total: np.ndarray, conf_level: float):
+    """モンテカルロ法の p 値の Clopper-Pearson 信頼区間"""
+    alpha = 1 - conf_level
+    with np.errstate(invalid='ignore'):
+        lower = np.where(count > 0, stats.beta.ppf(alpha / 2, count, total - count + 1), 0.0)
+        upper = np.where(count < total, stats.beta.ppf(1 - alpha / 2, count + 1, total - count), 1.0)
+    return lower, upper
+
+
+def permutation_test(
+    statistic: Callable[[np.ndarray], np.ndarray],
+    observed: np.ndarray,
+    draw: Callable[[np.random.Generator, int], np.ndarray],
+    arrangements: Optional[np.ndarray] = None,
+    n_perm: int = 10000,
+    alpha: float = 0.05,
+    early_stop: bool = True,
+    seed=None,
+):
+    """並べ替えの行列から統計量 statistic（並べ替え × 変数）を計算し、両側 p 値を求める
+
+    arrangements を与えた場合は全通りを調べる（正確検定）。それ以外は draw(rng, b) で
+    b 通りずつ並べ替えを作り、early_stop=True なら p 値の信頼区間が alpha を
+    含まなくなった変数から打ち切る。戻り値は (p 値, 並べ替え回数, 信頼区間の下限, 上限)。
+    """
+    m = len(observed)
+    threshold = observed * (1 - _REL_TOL)
+    if arrangements is not None:
+        count = np.zeros(m)
+        for start in range(0, len(arrangements), BATCH_SIZE):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                count += (statistic(arrangements[start:start + BATCH_SIZE]) >= threshold).sum(axis=0)
+        total = np.full(m, float(len(arrangements)))
+        p = count / total
+        return p, total, p, p
+
+    rng = np.random.default_rng(seed)
+    count = np.zeros(m)
+    total = np.zeros(m)
+    active = np.isfinite(observed)
+    while active.any() and total.max() < n_perm:
+        b = int(min(BATCH_SIZE, n_perm - total.max()))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = statistic(draw(rng, b))
+        count[active] += (values[:, active] >= threshold[active]).sum(axis=0)
+        total[active] += b
+        if early_stop:
+            lower, upper = _p_interval(count, total, STOP_CONF_LEVEL)
+            active &= ~((upper < alpha) | (lower > alpha))
+    # 観測したラベルも並べ替えの1つとして数える
+    p = (count + 1) / (total + 1)
+    lower, upper = _p_interval(count, total, STOP_CONF_LEVEL)
+    p[~np.isfinite(observed)] = np.nan
+    return p, total, lower, upper
+
+
+def _result_table(observed, name: str, result, index, exact: bool) -> pd.DataFrame:
+    p, total, lower, upper = result
+    level = f'{STOP_CONF_LEVEL * 100:g}%'
+    return pd.DataFrame({
+        name: observed,
+        '並べ替え回数': total.astype(np.int64),
+        '方法': '正確検定' if exact else 'モンテカルロ法',
+        'p（並べ替え）': p,
+        f'p の{level}CI下限': lower,
+        f'p の{level}CI上限': upper,
+        'sign': [significance_mark(value) for value in p],
+    }, index=index)
+
+
+def _grouped_test(statistic, name: str, df: pd.DataFrame, group_col: str, value_cols: Sequence[str],
+                  groups: Sequence, exact_max: int, **kwargs) -> pd.DataFrame:
+    k = len(groups)
+    codes = pd.Categorical(df[group_col], categories=list(groups)).codes
+    keep = codes >= 0
+    codes = codes[keep].astype(np.int64)
+    X = df[list(value_cols)].to_numpy(dtype=np.float64, na_value=np.nan)[keep]
+    data = _pooled_data(X)
+
+    def compute(labels):
+        return statistic(labels, data)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        observed = compute(codes[None, :])[0]
+    exact = _log_n_arrangements(codes, k) <= math.log(exact_max)
+    arrangements = _group_arrangements(codes, k) if exact else None
+    result = permutation_test(compute, observed, lambda rng, b: rng.permuted(np.tile(codes, (b, 1)), axis=1),
+                              arrangements, **kwargs)
+    return _result_table(observed, name, result, list(value_cols), exact)
+
+
+def permutation_ttest_ind(df: pd.DataFrame, group_col: str, value_cols: Sequence[str],
+                          groups: Optional[Sequence] = None, exact_max: int = EXACT_MAX,
+                          **kwargs) -> pd.DataFrame:
+    """対応なし t 検定（Welch の t）の並べ替え検定
+
+    群のラベルを並べ替える。kwargs は permutation_test の n_perm・alpha・early_stop・seed。
+    """
+    if groups is None:
+        groups = df[group_col].unique().tolist()
+    groups = list(groups)
+    if len(groups) != 2:
+        raise ValueError('独立変数が2群になっていません')
+    return _grouped_test(_welch_t, 't', df, group_col, value_cols, groups, exact_max, **kwargs)
+
+
+def permutation_anova_oneway(df: pd.DataFrame, group_col: str, value_cols: Sequence[str],
+                             groups: Optional[Sequence] = None, exact_max: int = EXACT_MAX,
+                             **kwargs) -> pd.DataFrame:
+    """一要因分散分析（対応なし）の F 値の並べ替え検定（群のラベルを並べ替える）"""
+    if groups is None:
+        groups = df[group_col].unique().tolist()
+    groups = [group for group in groups if not pd.isna(group)]
+    k = len(groups)
+    return _grouped_test(lambda labels, data: _f_value(labels, data, k), 'F',
+                         df, group_col, value_cols, groups, exact_max, **kwargs)
+
+
+def permutation_ttest_rel(df: pd.DataFrame, pre_cols: Sequence[str], post_cols: Sequence[str],
+                          exact_max: int = EXACT_MAX, **kwargs) -> pd.DataFrame:
+    """対応あり t 検定の並べ替え検定（被験者ごとに差の符号を入れ替える）
+
+    ペアごとに両方がそろった行のみを使う。
+    """
+    pre_cols, post_cols = list(pre_cols), list(post_cols)
+    if len(pre_cols) != len(post_cols):
+        raise ValueError('観測変数と測定変数の数は同じでなければなりません')
+    diff = (df[pre_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+            - df[post_cols].to_numpy(dtype=np.float64, na_value=np.nan))
+    valid = ~np.isnan(diff)
+    D = np.where(valid, diff, 0.0)
+    data = (D, D * D, valid.astype(np.float64))
+    # 全ての変数で欠損している行は符号を入れ替えても結果が変わらない
+    rows = valid.any(axis=1)
+    n = int(rows.sum())
+    data = tuple(array[rows] for array in data)
+
+    def compute(signs):
+        return _paired_t(signs, data)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        observed = compute(np.ones((1, n)))[0]
+    exact = n * math.log(2) <= math.log(exact_max)
+    arrangements = None
+    if exact:
+        # 全ての符号の組（行 i のビットが 1 なら符号を反転）
+        bits = (np.arange(2 ** n)[:, None] >> np.arange(n)) & 1
+        arrangements = 1.0 - 2.0 * bits
+    names = [f'{pre} → {post}' for pre, post in zip(pre_cols, post_cols)]
+    result = permutation_test(compute, observed, lambda rng, b: rng.choice([-1.0, 1.0], size=(b, n)),
+                              arrangements, **kwargs)
+    return _result_table(observed, 't', result, names, exact)
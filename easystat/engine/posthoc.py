@@ -0,0 +1,270 @@
+"""多重比較（Tukey HSD・Games-Howell・対応のある t 検定）
+
+分散分析で集計した群ごとの件数・平均・分散（GroupMoments）や
+被験者 × 条件の行列をそのまま使い、全ペアの比較を配列演算でまとめて計算する。
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+from typing import Optional, Sequence
+
+from ..lazy import lazy_import
+from .anova import GroupMoments, grouped_moments
+from .ttest import group_moments
+from .utils import significance_mark
+
+special = lazy_import('scipy.special')
+stats = lazy_import('scipy.stats')
+
+# スチューデント化範囲分布の数値積分の設定
+_Z_NODES = 96  # 標準正規変数の Gauss-Legendre 節点数（範囲 ±8）
+_S_NODES = 256  # 標準偏差の推定量の対数 log S の Gauss-Legendre 節点数
+_S_TAIL = 1e-16  # log S の積分範囲（S の分布の両側でこの確率を除く）
+_S_INF_DF = 1e5  # 自由度がこれを超えれば S = 1 とみなす（scipy と同じ）
+_RANGE_GRID = np.linspace(0.0, 16.0, 8001)  # 正規標本の範囲の分布関数を表にする点
+_CHUNK = 2048  # 一度に計算する統計量の数（メモリ使用量の上限）
+
+POSTHOC_COLUMNS = ['variable', 'group1', 'group2', 'meandiff', 'p-adj', 'lower', 'upper', 'reject']
+
+
+@functools.lru_cache(maxsize=64)
+def _range_cdf_table(k: float) -> np.ndarray:
+    """k 個の標準正規標本の範囲が w 未満となる確率 R_k(w) を _RANGE_GRID 上で計算"""
+    z, wz = np.polynomial.legendre.leggauss(_Z_NODES)
+    z, wz = 8.0 * z, 8.0 * wz * np.exp(-0.5 * (8.0 * z) ** 2) / np.sqrt(2 * np.pi)
+    inner = np.clip(special.ndtr(z)[None, :] - special.ndtr(z[None, :] - _RANGE_GRID[:, None]), 0.0, 1.0)
+    return np.clip(k * (inner ** (k - 1)) @ wz, 0.0, 1.0)
+
+
+def _scale_nodes(df: np.ndarray):
+    """S = √(χ²(df)/df) の節点と重み（行: 統計量、列: 節点）
+
+    log S で変数変換すると、自由度が小さく S が 0 付近に広がる場合でも
+    被積分関数がなめらかになり、上側確率の裾まで精度よく積分できる。
+    """
+    t, wt = np.polynomial.legendre.leggauss(_S_NODES)
+    # 節点の計算は重いため、自由度の異なる値ごとに一度だけ行う
+    udf, inverse = np.unique(df, return_inverse=True)
+    finite = udf <= _S_INF_DF
+    s, w = np.ones((len(udf), _S_NODES)), np.zeros((len(udf), _S_NODES))
+    w[~finite, 0] = 1.0
+    d = udf[finite, None]
+    lo = np.log(stats.chi.ppf(_S_TAIL, d) / np.sqrt(d))
+    hi = np.log(stats.chi.isf(_S_TAIL, d) / np.sqrt(d))
+    log_s = lo + (t[None, :] + 1) / 2 * (hi - lo)
+    s[finite] = np.exp(log_s)
+    # log S の密度 = S の密度 × S
+    w[finite] = wt / 2 * (hi - lo) * np.exp(stats.chi.logpdf(s[finite] * np.sqrt(d), d) + 0.5 * np.log(d) + log_s)
+    return s[inverse.ravel()], w[inverse.ravel()]
+
+
+def _studentized_range_upper(q: np.ndarray, k: np.ndarray, s: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """P(Q > q) = E[1 − R_k(q·S)]（R_k は表から線形補間）"""
+    r = np.empty(s.shape)
+    for kk in np.unique(k):
+        rows = k == kk
+        r[rows] = np.interp(q[rows, None] * s[rows], _RANGE_GRID, _range_cdf_table(float(kk)), right=1.0)
+    return ((1.0 - r) * w).sum(axis=1)
+
+
+def _prepare(q, k, df):
+    q, k, df = np.broadcast_arrays(
+        np.asarray(q, dtype=np.float64), np.asarray(k, dtype=np.float64),
+        np.asarray(df, dtype=np.float64))
+    return q.shape, q.ravel(), k.ravel(), df.ravel()
+
+
+def studentized_range_sf(q, k, df) -> np.ndarray:
+    """スチューデント化範囲分布の上側確率 P(Q > q)（配列で一括計算）
+
+    log S で変数変換し、Gauss-Legendre 求積で積分する。scipy.stats.studentized_range
+    との差は、上側確率 1e-3 以上・k ≤ 100 の範囲で相対 1e-4 以下。
+    """
+    shape, q, k, df = _prepare(q, k, df)
+    sf = np.full_like(q, np.nan)
+    ok = ~(np.isnan(q) | np.isnan(df) | (df <= 0) | (k < 2))
+    idx = np.flatnonzero(ok)
+    for start in range(0, len(idx), _CHUNK):
+        sl = idx[start:start + _CHUNK]
+        sf[sl] = np.clip(_studentized_range_upper(q[sl], k[sl], *_scale_nodes(df[sl])), 0.0, 1.0)
+    return sf.reshape(shape)
+
+
+def studentized_range_isf(p, k, df, tol: float = 1e-8) -> np.ndarray:
+    """上側確率が p となるスチューデント化範囲の値（同時信頼区間の臨界値）
+
+    (p, k, df) の組ごとに一度だけ、studentized_range_sf と同じ積分を二分法で解く。
+    """
+    shape, p, k, df = _prepare(p, k, df)
+    keys = np.column_stack([p, k, df])
+    ok = ~np.isnan(keys).any(axis=1) & (df > 0) & (k >= 2)
+    result = np.full_like(p, np.nan)
+    if not ok.any():
+        return result.reshape(shape)
+    uniq, inverse = np.unique(keys[ok], axis=0, return_inverse=True)
+    q_crit = np.empty(len(uniq))
+    for start in range(0, len(uniq), _CHUNK):
+        up, uk, udf = uniq[start:start + _CHUNK].T
+        s, w = _scale_nodes(udf)
+        lo, hi = np.zeros(len(up)), np.ones(len(up))
+        # 上限を広げて区間を確保してから二分法
+        while True:
+            above = _studentized_range_upper(hi, uk, s, w) > up
+            if not above.any() or hi.max() > 1e4:
+                break
+            hi = np.where(above, hi * 2, hi)
+        while (hi - lo).max() > tol:
+            mid = (lo + hi) / 2
+            above = _studentized_range_upper(mid, uk, s, w) > up
+            lo, hi = np.where(above, mid, lo), np.where(above, hi, mid)
+        q_crit[start:start + _CHUNK] = (lo + hi) / 2
+    result[ok] = q_crit[inverse.ravel()]
+    return result.reshape(shape)
+
+
+def _pairs(k: int):
+    i, j = np.triu_indices(k, 1)
+    return i, j
+
+
+def _pairwise_table(
+    moments: GroupMoments,
+    i: np.ndarray,
+    j: np.ndarray,
+    diff: np.ndarray,
+    se: np.ndarray,
+    dof: np.ndarray,
+    alpha: float,
+) -> pd.DataFrame:
+    """比較ごとの配列（変数数, ペア数）を縦長の結果表にまとめる"""
+    k = (moments.n > 0).sum(axis=0)
+    k_pairs = np.broadcast_to(k[:, None], diff.shape)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        qstat = np.abs(diff) / se
+    pval = studentized_range_sf(qstat, k_pairs, dof)
+    q_crit = studentized_range_isf(alpha, k_pairs, dof)
+    margin = q_crit * se
+    n_vars, n_pairs = diff.shape
+    groups = np.asarray(moments.groups, dtype=object)
+    return pd.DataFrame({
+        'variable': np.repeat(np.asarray(moments.columns, dtype=object), n_pairs),
+        'group1': np.tile(groups[i], n_vars),
+        'group2': np.tile(groups[j], n_vars),
+        'meandiff': diff.ravel(),
+        'p-adj': pval.ravel(),
+        'lower': (diff - margin).ravel(),
+        'upper': (diff + margin).ravel(),
+        'reject': (pval < alpha).ravel(),
+    }, columns=POSTHOC_COLUMNS)
+
+
+def tukey_hsd(moments: GroupMoments, alpha: float = 0.05) -> pd.DataFrame:
+    """Tukey HSD（Tukey-Kramer）による全ペアの多重比較
+
+    列は variable・group1・group2・meandiff（group2 − group1）・p-adj・
+    lower・upper（同時信頼区間）・reject。群内分散は変数ごとに全群で併合する。
+    """
+    n, mean = moments.n, moments.mean
+    i, j = _pairs(len(moments.groups))
+    N = n.sum(axis=0)
+    k = (n > 0).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dof = N - k
+        ms_within = moments.m2.sum(axis=0) / dof
+        diff = (mean[j] - mean[i]).T
+        se = np.sqrt(ms_within[:, None] / 2 * (1 / n[i] + 1 / n[j]).T)
+    return _pairwise_table(moments, i, j, diff, se, np.broadcast_to(dof[:, None], diff.shape), alpha)
+
+
+def games_howell(moments: GroupMoments, alpha: float = 0.05) -> pd.DataFrame:
+    """Games-Howell 法による全ペアの多重比較（等分散を仮定しない）
+
+    列は tukey_hsd と同じ。自由度はペアごとに Welch の近似で求める。
+    """
+    n, mean, var = moments.n, moments.mean, moments.var
+    i, j = _pairs(len(moments.groups))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vi, vj = (var[i] / n[i]).T, (var[j] / n[j]).T
+        diff = (mean[j] - mean[i]).T
+        se = np.sqrt((vi + vj) / 2)
+        dof = (vi + vj) ** 2 / (vi ** 2 / (n[i].T - 1) + vj ** 2 / (n[j].T - 1))
+    return _pairwise_table(moments, i, j, diff, se, dof, alpha)
+
+
+def posthoc_table(
+    df: pd.DataFrame,
+    group_col: str,
+    value_cols: Sequence[str],
+    groups: Optional[Sequence] = None,
+    method: str = 'tukey',
+    alpha: float = 0.05,
+) -> pd.DataFrame:
+    """データフレームから直接多重比較を行う（method は 'tukey' または 'games-howell'）
+
+    groups を省略した場合は statsmodels と同じく群を昇順に並べる。
+    """
+    if groups is None:
+        groups = sorted(df[group_col].dropna().unique())
+    moments = grouped_moments(df, group_col, value_cols, groups)
+    if method == 'tukey':
+        return tukey_hsd(moments, alpha)
+    if method == 'games-howell':
+        return games_howell(moments, alpha)
+    raise ValueError(f"未対応の多重比較法です: {method}")
+
+
+def adjust_pvalues(pvals, method: str = 'bonferroni') -> np.ndarray:
+    """多重比較の p 値の補正（method は 'bonferroni' または 'holm'）
+
+    statsmodels の multipletests と同じ値を返す。欠損値は補正の対象から除く。
+    """
+    pvals = np.asarray(pvals, dtype=np.float64)
+    adjusted = np.full_like(pvals, np.nan)
+    valid = ~np.isnan(pvals)
+    p = pvals[valid]
+    m = len(p)
+    if method == 'bonferroni':
+        adjusted[valid] = np.minimum(p * m, 1.0)
+    elif method == 'holm':
+        order = np.argsort(p)
+        # 小さい順に (m - 順位) 倍し、単調になるよう累積最大をとる
+        stepped = np.minimum(np.maximum.accumulate(p[order] * (m - np.arange(m))), 1.0)
+        result = np.empty(m)
+        result[order] = stepped
+        adjusted[valid] = result
+    else:
+        raise ValueError(f"未対応の補正方法です: {method}")
+    return adjusted
+
+
+def paired_pairwise_table(
+    wide: pd.DataFrame,
+    conditions: Optional[Sequence[str]] = None,
+    correction: str = 'bonferroni',
+) -> pd.DataFrame:
+    """被験者 × 条件の表から、全条件ペアの対応のある t 検定を一括で行う
+
+    列は Level1・Level2・t-stat・p-value・p-value (補正後)・判定。
+    条件の差の列を行列演算でまとめて作り、欠損値はペアごとに除外する。
+    """
+    if conditions is None:
+        conditions = list(wide.columns)
+    conditions = list(conditions)
+    X = wide[conditions].to_numpy(dtype=np.float64, na_value=np.nan)
+    i, j = _pairs(len(conditions))
+    # 全ペアの差（被験者 × ペア）
+    n, mean, var = group_moments(X[:, i] - X[:, j])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = mean / np.sqrt(var / n)
+        p = 2 * stats.t.sf(np.abs(t), n - 1)
+    p_adj = adjust_pvalues(p, correction)
+    names = np.asarray(conditions, dtype=object)
+    return pd.DataFrame({
+        'Level1': names[i],
+        'Level2': names[j],
+        't-stat': t,
+        'p-value': p,
+        'p-value (補正後)': p_adj,
+        '判定': [significance_mark(value) for value in p_adj],
+    })
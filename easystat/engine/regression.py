@@ -0,0 +1,121 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..lazy import lazy_import
+from .linalg import missing_patterns, ols_fit
+from .utils import significance_mark
+
+stats = lazy_import('scipy.stats')
+
+
+@dataclass
+class OLSResult:
+    """1つの目的変数に対する重回帰分析の結果"""
+    target: str
+    coefficients: pd.DataFrame  # 変数・偏回帰係数・標準化係数（・その標準誤差と信頼区間）・p値・Sign（定数項を除く）
+    intercept: float
+    r2: float
+    f_value: float
+    df_model: int
+    df_resid: int
+    f_pvalue: float
+    n_obs: int
+    params: pd.Series = field(repr=False)
+
+
+def build_design(
+    df: pd.DataFrame,
+    x_cols: List[str],
+    interactions: Optional[Sequence[Tuple[str, str, str]]] = None,
+) -> pd.DataFrame:
+    """説明変数と交互作用項（var1, var2, 名前）の積からなる計画行列を作成"""
+    X = df[x_cols].copy()
+    for var1, var2, name in interactions or []:
+        X[name] = df[var1] * df[var2]
+    return X
+
+
+def ols_multi(
+    df: pd.DataFrame,
+    x_cols: List[str],
+    y_cols: List[str],
+    interactions: Optional[Sequence[Tuple[str, str, str]]] = None,
+    standardized_ci: bool = False,
+    conf_level: float = 0.95,
+) -> Dict[str, OLSResult]:
+    """複数の目的変数に対する重回帰分析（目的変数ごとにリストワイズ削除）
+
+    計画行列の分解は欠損のパターンごとに一度だけ行い、同じ行を使う目的変数は
+    まとめて解く。有効なデータがない目的変数は結果に含めない。
+    標準化係数は偏回帰係数から b × SD_X / SD_Y として求め（交互作用項も同様）、
+    standardized_ci=True なら標準誤差と conf_level の信頼区間の列も加える。
+    """
+    X = build_design(df, x_cols, interactions)
+    names = list(X.columns)
+
+    X_values = X.to_numpy(dtype=np.float64, na_value=np.nan)
+    Y_values = df[list(y_cols)].to_numpy(dtype=np.float64, na_value=np.nan)
+    # 説明変数と目的変数の両方がそろった行（目的変数ごと）
+    valid = ~np.isnan(Y_values) & ~np.isnan(X_values).any(axis=1)[:, None]
+
+    results = {}
+    for rows, cols in missing_patterns(valid):
+        n = int(rows.sum())
+        if n == 0:
+            continue
+        Xr = X_values[rows]
+        Yr = Y_values[rows][:, cols]
+        design = np.column_stack([np.ones(n), Xr])
+
+        # 元のデータで回帰分析（偏回帰係数用）
+        beta, resid, rank, cov_unscaled = ols_fit(design, Yr)
+        df_resid = n - rank
+        df_model = rank - 1
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ssr = (resid * resid).sum(axis=0)
+            centered = Yr - Yr.mean(axis=0)
+            r2 = 1 - ssr / (centered * centered).sum(axis=0)
+            scale = ssr / df_resid
+            se = np.sqrt(np.outer(np.diag(cov_unscaled), scale))
+            pvalues = 2 * stats.t.sf(np.abs(beta / se), df_resid)
+            f_value = (r2 / df_model) / ((1 - r2) / df_resid)
+            f_pvalue = stats.f.sf(f_value, df_model, df_resid)
+
+        # 標準化係数（β × SD_X / SD_Y）とその標準誤差（標準偏差は固定とみなす）
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = Xr.std(axis=0, ddof=1)[:, None] / Yr.std(axis=0, ddof=1)
+            standardized = beta[1:] * ratio
+            standardized_se = se[1:] * ratio
+            margin = stats.t.ppf(0.5 + conf_level / 2, df_resid) * standardized_se
+
+        for j, col in enumerate(cols):
+            y_column = y_cols[col]
+            coefficients = pd.DataFrame({
+                '変数': names,
+                '偏回帰係数': beta[1:, j],
+                '標準化係数': standardized[:, j],
+            })
+            if standardized_ci:
+                level = f'{conf_level * 100:g}%'
+                coefficients['標準化係数SE'] = standardized_se[:, j]
+                coefficients[f'{level}CI下限'] = standardized[:, j] - margin[:, j]
+                coefficients[f'{level}CI上限'] = standardized[:, j] + margin[:, j]
+            coefficients['p値'] = pvalues[1:, j]
+            coefficients['Sign'] = coefficients['p値'].apply(significance_mark)
+
+            results[y_column] = OLSResult(
+                target=y_column,
+                coefficients=coefficients,
+                intercept=float(beta[0, j]),
+                r2=float(r2[j]),
+                f_value=float(f_value[j]),
+                df_model=int(df_model),
+                df_resid=int(df_resid),
+                f_pvalue=float(f_pvalue[j]),
+                n_obs=n,
+                params=pd.Series(beta[:, j], index=['const'] + names),
+            )
+    return {y_column: results[y_column] for y_column in y_cols if y_column in results}
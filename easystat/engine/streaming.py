@@ -0,0 +1,322 @@
+"""大容量CSVの分割読み込みと一括集計
+
+ファイル全体をメモリに読み込まず、チャンクごとに一度だけ走査して
+要約統計量を更新する。
+
+- 数値変数: 件数・平均・M2〜M4（Welford/Pébay の逐次更新）・最小値・最大値
+- 分位点: t-digest による近似
+- カテゴリ変数: 度数表（上限を超えたら上位のみ保持）
+- 可視化用: 一様な無作為抽出サンプル
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+
+# ==========================================
+# 数値変数のモーメント
+# ==========================================
+
+class MomentAccumulator:
+    """複数列の件数・平均・中心モーメント・最小値・最大値を逐次更新"""
+
+    def __init__(self, n_columns: int):
+        self.count = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.m3 = np.zeros(n_columns)
+        self.m4 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+
+    def update(self, X: np.ndarray) -> None:
+        """チャンク（行 × 列、欠損は NaN）を取り込む"""
+        valid = ~np.isnan(X)
+        nb = valid.sum(axis=0).astype(np.float64)
+        if not nb.any():
+            return
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_b = np.where(nb > 0, np.nansum(X, axis=0) / nb, 0.0)
+            d = np.where(valid, X - mean_b, 0.0)
+            d2 = d * d
+            m2_b = d2.sum(axis=0)
+            m3_b = (d2 * d).sum(axis=0)
+            m4_b = (d2 * d2).sum(axis=0)
+            self.min = np.fmin(self.min, np.nanmin(np.where(valid, X, np.inf), axis=0))
+            self.max = np.fmax(self.max, np.nanmax(np.where(valid, X, -np.inf), axis=0))
+
+            # Pébay の式で既存の集計とチャンクの集計を合成
+            na = self.count
+            n = na + nb
+            delta = mean_b - self.mean
+            safe_n = np.where(n > 0, n, 1.0)
+            self.m4 = (self.m4 + m4_b
+                       + delta**4 * na * nb * (na**2 - na * nb + nb**2) / safe_n**3
+                       + 6 * delta**2 * (na**2 * m2_b + nb**2 * self.m2) / safe_n**2
+                       + 4 * delta * (na * m3_b - nb * self.m3) / safe_n)
+            self.m3 = (self.m3 + m3_b
+                       + delta**3 * na * nb * (na - nb) / safe_n**2
+                       + 3 * delta * (na * m2_b - nb * self.m2) / safe_n)
+            self.m2 = self.m2 + m2_b + delta**2 * na * nb / safe_n
+            self.mean = self.mean + delta * nb / safe_n
+            self.count = n
+
+    def std(self) -> np.ndarray:
+        """不偏標準偏差"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+
+    def skewness(self) -> np.ndarray:
+        """歪度（pandas.Series.skew と同じ補正済み推定量）"""
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            g1 = np.sqrt(n) * self.m3 / self.m2**1.5
+            return np.where(n > 2, g1 * np.sqrt(n * (n - 1)) / (n - 2), np.nan)
+
+    def kurtosis(self) -> np.ndarray:
+        """尖度（pandas.Series.kurt と同じ補正済み推定量）"""
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            value = (n * (n + 1) * (n - 1) * self.m4 / ((n - 2) * (n - 3) * self.m2**2)
+                     - 3 * (n - 1)**2 / ((n - 2) * (n - 3)))
+            return np.where(n > 3, value, np.nan)
+
+
+# ==========================================
+# t-digest（分位点の近似）
+# ==========================================
+
+class TDigest:
+    """マージ型 t-digest
+
+    セントロイド（平均・重み）の数を compression 程度に抑えたまま分位点を
+    近似する。裾ほどセントロイドを細かく保つため、極端な分位点も精度が高い。
+    """
+
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def total_weight(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, values: np.ndarray) -> None:
+        """値をまとめて取り込む（NaN は無視）"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._merge(np.concatenate([self.means, values]),
+                    np.concatenate([self.weights, np.ones(values.size)]))
+
+    def _merge(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # 各点の累積位置（中点）を k1 スケール関数で写し、幅1の区間ごとにまとめる
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        bins = np.floor(k + self.compression / 4).astype(np.int64)
+        # 同じ区間でも値が連続する点だけを統合する
+        group = np.concatenate([[0], np.cumsum(bins[1:] != bins[:-1])])
+        w = np.bincount(group, weights=weights)
+        s = np.bincount(group, weights=means * weights)
+        self.weights = w
+        self.means = s / w
+
+    def quantile(self, q) -> np.ndarray:
+        """分位点（0〜1）の近似値"""
+        q = np.asarray(q, dtype=np.float64)
+        if self.weights.size == 0:
+            return np.full(q.shape, np.nan)
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        x = np.concatenate([[0.0], centers, [total]])
+        y = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(q * total, x, y)
+
+
+# ==========================================
+# カテゴリ変数の度数
+# ==========================================
+
+class CategoryCounter:
+    """カテゴリの度数を逐次集計（種類が上限を超えたら上位のみ保持）"""
+
+    def __init__(self, max_categories: int = 10000):
+        self.max_categories = max_categories
+        self.counts = pd.Series(dtype=np.float64)
+        self.count = 0
+        self.truncated = False
+
+    def update(self, series: pd.Series) -> None:
+        values = series.dropna()
+        self.count += len(values)
+        counts = values.value_counts()
+        if self.counts.empty:
+            self.counts = counts.astype(np.float64)
+        else:
+            self.counts = self.counts.add(counts, fill_value=0)
+        if len(self.counts) > self.max_categories:
+            self.counts = self.counts.nlargest(self.max_categories)
+            self.truncated = True
+
+    def value_counts(self) -> pd.Series:
+        return self.counts.sort_values(ascending=False, kind='mergesort').astype(np.int64)
+
+
+# ==========================================
+# データセット全体の集計
+# ==========================================
+
+PERCENTILES = (0.25, 0.5, 0.75)
+
+
+@dataclass
+class StreamingSummary:
+    """分割読み込みで得たデータセットの要約"""
+    columns: List[str]
+    numeric_columns: List[str]
+    categorical_columns: List[str]
+    moments: MomentAccumulator
+    digests: Dict[str, TDigest]
+    categories: Dict[str, CategoryCounter]
+    sample: pd.DataFrame  # 可視化用の無作為抽出サンプル
+    n_rows: int = 0
+    n_chunks: int = 0
+    invalid_counts: Dict[str, int] = field(default_factory=dict)  # 数値に変換できなかった値の数
+
+    def describe(self) -> pd.DataFrame:
+        """DataFrame.describe(include='all').T と同じ形式の要約統計量"""
+        rows = {}
+        std = self.moments.std()
+        for i, col in enumerate(self.numeric_columns):
+            count = self.moments.count[i]
+            quantiles = self.digests[col].quantile(PERCENTILES)
+            rows[col] = {
+                'count': count,
+                'mean': self.moments.mean[i] if count else np.nan,
+                'std': std[i],
+                'min': self.moments.min[i] if count else np.nan,
+                '25%': quantiles[0],
+                '50%': quantiles[1],
+                '75%': quantiles[2],
+                'max': self.moments.max[i] if count else np.nan,
+            }
+        for col in self.categorical_columns:
+            counts = self.categories[col].value_counts()
+            rows[col] = {
+                'count': self.categories[col].count,
+                'unique': len(counts),
+                'top': counts.index[0] if len(counts) else np.nan,
+                'freq': counts.iloc[0] if len(counts) else np.nan,
+            }
+        order = ['count', 'unique', 'top', 'freq', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+        table = pd.DataFrame.from_dict(rows, orient='index')
+        table = table.reindex(index=self.columns,
+                              columns=[c for c in order if c in table.columns])
+        return table
+
+    def column_stats(self, col: str) -> Dict[str, float]:
+        """数値変数1列の統計量（平均・中央値・標準偏差・四分位・歪度・尖度など）"""
+        i = self.numeric_columns.index(col)
+        q1, median, q3 = self.digests[col].quantile(PERCENTILES)
+        return {
+            'mean': self.moments.mean[i],
+            'median': median,
+            'std': self.moments.std()[i],
+            'min': self.moments.min[i],
+            'max': self.moments.max[i],
+            'q1': q1,
+            'q3': q3,
+            'skewness': self.moments.skewness()[i],
+            'kurtosis': self.moments.kurtosis()[i],
+        }
+
+
+def _is_numeric(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def summarize_csv(
+    source,
+    chunksize: int = 100_000,
+    sample_size: int = 20_000,
+    compression: float = 100,
+    max_categories: int = 10000,
+    seed: Optional[int] = 0,
+    **read_csv_kwargs,
+) -> StreamingSummary:
+    """CSVをチャンク単位で読み込み、一度の走査で要約統計量を集計
+
+    source はパスまたは先頭に戻せるファイルオブジェクト。最初のチャンクで
+    列の型（数値/カテゴリ）を決め、以降のチャンクの数値列で変換できない
+    値は欠損として数える。
+    """
+    # 先頭チャンクで列の型を推定
+    head = pd.read_csv(source, nrows=chunksize, **read_csv_kwargs)
+    columns = [str(c) for c in head.columns]
+    head.columns = columns
+    numeric_columns = [c for c in columns if _is_numeric(head[c])]
+    categorical_columns = [c for c in columns if c not in numeric_columns]
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+    summary = StreamingSummary(
+        columns=columns,
+        numeric_columns=numeric_columns,
+        categorical_columns=categorical_columns,
+        moments=MomentAccumulator(len(numeric_columns)),
+        digests={col: TDigest(compression) for col in numeric_columns},
+        categories={col: CategoryCounter(max_categories) for col in categorical_columns},
+        sample=head.iloc[:0],
+        invalid_counts={col: 0 for col in numeric_columns},
+    )
+
+    rng = np.random.default_rng(seed)
+    sample_keys = np.empty(0)
+    dtype = {col: object for col in categorical_columns}
+    reader = pd.read_csv(source, chunksize=chunksize, dtype=dtype, **read_csv_kwargs)
+    for chunk in reader:
+        chunk.columns = columns
+        # 数値列：変換できない値は欠損扱い
+        for col in numeric_columns:
+            if not _is_numeric(chunk[col]):
+                converted = pd.to_numeric(chunk[col], errors='coerce')
+                summary.invalid_counts[col] += int(converted.isna().sum() - chunk[col].isna().sum())
+                chunk[col] = converted
+
+        if numeric_columns:
+            X = chunk[numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            summary.moments.update(X)
+            for j, col in enumerate(numeric_columns):
+                summary.digests[col].update(X[:, j])
+        for col in categorical_columns:
+            summary.categories[col].update(chunk[col])
+
+        # 乱数キーの小さい順に sample_size 行を残す（一様な非復元抽出）
+        keys = rng.random(len(chunk))
+        pooled = pd.concat([summary.sample, chunk], ignore_index=True)
+        pooled_keys = np.concatenate([sample_keys, keys])
+        if len(pooled) > sample_size:
+            keep = np.sort(np.argpartition(pooled_keys, sample_size)[:sample_size])
+            pooled = pooled.iloc[keep].reset_index(drop=True)
+            pooled_keys = pooled_keys[keep]
+        summary.sample = pooled
+        sample_keys = pooled_keys
+
+        summary.n_rows += len(chunk)
+        summary.n_chunks += 1
+
+    # 数値列はサンプルでも数値型にそろえる
+    for col in numeric_columns:
+        summary.sample[col] = pd.to_numeric(summary.sample[col], errors='coerce')
+    return summary
@@ -0,0 +1,329 @@
+import csv
+import hashlib
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ..cache import LRUCache
+from .cooccurrence import DocumentTermMatrix, document_term_matrix
+
+# 抽出対象の品詞
+TARGET_POS = ("名詞", "動詞", "形容詞", "副詞")
+
+# 形態素解析器（MeCab は mecab-python3 と unidic-lite がある場合のみ）
+BACKENDS = ('janome', 'mecab')
+# 未解析の文書がこの数以上なら複数プロセスで解析する
+PARALLEL_MIN_DOCUMENTS = 2000
+# 1つのプロセスにまとめて渡す文書の数
+CHUNK_DOCUMENTS = 500
+
+_tokenizer = None
+_tagger = None
+_worker_analyzer = None
+
+
+def get_tokenizer():
+    """Janome の Tokenizer を取得（辞書の読み込みは一度だけ）"""
+    global _tokenizer
+    if _tokenizer is None:
+        from janome.tokenizer import Tokenizer
+        _tokenizer = Tokenizer()
+    return _tokenizer
+
+
+def extract_words(text, tokenizer=None) -> str:
+    """テキストから対象品詞の原形を抽出し、空白区切りで返す"""
+    if pd.isnull(text):
+        return ""
+    tokenizer = tokenizer or get_tokenizer()
+    return ' '.join(
+        token.base_form
+        for token in tokenizer.tokenize(text)
+        if token.part_of_speech.split(',')[0] in TARGET_POS
+    )
+
+
+def analyze(text: str, tokenizer=None) -> List[Tuple[str, str]]:
+    """テキストを形態素解析し、(原形, 品詞) の一覧を返す"""
+    tokenizer = tokenizer or get_tokenizer()
+    return [(token.base_form, token.part_of_speech) for token in tokenizer.tokenize(text)]
+
+
+def mecab_available() -> bool:
+    """MeCab（mecab-python3 と unidic-lite）が利用可能か"""
+    try:
+        import MeCab  # noqa: F401
+        import unidic_lite  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_tagger():
+    """MeCab の Tagger を取得（unidic-lite の辞書を使う、読み込みは一度だけ）"""
+    global _tagger
+    if _tagger is None:
+        import MeCab
+        import unidic_lite
+        _tagger = MeCab.Tagger(f'-d "{unidic_lite.DICDIR}"')
+    return _tagger
+
+
+def analyze_mecab(text: str, tagger=None) -> List[Tuple[str, str]]:
+    """MeCab で形態素解析し、(原形, 品詞) の一覧を返す
+
+    品詞は UniDic の品詞大分類〜小分類の4項目、原形は書字形の基本形（orthBase）。
+    """
+    tagger = tagger or get_tagger()
+    morphemes = []
+    node = tagger.parseToNode(text)
+    while node:
+        # 文頭・文末（BOS/EOS）の節点は除く
+        if node.stat not in (2, 3):
+            fields = next(csv.reader([node.feature]))
+            base_form = fields[10] if len(fields) > 10 and fields[10] not in ('', '*') else node.surface
+            morphemes.append((base_form, ','.join(fields[:4])))
+        node = node.next
+    return morphemes
+
+
+def _analyzer(backend: str) -> Callable[[str], List[Tuple[str, str]]]:
+    if backend == 'janome':
+        tokenizer = get_tokenizer()
+        return lambda text: analyze(text, tokenizer)
+    if backend == 'mecab':
+        tagger = get_tagger()
+        return lambda text: analyze_mecab(text, tagger)
+    raise ValueError(f"未対応の形態素解析器です: {backend}")
+
+
+def _init_worker(backend: str) -> None:
+    # 各プロセスで解析器を一度だけ作る
+    global _worker_analyzer
+    _worker_analyzer = _analyzer(backend)
+
+
+def _analyze_chunk(texts: List[str]) -> List[List[Tuple[str, str]]]:
+    return [_worker_analyzer(text) for text in texts]
+
+
+def iter_analyze(texts: Sequence[str], backend: str = 'janome',
+                 max_workers: Optional[int] = None) -> Iterator[List[Tuple[str, str]]]:
+    """テキストを順に形態素解析した結果を、入力と同じ順に1文書ずつ返す
+
+    文書が PARALLEL_MIN_DOCUMENTS 以上かつ複数の CPU が使える場合は、
+    CHUNK_DOCUMENTS 件ずつに分けてプロセスプールで解析する（解析器はプロセスごとに1つ）。
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"未対応の形態素解析器です: {backend}")
+    workers = max_workers or os.cpu_count() or 1
+    if workers > 1 and len(texts) >= PARALLEL_MIN_DOCUMENTS:
+        chunks = [list(texts[start:start + CHUNK_DOCUMENTS]) for start in range(0, len(texts), CHUNK_DOCUMENTS)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(backend,)) as pool:
+            # map は入力の順に結果を返すため、先頭のチャンクから順に受け取れる
+            for result in pool.map(_analyze_chunk, chunks):
+                yield from result
+    else:
+        analyzer = _analyzer(backend)
+        for text in texts:
+            yield analyzer(text)
+
+
+@dataclass
+class TokenizedCorpus:
+    """文書ごとの形態素（原形と品詞の番号）を連結した配列
+
+    文書 i の形態素は tokens[offsets[i]:offsets[i + 1]]。語彙と品詞の名前は
+    TokenStore と共有する。カテゴリ別の分析は take() で切り出して使う。
+    """
+    store: 'TokenStore' = field(repr=False)
+    offsets: np.ndarray  # 文書の区切り（文書数 + 1）
+    tokens: np.ndarray  # 原形の番号（int32）
+    pos: np.ndarray  # 品詞の番号（int16）
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def take(self, rows: Sequence[int]) -> 'TokenizedCorpus':
+        """指定した文書（位置）だけを指定の順に並べた部分コーパス"""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts, stops = self.offsets[rows], self.offsets[rows + 1]
+        lengths = stops - starts
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # 各形態素の元の位置 = 文書の先頭 + 文書内の位置
+        positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return TokenizedCorpus(self.store, offsets, self.tokens[positions], self.pos[positions])
+
+    def target_mask(self) -> np.ndarray:
+        """対象品詞（TARGET_POS）の形態素か"""
+        return self.store.target_pos()[self.pos]
+
+    def documents(self) -> List[List[str]]:
+        """文書ごとの対象品詞の原形の一覧"""
+        words = self.store.words
+        mask = self.target_mask()
+        return [
+            [words[t] for t in self.tokens[start:stop][mask[start:stop]]]
+            for start, stop in zip(self.offsets[:-1], self.offsets[1:])
+        ]
+
+    def joined(self) -> List[str]:
+        """文書ごとの空白区切りの分かち書き（extract_words と同じ形式）"""
+        return [' '.join(doc) for doc in self.documents()]
+
+    def total_tokens(self) -> int:
+        return int(self.target_mask().sum())
+
+    def matrix(self) -> DocumentTermMatrix:
+        """対象品詞の原形の文書-単語行列（疎行列）"""
+        return document_term_matrix(self)
+
+    def frequencies(self) -> pd.DataFrame:
+        """対象品詞の原形の出現度数表（度数の降順、同数は初出順）"""
+        return self.matrix().frequencies()
+
+
+class TokenStore:
+    """文書の形態素解析結果のキャッシュ
+
+    文書の内容のハッシュをキーに、原形と品詞の番号の配列を保持する。同じ文書は
+    再実行やカテゴリ別の分析でも一度しか解析しない。件数と合計サイズの上限を
+    超えると、最も長く使われていない文書から破棄する（語彙は保持する）。
+    """
+
+    def __init__(self, max_entries: int = 200_000, max_bytes: Optional[int] = 256 * 1024 * 1024):
+        self._cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+        self._lock = threading.RLock()
+        self.words: List[str] = []
+        self._word_ids: Dict[str, int] = {}
+        self.pos_names: List[str] = []
+        self._pos_ids: Dict[str, int] = {}
+        self._target = np.zeros(0, dtype=bool)
+        self.analyzed = 0  # 実際に形態素解析した文書の数
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @staticmethod
+    def key(text: str, backend: str = 'janome') -> bytes:
+        """文書のキー（形態素解析器ごとに別の結果として保持する）"""
+        return hashlib.blake2b(f'{backend}\0{text}'.encode('utf-8'), digest_size=16).digest()
+
+    def target_pos(self) -> np.ndarray:
+        """品詞の番号ごとに、対象品詞かどうか"""
+        with self._lock:
+            if len(self._target) < len(self.pos_names):
+                self._target = np.array(
+                    [name.split(',')[0] in TARGET_POS for name in self.pos_names], dtype=bool)
+            return self._target
+
+    def _word_id(self, word: str) -> int:
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = self._word_ids[word] = len(self.words)
+            self.words.append(word)
+        return word_id
+
+    def _pos_id(self, pos: str) -> int:
+        pos_id = self._pos_ids.get(pos)
+        if pos_id is None:
+            pos_id = self._pos_ids[pos] = len(self.pos_names)
+            self.pos_names.append(pos)
+        return pos_id
+
+    def _encode(self, morphemes: List[Tuple[str, str]]) -> Tuple[np.ndarray, np.ndarray]:
+        tokens, pos = [], []
+        with self._lock:
+            for base_form, part_of_speech in morphemes:
+                pos_id = self._pos_id(part_of_speech)
+                # 空白区切りで集計していた従来の結果と合わせるため、空白を含む原形は分割する
+                for word in base_form.split() if part_of_speech.split(',')[0] in TARGET_POS else [base_form]:
+                    tokens.append(self._word_id(word))
+                    pos.append(pos_id)
+        return np.array(tokens, dtype=np.int32), np.array(pos, dtype=np.int16)
+
+    def tokenize(self, texts: Iterable, backend: str = 'janome',
+                 max_workers: Optional[int] = None) -> TokenizedCorpus:
+        """テキストの列を形態素解析したコーパス（未解析の文書だけを解析する）
+
+        未解析の文書が多い場合は iter_analyze で複数プロセスに分けて解析する。
+        """
+        texts = list(texts)
+        keys = [None if pd.isnull(text) else self.key(str(text), backend) for text in texts]
+        entries = {}
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key is None or key in entries or key in missing:
+                continue
+            entry = self._cache.get(key)
+            if entry is None:
+                missing[key] = str(text)
+            else:
+                entries[key] = entry
+        if missing:
+            analyzed = iter_analyze(list(missing.values()), backend, max_workers)
+            for key, morphemes in zip(missing, analyzed):
+                entry = self._encode(morphemes)
+                entries[key] = entry
+                self._cache.put(key, entry, nbytes=entry[0].nbytes + entry[1].nbytes + 64)
+            self.analyzed += len(missing)
+
+        empty = (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int16))
+        docs = [empty if key is None else entries[key] for key in keys]
+        offsets = np.zeros(len(docs) + 1, dtype=np.int64)
+        np.cumsum([len(tokens) for tokens, _ in docs], out=offsets[1:])
+        tokens = np.concatenate([tokens for tokens, _ in docs]) if docs else empty[0]
+        pos = np.concatenate([pos for _, pos in docs]) if docs else empty[1]
+        return TokenizedCorpus(self, offsets, tokens, pos)
+
+
+def tokenize_texts(texts: Iterable, store: Optional[TokenStore] = None) -> pd.Series:
+    """テキスト列を分かち書き（対象品詞の原形のみ）"""
+    if not isinstance(texts, pd.Series):
+        texts = pd.Series(list(texts))
+    corpus = (store if store is not None else TokenStore()).tokenize(texts)
+    return pd.Series(corpus.joined(), index=texts.index, dtype=object)
+
+
+def word_frequencies(tokenized: Iterable[str]) -> pd.DataFrame:
+    """分かち書き済みテキストから単語の出現度数表（度数の降順）を作成"""
+    freq = Counter(' '.join(tokenized).split())
+    return pd.DataFrame(
+        freq.items(), columns=['単語', '度数']
+    ).sort_values(by='度数', ascending=False)
+
+
+@dataclass
+class TextMiningResult:
+    """テキストマイニングの集計結果"""
+    tokenized: pd.Series  # 文書ごとの分かち書き
+    total_tokens: int
+    frequencies: pd.DataFrame  # 単語・度数
+    corpus: Optional[TokenizedCorpus] = field(default=None, repr=False)  # カテゴリ別の切り出し用
+    matrix: Optional[DocumentTermMatrix] = field(default=None, repr=False)  # 文書-単語行列
+
+
+def text_mining(df: pd.DataFrame, text_col: str, store: Optional[TokenStore] = None,
+                backend: str = 'janome', max_workers: Optional[int] = None) -> TextMiningResult:
+    """記述変数を分かち書きし、総単語数と出現度数を集計
+
+    store を渡すと、解析済みの文書はその結果を再利用する。度数や共起は
+    一度だけ作る文書-単語行列（matrix）から求める。
+    """
+    store = store if store is not None else TokenStore()
+    corpus = store.tokenize(df[text_col], backend=backend, max_workers=max_workers)
+    matrix = corpus.matrix()
+    return TextMiningResult(
+        tokenized=pd.Series(corpus.joined(), index=df.index, dtype=object),
+        total_tokens=int(matrix.matrix.sum()),
+        frequencies=matrix.frequencies(),
+        corpus=corpus,
+        matrix=matrix,
+    )
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Sequence
+
+from ..lazy import lazy_import
+from .utils import significance_mark
+
+stats = lazy_import('scipy.stats')
+
+
+def group_moments(X: np.ndarray):
+    """欠損を除いた列ごとの件数・平均・不偏分散（行 × 列の配列）"""
+    valid = ~np.isnan(X)
+    n = valid.sum(axis=0).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(valid, X, 0.0).sum(axis=0) / n
+        dev = np.where(valid, X - mean, 0.0)
+        var = (dev * dev).sum(axis=0) / (n - 1)
+    return n, mean, var
+
+
+def welch_ttest(n0, mean0, var0, n1, mean1, var1):
+    """Welch の t 検定を列ごとに一括計算し、(t, 自由度, p値, 効果量d) を返す
+
+    効果量 d はプールした標準偏差で算出する。
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        se0 = var0 / n0
+        se1 = var1 / n1
+        t = (mean0 - mean1) / np.sqrt(se0 + se1)
+        # Welch–Satterthwaiteの式で自由度を計算
+        dof = (se0 + se1) ** 2 / (se0 ** 2 / (n0 - 1) + se1 ** 2 / (n1 - 1))
+        p = 2 * stats.t.sf(np.abs(t), dof)
+        pooled_std = np.sqrt(((n0 - 1) * var0 + (n1 - 1) * var1) / (n0 + n1 - 2))
+        d = np.abs(mean0 - mean1) / pooled_std
+    return t, dof, p, d
+
+
+def ttest_ind_table(
+    df: pd.DataFrame,
+    group_col: str,
+    value_cols: List[str],
+    groups: Optional[Sequence] = None,
+) -> pd.DataFrame:
+    """対応なしt検定（Welch）の結果表を作成
+
+    行は従属変数、列は 全体M・全体S.D・各群のM/S.D・df・t・p・sign・d。
+    群への分割は一度だけ行い、全変数を配列演算でまとめて計算する。
+    欠損値は変数ごとに除外する。
+    """
+    if groups is None:
+        groups = df[group_col].unique().tolist()
+    groups = list(groups)
+    if len(groups) != 2:
+        raise ValueError('独立変数が2群になっていません')
+
+    X = df[list(value_cols)].to_numpy(dtype=np.float64, na_value=np.nan)
+    labels = df[group_col].to_numpy()
+    _, mean_all, var_all = group_moments(X)
+    n0, mean0, var0 = group_moments(X[labels == groups[0]])
+    n1, mean1, var1 = group_moments(X[labels == groups[1]])
+    t, dof, p, d = welch_ttest(n0, mean0, var0, n1, mean1, var1)
+
+    result = pd.DataFrame({
+        '全体M': mean_all,
+        '全体S.D': np.sqrt(var_all),
+        f'{groups[0]}M': mean0,
+        f'{groups[0]}S.D': np.sqrt(var0),
+        f'{groups[1]}M': mean1,
+        f'{groups[1]}S.D': np.sqrt(var1),
+        'df': dof,
+        't': np.abs(t),
+        'p': p,
+        'sign': [significance_mark(value) for value in p],
+        'd': d,
+    }, index=list(value_cols))
+    return result
+
+
+def ttest_rel_table(
+    df: pd.DataFrame,
+    pre_cols: Sequence[str],
+    post_cols: Sequence[str],
+) -> pd.DataFrame:
+    """対応ありt検定の結果表を作成（全ペアを一括計算）
+
+    行は「観測変数 → 測定変数」、列は 観測値M・観測値S.D・測定値M・測定値S.D・
+    平均値の差・df・t・p・sign・d。ペアごとに両方がそろった行のみを使い、
+    効果量 d は差の標準偏差で算出する。
+    """
+    pre_cols, post_cols = list(pre_cols), list(post_cols)
+    if len(pre_cols) != len(post_cols):
+        raise ValueError('観測変数と測定変数の数は同じでなければなりません')
+
+    X = df[pre_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+    Y = df[post_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~np.isnan(X) & ~np.isnan(Y)
+    X = np.where(valid, X, np.nan)
+    Y = np.where(valid, Y, np.nan)
+
+    n, mean_x, var_x = group_moments(X)
+    _, mean_y, var_y = group_moments(Y)
+    _, mean_diff, var_diff = group_moments(X - Y)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = mean_diff / np.sqrt(var_diff / n)
+        p = 2 * stats.t.sf(np.abs(t), n - 1)
+        d = np.abs(mean_x - mean_y) / np.sqrt(var_diff)
+
+    return pd.DataFrame({
+        '観測値M': mean_x,
+        '観測値S.D': np.sqrt(var_x),
+        '測定値M': mean_y,
+        '測定値S.D': np.sqrt(var_y),
+        '平均値の差': mean_diff,
+        'df': n.astype(np.int64) - 1,
+        't': t,
+        'p': p,
+        'sign': [significance_mark(value) for value in p],
+        'd': d,
+    }, index=[f'{pre} → {post}' for pre, post in zip(pre_cols, post_cols)])
@@ -0,0 +1,44 @@
+import pandas as pd
+from typing import Iterable, List
+
+
+def significance_mark(p: float) -> str:
+    """p値を有意記号（**, *, †, n.s.）に変換"""
+    if p < 0.01:
+        return '**'
+    elif p < 0.05:
+        return '*'
+    elif p < 0.1:
+        return '†'
+    else:
+        return 'n.s.'
+
+
+def significance_caption(signs: Iterable[str]) -> str:
+    """表中の有意記号から凡例キャプションを作成"""
+    signs = [str(s) for s in signs]
+    caption = ''
+    if any('**' in s for s in signs):
+        caption += 'p<0.01** '
+    if any('*' in s for s in signs):
+        caption += 'p<0.05* '
+    if any('†' in s for s in signs):
+        caption += 'p<0.1† '
+    return caption
+
+
+def summary_table(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """要約統計量（有効N・平均値・中央値・標準偏差・分散・最小値・最大値）の表を作成
+
+    全列をまとめて集計する。
+    """
+    data = df[list(columns)]
+    return pd.DataFrame({
+        '有効N': len(data),
+        '平均値': data.mean(),
+        '中央値': data.median(),
+        '標準偏差': data.std(ddof=1),
+        '分散': data.var(ddof=1),
+        '最小値': data.min(),
+        '最大値': data.max(),
+    }, index=list(columns))
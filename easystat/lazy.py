@@ -0,0 +1,118 @@
+"""重いライブラリの遅延読み込み
+
+lazy_import() が返す代理モジュールは、最初に属性へアクセスした時点で
+実際に import する。ページの表示に使わないライブラリの読み込みを省き、
+起動を速くする。読み込みにかかった時間は load_times() で確認できる。
+"""
+import importlib
+import sys
+import threading
+import time
+import types
+from typing import Callable, Dict, List, Sequence
+
+_load_times: Dict[str, float] = {}
+_lock = threading.RLock()
+# モジュール名ごとの代理（on_load の処理をページ間で共有する）
+_proxies: Dict[str, 'LazyModule'] = {}
+
+
+class LazyModule(types.ModuleType):
+    """最初の属性アクセスで import されるモジュールの代理
+
+    requires には、本体より先に読み込むべき副作用目的のモジュール
+    （japanize_matplotlib など）を指定する。
+    """
+
+    def __init__(self, name: str, requires: Sequence[str] = ()):
+        super().__init__(name)
+        object.__setattr__(self, '_lazy_requires', tuple(requires))
+        object.__setattr__(self, '_lazy_module', None)
+        object.__setattr__(self, '_lazy_callbacks', [])
+
+    def _load(self) -> types.ModuleType:
+        module = object.__getattribute__(self, '_lazy_module')
+        if module is not None:
+            return module
+        with _lock:
+            module = object.__getattribute__(self, '_lazy_module')
+            if module is not None:
+                return module
+            for name in object.__getattribute__(self, '_lazy_requires'):
+                _timed_import(name)
+            module = _timed_import(self.__name__)
+            object.__setattr__(self, '_lazy_module', module)
+            callbacks = object.__getattribute__(self, '_lazy_callbacks')
+            for callback in callbacks:
+                callback(module)
+            callbacks.clear()
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        return object.__getattribute__(self, '_lazy_module') is not None
+
+    def on_load(self, callback: Callable[[types.ModuleType], None]) -> None:
+        """読み込み時に実行する処理を登録（読み込み済みなら即実行）"""
+        with _lock:
+            module = object.__getattribute__(self, '_lazy_module')
+            if module is None:
+                object.__getattribute__(self, '_lazy_callbacks').append(callback)
+                return
+        callback(module)
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value) -> None:
+        setattr(self._load(), attr, value)
+
+    def __dir__(self) -> List[str]:
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.is_loaded else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def _timed_import(name: str) -> types.ModuleType:
+    if name in sys.modules:
+        return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    _load_times[name] = time.perf_counter() - start
+    return module
+
+
+def lazy_import(name: str, requires: Sequence[str] = ()) -> LazyModule:
+    """モジュールを遅延読み込みする代理を返す
+
+    同じモジュールには同じ代理を返すため、on_load で登録した処理は
+    どこから読み込んでも実行される。requires は先に登録されたものに追加する。
+    """
+    with _lock:
+        proxy = _proxies.get(name)
+        if proxy is None:
+            proxy = _proxies[name] = LazyModule(name, requires)
+            return proxy
+        known = object.__getattribute__(proxy, '_lazy_requires')
+        extra = tuple(module for module in requires if module not in known)
+        if extra:
+            object.__setattr__(proxy, '_lazy_requires', known + extra)
+            if proxy.is_loaded:
+                for module in extra:
+                    _timed_import(module)
+    return proxy
+
+
+def load_times() -> Dict[str, float]:
+    """遅延読み込みしたモジュールと読み込み時間（秒、読み込み順）"""
+    return dict(_load_times)
+
+
+def startup_report(limit: int = 10) -> str:
+    """読み込み時間の長いモジュールの一覧（Markdown の箇条書き）"""
+    times = sorted(_load_times.items(), key=lambda item: item[1], reverse=True)
+    if not times:
+        return '- 遅延読み込みしたライブラリはありません'
+    return '\n'.join(f'- {name}: {seconds * 1000:.0f} ms' for name, seconds in times[:limit])
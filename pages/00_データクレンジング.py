@@ -2,7 +2,6 @@ import io
 
 import streamlit as st
 import numpy as np
-import pandas as pd
 
 import common
 
@@ -15,15 +14,12 @@ st.write('データセットに対して、欠損値処理や外れ値の処理
 st.write('')
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
-
-if uploaded_file is not None:
-    # データの読み込み
-    if uploaded_file.type == 'text/csv':
-        data = pd.read_csv(uploaded_file)
-    else:
-        data = pd.read_excel(uploaded_file)
-    
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
+
+# データの読み込み
+data = common.load_data(uploaded_file)
+
+if data is not None:
     st.subheader('元のデータ')
     st.write(data)
 
@@ -94,3 +90,4 @@ if uploaded_file is not None:
 # フッター
 common.display_copyright()
 common.display_special_thanks()
+common.display_startup_report()
@@ -1,10 +1,11 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import matplotlib.pyplot as plt
-import japanize_matplotlib
 
 import common
+from easystat.lazy import lazy_import
+
+# 重いライブラリは使う時点で読み込む
+px = lazy_import('plotly.express')
 
 
 st.set_page_config(page_title='探索的データ分析（EDA）', layout='wide')
@@ -18,34 +19,59 @@ st.write('')
 gemini_api_key, enable_ai_interpretation = common.AIStatisticalInterpreter.setup_ai_sidebar()
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
 
+# 大容量CSVはファイル全体を読み込まず、分割して集計する
+streaming_mode = False
+if not use_demo_data and uploaded_file is not None and uploaded_file.name.lower().endswith('.csv'):
+    streaming_mode = st.checkbox(
+        '大容量CSVモード（分割読み込みで集計）',
+        value=common.is_large_csv(uploaded_file),
+        help='ファイル全体をメモリに読み込まずに要約統計量を算出します。グラフは無作為抽出したサンプルで描画します。'
+    )
+
 # データフレームの作成
 df = None
+stream_summary = None
 if use_demo_data:
-    df = pd.read_excel('datasets/eda_demo.xlsx', sheet_name=0)
-    st.write(df.head())
+    df = common.load_demo_data('datasets/eda_demo.xlsx')
+elif streaming_mode:
+    stream_summary = common.summarize_large_csv(uploaded_file)
+    if stream_summary is not None:
+        # 可視化には無作為抽出サンプルを使用
+        df = stream_summary.sample
+        st.info(
+            f'全{stream_summary.n_rows:,}行を{stream_summary.n_chunks}回に分けて集計しました。'
+            f'四分位数は近似値（t-digest）です。グラフは無作為抽出した{len(df):,}行で描画します。'
+        )
+        invalid = {col: n for col, n in stream_summary.invalid_counts.items() if n > 0}
+        if invalid:
+            st.warning('数値に変換できない値を欠損として扱いました: ' +
+                       '、'.join(f'{col}（{n}件）' for col, n in invalid.items()))
 else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            df = pd.read_csv(uploaded_file)
-            st.write(df.head())
-        else:
-            df = pd.read_excel(uploaded_file)
-            st.write(df.head())
+    df = common.load_data(uploaded_file)
+if df is not None:
+    st.write(df.head())
 
 if df is not None:
     # カテゴリ変数と数値変数の選択
     cols = df.columns.tolist()
-    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-    numerical_cols = df.select_dtypes(exclude=['object', 'category']).columns.tolist()
+    if stream_summary is not None:
+        categorical_cols = stream_summary.categorical_columns
+        numerical_cols = stream_summary.numeric_columns
+    else:
+        categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+        numerical_cols = df.select_dtypes(exclude=['object', 'category']).columns.tolist()
 
     # 要約統計量表示
     st.subheader('要約統計量')
-    summary_df = df.describe(include='all').transpose()
+    if stream_summary is not None:
+        summary_df = stream_summary.describe()
+    else:
+        summary_df = df.describe(include='all').transpose()
     st.write(summary_df)
 
     # 可視化
@@ -60,7 +86,11 @@ if df is not None:
             key=col
         )
 
-        value_counts = df[col].value_counts()
+        if stream_summary is not None:
+            # 度数はファイル全体の集計を使用
+            value_counts = stream_summary.categories[col].value_counts()
+        else:
+            value_counts = df[col].value_counts()
 
         # 選択された並び替え順に基づいてデータを並び替え
         if sort_order == '名前順':
@@ -88,19 +118,22 @@ if df is not None:
         # AI解釈機能の追加（数値変数ごと）
         if gemini_api_key and enable_ai_interpretation:
             # 統計量を取得
-            col_stats = df[col].describe()
-            eda_results = {
-                'variable_name': col,
-                'mean': col_stats['mean'],
-                'median': df[col].median(),
-                'std': col_stats['std'],
-                'min': col_stats['min'],
-                'max': col_stats['max'],
-                'q1': col_stats['25%'],
-                'q3': col_stats['75%'],
-                'skewness': df[col].skew(),
-                'kurtosis': df[col].kurtosis()
-            }
+            if stream_summary is not None:
+                eda_results = {'variable_name': col, **stream_summary.column_stats(col)}
+            else:
+                col_stats = df[col].describe()
+                eda_results = {
+                    'variable_name': col,
+                    'mean': col_stats['mean'],
+                    'median': df[col].median(),
+                    'std': col_stats['std'],
+                    'min': col_stats['min'],
+                    'max': col_stats['max'],
+                    'q1': col_stats['25%'],
+                    'q3': col_stats['75%'],
+                    'skewness': df[col].skew(),
+                    'kurtosis': df[col].kurtosis()
+                }
             
             # AI解釈を表示
             common.AIStatisticalInterpreter.display_ai_interpretation(
@@ -199,3 +232,4 @@ if df is not None:
 # フッター
 common.display_copyright()
 common.display_special_thanks()
+common.display_startup_report()
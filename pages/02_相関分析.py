@@ -1,16 +1,14 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import japanize_matplotlib
-import seaborn as sns
-import plotly.express as px
 import plotly.graph_objects as go
-import plotly.figure_factory as ff
 from plotly.subplots import make_subplots
 from PIL import Image
 
 import common
+from easystat.lazy import lazy_import
+
+# 重いライブラリは使う時点で読み込む
+px = lazy_import('plotly.express')
 
 
 st.set_page_config(page_title='相関分析', layout='wide')
@@ -28,7 +26,7 @@ image = Image.open('images/correlation.png')
 st.image(image)
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
@@ -36,16 +34,11 @@ use_demo_data = st.checkbox('デモデータを使用')
 # データフレームの作成
 df = None
 if use_demo_data:
-    df = pd.read_excel('datasets/correlation_demo.xlsx', sheet_name=0)
-    st.write(df.head())
+    df = common.load_demo_data('datasets/correlation_demo.xlsx')
 else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            df = pd.read_csv(uploaded_file)
-            st.write(df.head())
-        else:
-            df = pd.read_excel(uploaded_file)
-            st.write(df.head())
+    df = common.load_data(uploaded_file)
+if df is not None:
+    st.write(df.head())
 
 if df is not None:
     # 数値変数の抽出
@@ -218,3 +211,4 @@ if df is not None:
 # フッター
 common.display_copyright()
 common.display_special_thanks()
+common.display_startup_report()
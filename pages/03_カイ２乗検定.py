@@ -1,14 +1,13 @@
-import japanize_matplotlib
-import matplotlib.pyplot as plt
-import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.figure_factory as ff
-import scipy.stats as stats
 import streamlit as st
 from PIL import Image
 
 import common
+from easystat import engine
+from easystat.lazy import lazy_import
+
+# 重いライブラリは使う時点で読み込む
+px = lazy_import('plotly.express')
 
 
 st.set_page_config(page_title="カイ２乗分析", layout="wide")
@@ -26,7 +25,7 @@ image = Image.open('images/chi_square.png')
 st.image(image)
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
@@ -34,16 +33,11 @@ use_demo_data = st.checkbox('デモデータを使用')
 # データフレームの作成
 df = None
 if use_demo_data:
-    df = pd.read_excel('datasets/chi_square_demo.xlsx', sheet_name=0)
-    st.write(df.head())
+    df = common.load_demo_data('datasets/chi_square_demo.xlsx')
 else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            df = pd.read_csv(uploaded_file)
-            st.write(df.head())
-        else:
-            df = pd.read_excel(uploaded_file)
-            st.write(df.head())
+    df = common.load_data(uploaded_file)
+if df is not None:
+    st.write(df.head())
 
 if df is not None:
     # カテゴリ変数の抽出
@@ -98,24 +92,15 @@ if df is not None:
 
                     # カイ２乗検定の実行
                     try:
-                        chi2, p_value, dof, expected = stats.chi2_contingency(crosstab)
-
-                        # 期待度数のデータフレームの作成
-                        expected_df = pd.DataFrame(expected, columns=crosstab.columns, index=crosstab.index)
-                        expected_df = expected_df.round(2)  # 小数点第2位で四捨五入
-
-                        # (観測度数 - 期待度数)^2 / 期待度数 の計算
-                        chi_square_value_df = ((crosstab - expected) ** 2) / expected
-                        chi_square_value_df = chi_square_value_df.round(2)  # 小数点第2位で四捨五入
-
-                        # 有意差を確認するための残差の計算
-                        residuals = (crosstab - expected) / np.sqrt(expected)
+                        result = engine.chi_square(crosstab)
+                        chi2, p_value, dof = result.chi2, result.p_value, result.dof
 
-                        # 有意水準0.05でのz値の閾値
-                        threshold = stats.norm.ppf(1 - 0.05 / 2)
+                        # 期待度数とカイ二乗値（小数点第2位で四捨五入）
+                        expected_df = result.expected.round(2)
+                        chi_square_value_df = result.contributions.round(2)
 
                         # 有意に差が出ているセルのマスキング
-                        mask_significant = residuals.abs() > threshold
+                        mask_significant = result.significant
 
                         # セルに色を付ける
                         colors = mask_significant.applymap(lambda x: 'background-color: yellow' if x else '')
@@ -209,3 +194,4 @@ if df is not None:
 common.display_copyright()
 common.display_special_thanks()
 
+common.display_startup_report()
@@ -1,13 +1,11 @@
-from statistics import median, variance
-
 import streamlit as st
 import pandas as pd
 import numpy as np
-from scipy import stats
 from PIL import Image
 import plotly.graph_objects as go
 
 import common
+from easystat import engine
 
 
 st.set_page_config(page_title='t検定(対応なし)', layout='wide')
@@ -25,7 +23,7 @@ image = Image.open('images/ttest.png')
 st.image(image)
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
@@ -33,16 +31,11 @@ use_demo_data = st.checkbox('デモデータを使用')
 # データフレームの作成
 df = None
 if use_demo_data:
-    df = pd.read_excel('datasets/ttest_demo.xlsx', sheet_name=0)
-    st.write(df.head())
+    df = common.load_demo_data('datasets/ttest_demo.xlsx')
 else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            df = pd.read_csv(uploaded_file)
-            st.write(df.head())
-        else:
-            df = pd.read_excel(uploaded_file)
-            st.write(df.head())
+    df = common.load_data(uploaded_file)
+if df is not None:
+    st.write(df.head())
 
 if df is not None:
     # カテゴリ変数の抽出
@@ -81,105 +74,25 @@ if df is not None:
 
         # グラフタイトルを表示するチェックボックス
         show_graph_title = st.checkbox('グラフタイトルを表示する', value=True)
+        bootstrap = common.bootstrap_options('効果量 d のブートストラップ信頼区間を表示する')
+        permutation = common.permutation_options('並べ替え検定（パーミュテーション検定）を行う')
 
         # t検定の実行
         if st.button('t検定の実行'):
             st.subheader('【分析結果】')
             st.write('【要約統計量】')
 
-            # 数値変数の要素の数を取得
-            num_range = len(num_vars)
-
-            # 各値の初期化
-            n = 1
-            summaryList = num_vars
-            summaryColumns = ['有効N', '平均値', '中央値', '標準偏差', '分散',
-                              '最小値', '最大値']
-
-            # 目的変数、従属変数から作業用データフレームのセット
-            df00_list = cat_var + num_vars
-            df00 = df[df00_list]
-
-            # サマリ(df0)用のデータフレームのセット
-            df0 = pd.DataFrame(index=summaryList, columns=summaryColumns)
-
-            # サマリ(df0)用のデータフレームに平均値と標準偏差を追加
-            for summary in range(num_range):
-                # 列データの取得（nは従属変数の配列番号）
-                y = df00.iloc[:, n]
-
-                # 従属変数の列データの計算処理
-                df0.at[df00.columns[n], '有効N'] = len(y)
-                df0.at[df00.columns[n], '平均値'] = y.mean()
-                df0.at[df00.columns[n], '中央値'] = median(y)
-                df0.at[df00.columns[n], '標準偏差'] = y.std()
-                df0.at[df00.columns[n], '分散'] = variance(y)
-                df0.at[df00.columns[n], '最小値'] = y.min()
-                df0.at[df00.columns[n], '最大値'] = y.max()
-                n += 1
-
             # 要約統計量（サマリ）のデータフレームを表示
+            df0 = engine.summary_table(df, num_vars)
             st.write(df0.style.format('{:.2f}'))
 
             st.write('【平均値の差の検定（対応なし）】')
             groups = df[cat_var].iloc[:, 0].unique().tolist()
+            df_results = engine.ttest_ind_table(df, cat_var[0], num_vars, groups)
 
-            # 結果を保存するデータフレームの初期化
-            columns = ['全体M', '全体S.D', f'{groups[0]}M', f'{groups[0]}S.D',
-                       f'{groups[1]}M', f'{groups[1]}S.D', 'df', 't', 'p', 'sign', 'd']
-            df_results = pd.DataFrame(columns=columns)
-
-            for var in num_vars:
-                series = df[var]
-                group0_data = df[df[cat_var[0]] == groups[0]][var]
-                group1_data = df[df[cat_var[0]] == groups[1]][var]
-
-                n1 = len(group0_data)
-                n2 = len(group1_data)
-                s1_sq = np.var(group0_data, ddof=1)
-                s2_sq = np.var(group1_data, ddof=1)
-
-                # Welch–Satterthwaiteの式で自由度を計算
-                df_numerator = (s1_sq / n1 + s2_sq / n2) ** 2
-                df_denominator = ((s1_sq / n1) ** 2) / (n1 - 1) + ((s2_sq / n2) ** 2) / (n2 - 1)
-                df_welch = df_numerator / df_denominator
-
-                ttest_result = stats.ttest_ind(group0_data, group1_data, equal_var=False)
-                overall_mean = series.mean()
-                overall_std = series.std(ddof=1)
-                g0_mean = group0_data.mean()
-                g0_std = group0_data.std(ddof=1)
-                g1_mean = group1_data.mean()
-                g1_std = group1_data.std(ddof=1)
-
-                # 効果量dの計算（プールされた標準偏差を使用）
-                pooled_std = np.sqrt(((n1 - 1) * s1_sq + (n2 - 1) * s2_sq) / (n1 + n2 - 2))
-                effect_size = abs((g0_mean - g1_mean) / pooled_std)
-
-                if ttest_result.pvalue < 0.01:
-                    significance = '**'
-                elif ttest_result.pvalue < 0.05:
-                    significance = '*'
-                elif ttest_result.pvalue < 0.1:
-                    significance = '†'
-                else:
-                    significance = 'n.s.'
-
-                results_row = {
-                    '全体M': overall_mean,
-                    '全体S.D': overall_std,
-                    f'{groups[0]}M': g0_mean,
-                    f'{groups[0]}S.D': g0_std,
-                    f'{groups[1]}M': g1_mean,
-                    f'{groups[1]}S.D': g1_std,
-                    'df': df_welch,
-                    't': abs(ttest_result.statistic),
-                    'p': ttest_result.pvalue,
-                    'sign': significance,
-                    'd': effect_size
-                }
-
-                df_results.loc[var] = results_row
+            # 各群のサンプルサイズ
+            group_sizes = df[cat_var[0]].value_counts()
+            n0, n1 = int(group_sizes.get(groups[0], 0)), int(group_sizes.get(groups[1], 0))
 
             # 結果の表示
             # 数値型の列だけを選択
@@ -188,24 +101,21 @@ if df is not None:
             styled_df = df_results.style.format({col: '{:.2f}' for col in numeric_columns})
             st.write(styled_df)
 
-            # sign_captionを初期化
-            sign_caption = ''
+            st.caption(engine.significance_caption(df_results['sign']))
 
-            # 各記号に対するチェックを実行
-            if df_results['sign'].str.contains('\*\*').any():
-                sign_caption += 'p<0.01** '
-            if df_results['sign'].str.contains('\*').any():
-                sign_caption += 'p<0.05* '
-            if df_results['sign'].str.contains('†').any():
-                sign_caption += 'p<0.1† '
+            if permutation:
+                st.write('【並べ替え検定（Welch の t）】')
+                common.show_permutation_table(engine.permutation_ttest_ind(df, cat_var[0], num_vars, groups, **permutation))
 
-            st.caption(sign_caption)
+            if bootstrap:
+                st.write('【効果量 d のブートストラップ信頼区間】')
+                common.show_bootstrap_table(engine.bootstrap_d_ind(df, cat_var[0], num_vars, groups, **bootstrap), bootstrap)
 
             # サンプルサイズの表示
             st.write('【サンプルサイズ】')
             st.write(f'全体N ＝ {len(df)}')
-            st.write(f'● {groups[0]}： {len(df[df[cat_var[0]] == groups[0]])}')
-            st.write(f'● {groups[1]}： {len(df[df[cat_var[0]] == groups[1]])}')
+            st.write(f'● {groups[0]}： {n0}')
+            st.write(f'● {groups[1]}： {n1}')
 
             st.subheader('【解釈の補助】')
 
@@ -234,8 +144,8 @@ if df is not None:
                         'mean2': row[f'{groups[1]}M'],
                         'std1': row[f'{groups[0]}S.D'],
                         'std2': row[f'{groups[1]}S.D'],
-                        'n1': len(df[df[cat_var[0]] == groups[0]]),
-                        'n2': len(df[df[cat_var[0]] == groups[1]]),
+                        'n1': n0,
+                        'n2': n1,
                         'effect_size': row['d'],
                         'test_type': 't検定（対応なし）',
                         'group1_name': groups[0],
@@ -275,10 +185,6 @@ if df is not None:
 
             # グラフ描画部分の更新
             for var in num_vars:
-                # 各グループのサンプルサイズを取得
-                n0 = len(df[df[cat_var[0]] == groups[0]])
-                n1 = len(df[df[cat_var[0]] == groups[1]])
-                
                 # 標準誤差を計算（df_resultsに格納されている標準偏差を利用）
                 se0 = df_results.at[var, f'{groups[0]}S.D'] / np.sqrt(n0)
                 se1 = df_results.at[var, f'{groups[1]}S.D'] / np.sqrt(n1)
@@ -359,10 +265,10 @@ if df is not None:
                 st.plotly_chart(fig)
 
                 # Excelダウンロードリンク
-                excel_data = common.export_plotly_to_excel(fig, filename=f"t検定対応なし_{num_var}.xlsx", sheet_name="グラフ")
+                excel_data = common.export_plotly_to_excel(fig, filename=f"t検定対応なし_{var}.xlsx", sheet_name="グラフ")
                 import base64
                 b64 = base64.b64encode(excel_data).decode()
-                href = f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="t検定対応なし_{num_var}.xlsx" style="text-decoration: none; color: #1f77b4;">📊 グラフをExcelでダウンロード</a>'
+                href = f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="t検定対応なし_{var}.xlsx" style="text-decoration: none; color: #1f77b4;">📊 グラフをExcelでダウンロード</a>'
                 st.markdown(href, unsafe_allow_html=True)
 
                 # キャプションの追加
@@ -375,3 +281,4 @@ if df is not None:
 # フッター
 common.display_copyright()
 common.display_special_thanks()
+common.display_startup_report()
@@ -1,13 +1,11 @@
-from statistics import median, variance
-
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
 from PIL import Image
-from scipy import stats
 
 import common
+from easystat import engine
 
 
 st.set_page_config(page_title="t検定(対応あり)", layout="wide")
@@ -25,7 +23,7 @@ image = Image.open('images/ttest_rel.png')
 st.image(image)
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
@@ -33,16 +31,11 @@ use_demo_data = st.checkbox('デモデータを使用')
 # データフレームの作成
 df = None
 if use_demo_data:
-    df = pd.read_excel('datasets/ttest_rel_demo.xlsx', sheet_name=0)
-    st.write(df.head())
+    df = common.load_demo_data('datasets/ttest_rel_demo.xlsx')
 else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            df = pd.read_csv(uploaded_file)
-            st.write(df.head())
-        else:
-            df = pd.read_excel(uploaded_file)
-            st.write(df.head())
+    df = common.load_data(uploaded_file)
+if df is not None:
+    st.write(df.head())
 
 # 変数設定の注意点
 if st.checkbox('注意点の表示（クリックで開きます）'):
@@ -81,6 +74,8 @@ if df is not None:
 
         # グラフタイトルを表示するチェックボックス
         show_graph_title = st.checkbox('グラフタイトルを表示する', value=True)  # デフォルトでチェックされている
+        bootstrap = common.bootstrap_options('効果量 d のブートストラップ信頼区間を表示する')
+        permutation = common.permutation_options('並べ替え検定（パーミュテーション検定）を行う')
 
         # t検定の実行
         if st.button('t検定の実行'):
@@ -90,94 +85,30 @@ if df is not None:
             # 数値変数のリスト
             num_vars = pre_vars + post_vars
 
-            # サマリ用のデータフレームのセット
-            summaryColumns = ["有効N", "平均値", "中央値", "標準偏差", "分散",
-                              "最小値", "最大値"]
-            df_summary = pd.DataFrame(index=num_vars, columns=summaryColumns)
-
-            # サマリ用のデータフレームに平均値と標準偏差を追加
-            for var in num_vars:
-                y = df[var]
-                df_summary.at[var, '有効N'] = len(y)
-                df_summary.at[var, '平均値'] = y.mean()
-                df_summary.at[var, '中央値'] = median(y)
-                df_summary.at[var, '標準偏差'] = y.std(ddof=1)
-                df_summary.at[var, '分散'] = variance(y)
-                df_summary.at[var, '最小値'] = y.min()
-                df_summary.at[var, '最大値'] = y.max()
-
             # 要約統計量（サマリ）のデータフレームを表示
+            df_summary = engine.summary_table(df, num_vars)
             st.write(df_summary.style.format("{:.2f}"))
 
             st.write("【平均値の差の検定（対応あり）】")
-            
-            # 検定結果のデータフレームを作成
-            resultColumns = ["観測値M", "観測値S.D",
-                            "測定値M", "測定値S.D",
-                            'df', 't', 'p', 'sign', 'd']
-            index = [f'{pre_var} → {post_var}' for pre_var, post_var in zip(pre_vars, post_vars)]
-            result_df = pd.DataFrame(index=index, columns=resultColumns)
-            paired_variable_list = [f'{pre_var} → {post_var}' for pre_var, post_var in zip(pre_vars, post_vars)]
-
-            for pre_var, post_var, idx in zip(pre_vars, post_vars, index):
-                x = df[pre_var]
-                y = df[post_var]
-                n = len(x)
-
-                # 対応のあるt検定
-                ttest = stats.ttest_rel(x, y)
-                t = ttest.statistic
-                p = ttest.pvalue
-                df_t = n - 1  # 自由度
-
-                # 平均値と標準偏差
-                x_mean = x.mean()
-                y_mean = y.mean()
-                x_std = x.std(ddof=1)
-                y_std = y.std(ddof=1)
-
-                # 効果量dの計算（対応のあるデータの標準偏差を使用）
-                diff = x - y
-                d = abs((x_mean - y_mean) / diff.std(ddof=1))
-
-                # p値の判定をsignに格納
-                if p < 0.01:
-                    sign = "**"
-                elif p < 0.05:
-                    sign = "*"
-                elif p < 0.1:
-                    sign = "†"
-                else:
-                    sign = "n.s."
-
-                # 結果をデータフレームに格納
-                result_df.at[idx, '観測値M'] = x_mean
-                result_df.at[idx, '観測値S.D'] = x_std
-                result_df.at[idx, '測定値M'] = y_mean
-                result_df.at[idx, '測定値S.D'] = y_std
-                result_df.at[idx, 'df'] = df_t
-                result_df.at[idx, 't'] = t
-                result_df.at[idx, 'p'] = p
-                result_df.at[idx, 'sign'] = sign
-                result_df.at[idx, 'd'] = d
+
+            # 全ペアの検定結果をまとめて計算
+            result_df = engine.ttest_rel_table(df, pre_vars, post_vars)
+            paired_variable_list = result_df.index.tolist()
 
             # 結果のデータフレームを表示
             numeric_columns = result_df.select_dtypes(include=['float64', 'int64']).columns
             styled_df = result_df.style.format({col: "{:.2f}" for col in numeric_columns})
             st.write(styled_df)
 
-            # sign_captionを初期化
-            sign_caption = ''
+            st.caption(engine.significance_caption(result_df['sign']))
 
-            # 各記号に対するチェックを実行
-            if result_df['sign'].str.contains('\*\*').any():
-                sign_caption += 'p<0.01** '
-            if result_df['sign'].str.contains('\*').any():
-                sign_caption += 'p<0.05* '
-            if result_df['sign'].str.contains('†').any():
-                sign_caption += 'p<0.1† '
+            if permutation:
+                st.write('【並べ替え検定（差の符号の入れ替え）】')
+                common.show_permutation_table(engine.permutation_ttest_rel(df, pre_vars, post_vars, **permutation))
 
-            st.caption(sign_caption)
+            if bootstrap:
+                st.write('【効果量 d のブートストラップ信頼区間】')
+                common.show_bootstrap_table(engine.bootstrap_d_rel(df, pre_vars, post_vars, **bootstrap), bootstrap)
 
             # サンプルサイズの表示
             st.write('【サンプルサイズ】')
@@ -258,14 +189,14 @@ if df is not None:
                 )
 
             # グラフ描画部分
-            for pre_var, post_var in zip(pre_vars, post_vars):
-                x = df[pre_var]
-                y = df[post_var]
-                n = len(x)
+            for pre_var, post_var, (_, row) in zip(pre_vars, post_vars, result_df.iterrows()):
+                n = row['df'] + 1
+                x_mean, x_std = row['観測値M'], row['観測値S.D']
+                y_mean, y_std = row['測定値M'], row['測定値S.D']
                 data = pd.DataFrame({
                     '群': [pre_var, post_var],
-                    '平均値': [x.mean(), y.mean()],
-                    '誤差': [x.std(ddof=1) / np.sqrt(n), y.std(ddof=1) / np.sqrt(n)]  # 標準誤差に修正
+                    '平均値': [x_mean, y_mean],
+                    '誤差': [x_std / np.sqrt(n), y_std / np.sqrt(n)]  # 標準誤差に修正
                 })
 
                 # カテゴリを数値にマッピング
@@ -291,14 +222,8 @@ if df is not None:
                     fig.update_layout(title_text=f'平均値の比較： {pre_var} → {post_var}')
 
                 # 各統計量を取得
-                ttest_result = stats.ttest_rel(x, y)
-                t = ttest_result.statistic
-                p_value = ttest_result.pvalue
-                n = len(x)
-                df_t = n - 1  # 自由度
-
-                diff = x - y
-                d = abs((x.mean() - y.mean()) / diff.std(ddof=1))
+                p_value = row['p']
+                d = row['d']
 
                 if p_value < 0.01:
                     significance_text = "p < 0.01 **"
@@ -347,10 +272,11 @@ if df is not None:
                 st.markdown(href, unsafe_allow_html=True)
 
                 # キャプションの追加
-                st.caption(f"【観測値】 平均値 (SD): {x.mean():.2f} ({x.std(ddof=1):.2f}), "
-                           f"【測定値】 平均値 (SD): {y.mean():.2f} ({y.std(ddof=1):.2f}), "
+                st.caption(f"【観測値】 平均値 (SD): {x_mean:.2f} ({x_std:.2f}), "
+                           f"【測定値】 平均値 (SD): {y_mean:.2f} ({y_std:.2f}), "
                            f"【危険率】　p値: {p_value:.3f},【効果量】 d値: {d:.2f}")
 
 # フッター
 common.display_copyright()
 common.display_special_thanks()
+common.display_startup_report()
@@ -1,15 +1,11 @@
-from statistics import median, variance
-
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
 from PIL import Image
-from scipy import stats
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
 
 import common
-
+from easystat import engine
 
 st.set_page_config(page_title="一要因分散分析(対応なし)", layout="wide")
 
@@ -26,7 +22,7 @@ image = Image.open('images/anova.png')
 st.image(image)
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
@@ -34,21 +30,11 @@ use_demo_data = st.checkbox('デモデータを使用')
 # データフレームの作成
 df = None
 if use_demo_data:
-    try:
-        df = pd.read_excel('datasets/anova_demo.xlsx', sheet_name=0)
-        st.write(df.head())
-    except FileNotFoundError:
-        st.error("デモデータファイルが見つかりません。ファイルパスを確認してください。")
+    df = common.load_demo_data('datasets/anova_demo.xlsx')
 else:
-    if uploaded_file is not None:
-        try:
-            if uploaded_file.type == 'text/csv':
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
-            st.write(df.head())
-        except Exception as e:
-            st.error(f"ファイルの読み込み中にエラーが発生しました: {e}")
+    df = common.load_data(uploaded_file)
+if df is not None:
+    st.write(df.head())
 
 if df is not None:
     # カテゴリ変数の抽出
@@ -89,89 +75,50 @@ if df is not None:
 
         # グラフタイトルを表示するチェックボックス
         show_graph_title = st.checkbox('グラフタイトルを表示する', value=True)  # デフォルトでチェックされている
+        bootstrap = common.bootstrap_options('効果量 η² のブートストラップ信頼区間を表示する')
+        permutation = common.permutation_options('並べ替え検定（パーミュテーション検定）を行う')
 
         # 分散分析の実行
         if st.button('分散分析の実行'):
             st.subheader('【分析結果】')
             st.write('【要約統計量】')
 
-            # 要約統計量の計算
-            summaryColumns = ["有効N", "平均値", "中央値", "標準偏差", "分散", "最小値", "最大値"]
-            df_summary = pd.DataFrame(index=num_vars, columns=summaryColumns)
-
-            for num_var in num_vars:
-                y = df[num_var]
-                df_summary.at[num_var, '有効N'] = len(y)
-                df_summary.at[num_var, '平均値'] = y.mean()
-                df_summary.at[num_var, '中央値'] = median(y)
-                df_summary.at[num_var, '標準偏差'] = y.std(ddof=1)
-                df_summary.at[num_var, '分散'] = variance(y)
-                df_summary.at[num_var, '最小値'] = y.min()
-                df_summary.at[num_var, '最大値'] = y.max()
-
             # 要約統計量の表示
+            df_summary = engine.summary_table(df, num_vars)
             st.write(df_summary.style.format("{:.2f}"))
 
             st.write('【分散分析（対応なし）】')
 
-            # 結果を保存するデータフレームの初期化
             groups = df[cat_var_str].unique()
-            k = len(groups)
-            N = len(df)
-            columns = ['全体M', '全体S.D'] + \
-                [f'{group}M' for group in groups] + \
-                [f'{group}S.D' for group in groups] + \
-                ['群間自由度', '群内自由度', 'F', 'p', 'sign', 'η²', 'ω²']
-            df_results = pd.DataFrame(columns=columns, index=num_vars)
-
-            for num_var in num_vars:
-                group_data = [df[df[cat_var_str] == group][num_var] for group in groups]
-                overall_mean = df[num_var].mean()
-                overall_std = df[num_var].std(ddof=1)
-                fval, pval = stats.f_oneway(*group_data)
-
-                # 自由度の計算
-                df_between = k - 1  # 群間自由度
-                df_within = N - k     # 群内自由度
-
-                # 分散と効果量の計算
-                ss_between = sum([len(group) * (group.mean() - overall_mean)**2 for group in group_data])
-                ss_total = sum((df[num_var] - overall_mean)**2)
-                ss_within = ss_total - ss_between
-                ms_within = ss_within / df_within
-
-                eta_squared = ss_between / ss_total
-                omega_squared = (ss_between - (df_between * ms_within)) / (ss_total + ms_within)
-
-                means = [group.mean() for group in group_data]
-                stds = [group.std(ddof=1) for group in group_data]
-
-                if pval < 0.01:
-                    sign = '**'
-                elif pval < 0.05:
-                    sign = '*'
-                elif pval < 0.1:
-                    sign = '†'
-                else:
-                    sign = 'n.s.'
-
-                df_results.loc[num_var] = [overall_mean, overall_std] + means + stds + \
-                    [df_between, df_within, fval, pval, sign, eta_squared, omega_squared]
+            # 群ごとの集計は一度だけ行い、分散分析と多重比較で共有する
+            moments = engine.grouped_moments(df, cat_var_str, num_vars, groups)
+            df_results = engine.anova_oneway_from_moments(moments)
 
             # 結果の表示
             numeric_columns = df_results.select_dtypes(include=['float64', 'int64']).columns
             styled_df = df_results.style.format({col: "{:.2f}" for col in numeric_columns})
             st.write(styled_df)
 
+            if permutation:
+                st.write('【並べ替え検定（F 値）】')
+                common.show_permutation_table(engine.permutation_anova_oneway(df, cat_var_str, num_vars, groups, **permutation))
+
+            if bootstrap:
+                st.write('【効果量 η² のブートストラップ信頼区間】')
+                common.show_bootstrap_table(engine.bootstrap_eta_squared(df, cat_var_str, num_vars, groups, **bootstrap), bootstrap)
+
             st.write("【多重比較の結果】")
 
+            # TukeyのHSDテストを全従属変数まとめて実行（群は昇順に並べる）
+            try:
+                tukey_all = engine.tukey_hsd(moments.take(sorted(moments.groups)))
+            except Exception as e:
+                st.error(f"TukeyのHSDテスト実行中にエラーが発生しました: {e}")
+                tukey_all = pd.DataFrame(columns=['variable'])
+
             for num_var in num_vars:
-                # TukeyのHSDテストを実行
                 try:
-                    tukey_result = pairwise_tukeyhsd(df[num_var], df[cat_var_str])
-                    # 結果をデータフレームに変換
-                    tukey_df = pd.DataFrame(data=tukey_result._results_table.data[1:], 
-                                            columns=tukey_result._results_table.data[0])
+                    tukey_df = tukey_all[tukey_all['variable'] == num_var].drop(columns='variable').reset_index(drop=True)
                     st.write(f'＜　　{num_var}　　に対する多重比較の結果＞')
                     st.write(tukey_df)
 
@@ -193,8 +140,9 @@ if df is not None:
             # サンプルサイズの表示
             st.write('＜サンプルサイズ＞')
             st.write(f'全体N ＝ {len(df)}')
+            group_sizes = df[cat_var_str].value_counts()
             for group_name in groups:
-                st.write(f'● {group_name}： {len(df[df[cat_var_str] == group_name])}')
+                st.write(f'● {group_name}： {group_sizes.get(group_name, 0)}')
 
             st.subheader('【解釈の補助】')
 
@@ -317,15 +265,8 @@ if df is not None:
                 return result_levels, len(levels)
 
             for num_var in num_vars:
-                # TukeyのHSDテストを実行
-                try:
-                    tukey_result = pairwise_tukeyhsd(df[num_var], df[cat_var_str])
-                    # 結果をデータフレームに変換
-                    tukey_df = pd.DataFrame(data=tukey_result._results_table.data[1:], 
-                                            columns=tukey_result._results_table.data[0])
-                except Exception as e:
-                    st.error(f"TukeyのHSDテスト実行中にエラーが発生しました: {e}")
-                    continue
+                # TukeyのHSDテストの結果を取り出す
+                tukey_df = tukey_all[tukey_all['variable'] == num_var]
 
                 # 有意な比較を抽出
                 significant_comparisons = []
@@ -438,3 +379,4 @@ if df is not None:
 # フッター
 common.display_copyright()
 common.display_special_thanks()
+common.display_startup_report()
@@ -1,18 +1,13 @@
-from itertools import combinations
 from statistics import median, variance
 
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-import statsmodels.api as sm
 import streamlit as st
 from PIL import Image
-from scipy import stats
-from statsmodels.stats.anova import AnovaRM
-from statsmodels.stats.multitest import multipletests
 
 import common
-
+from easystat import engine
 
 st.set_page_config(page_title="一要因分散分析（対応あり）", layout="wide")
 
@@ -33,7 +28,7 @@ except Exception as e:
 
 # ファイルアップローダー（Excel, CSV, テキスト）
 uploaded_file = st.file_uploader("CSV、Excel、またはテキストファイルを選択してください",
-                                 type=["csv", "xlsx", "txt"])
+                                 type=common.SUPPORTED_FILE_TYPES + ["txt"])
 
 # デモデータを使うかどうかのチェックボックス
 use_demo_data = st.checkbox('デモデータを使用')
@@ -41,25 +36,15 @@ use_demo_data = st.checkbox('デモデータを使用')
 # データフレームの作成
 df = None
 if use_demo_data:
-    try:
-        df = pd.read_excel('datasets/anova_demo_rel.xlsx', sheet_name=0)
+    df = common.load_demo_data('datasets/anova_demo_rel.xlsx')
+    if df is not None:
         st.write("【デモデータ】")
         st.write(df.head())
-    except FileNotFoundError:
-        st.error("デモデータファイルが見つかりません。ファイルパスを確認してください。")
 else:
-    if uploaded_file is not None:
-        try:
-            if uploaded_file.type == 'text/plain':
-                df = pd.read_csv(uploaded_file, delim_whitespace=True)
-            elif uploaded_file.type == 'text/csv':
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
-            st.write("【アップロードデータ】")
-            st.write(df.head())
-        except Exception as e:
-            st.error(f"ファイル読み込み中にエラーが発生しました: {e}")
+    df = common.load_data(uploaded_file)
+    if df is not None:
+        st.write("【アップロードデータ】")
+        st.write(df.head())
 
 if df is not None:
     st.subheader("検定対象の変数の選択")
@@ -107,47 +92,23 @@ if df is not None:
         # ----------------------------
         st.subheader("【分散分析（対応あり）】")
         try:
-            aovrm = AnovaRM(df_long, depvar='測定値', subject='被験者識別子', within=['条件'])
-            res = aovrm.fit()
-            # anova_tableをデータフレームとして表示
-            st.dataframe(res.anova_table.style.format("{:.2f}"))
+            # ワイド形式（被験者 × 条件）のまま計算（球面性の補正を含む）
+            anova_table = engine.anova_rm(df, selected_vars, within_name='条件')
+            st.dataframe(anova_table.style.format("{:.2f}"))
+            st.caption("GG: Greenhouse-Geisser の補正、HF: Huynh-Feldt の補正")
         except Exception as e:
             st.error(f"分散分析の実行中にエラーが発生しました: {e}")
 
         # ----------------------------
-        # 多重比較（各条件間の対応のある t 検定＋ボンフェローニ補正）
+        # 多重比較（各条件間の対応のある t 検定＋ボンフェローニ／ホルム補正）
         # ----------------------------
         st.subheader("【多重比較の結果】")
+        correction_methods = {'ボンフェローニ': 'bonferroni', 'ホルム': 'holm'}
+        correction_label = st.selectbox('p値の補正方法', list(correction_methods.keys()))
         try:
-            levels = df_long['条件'].unique()
-            pairwise_results = []
-            # 全組み合わせに対して対応のある t 検定を実施
-            for (level1, level2) in combinations(levels, 2):
-                data1 = df_long[df_long['条件'] == level1][['被験者識別子', '測定値']]
-                data2 = df_long[df_long['条件'] == level2][['被験者識別子', '測定値']]
-                merged = pd.merge(data1, data2, on='被験者識別子', suffixes=('_1', '_2'))
-                t_stat, p_val = stats.ttest_rel(merged['測定値_1'], merged['測定値_2'])
-                pairwise_results.append([level1, level2, t_stat, p_val])
-            
-            # ボンフェローニ補正
-            p_vals = [row[3] for row in pairwise_results]
-            reject, pvals_corrected, _, _ = multipletests(p_vals, method='bonferroni')
-            
-            # 判定：p補正値 < 0.01 → "**", < 0.05 → "*", < 0.1 → "†", それ以外は "n.s."
-            for i, row in enumerate(pairwise_results):
-                row.append(pvals_corrected[i])
-                p_adj = pvals_corrected[i]
-                if p_adj < 0.01:
-                    judgement = '**'
-                elif p_adj < 0.05:
-                    judgement = '*'
-                elif p_adj < 0.1:
-                    judgement = '†'
-                else:
-                    judgement = 'n.s.'
-                row.append(judgement)
-            pairwise_df = pd.DataFrame(pairwise_results, 
-                                       columns=['Level1', 'Level2', 't-stat', 'p-value', 'p-value (補正後)', '判定'])
+            # 被験者 × 条件の行列から全ペアの差をまとめて計算
+            pairwise_df = engine.paired_pairwise_table(
+                df, selected_vars, correction=correction_methods.get(correction_label, 'bonferroni'))
             st.write(pairwise_df.style.format({
                 't-stat': "{:.2f}",
                 'p-value': "{:.2f}",
@@ -336,10 +297,10 @@ if df is not None:
         # ----------------------------
         st.subheader("【解釈の補助】")
         try:
-            p_value_overall = res.anova_table['Pr > F'][0]
-            f_value_overall = res.anova_table['F Value'][0]
-            df_num = res.anova_table['Num DF'][0]
-            df_den = res.anova_table['Den DF'][0]
+            p_value_overall = anova_table['Pr > F'].iloc[0]
+            f_value_overall = anova_table['F Value'].iloc[0]
+            df_num = anova_table['Num DF'].iloc[0]
+            df_den = anova_table['Den DF'].iloc[0]
 
             if p_value_overall < 0.01:
                 significance_overall = "有意な差が生まれる"
@@ -402,3 +363,4 @@ if df is not None:
 # フッター
 common.display_copyright()
 common.display_special_thanks()
+common.display_startup_report()
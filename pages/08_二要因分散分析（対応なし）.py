@@ -1,14 +1,11 @@
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-import statsmodels.api as sm
-import statsmodels.formula.api as smf
 import streamlit as st
 from PIL import Image
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
 
 import common
-
+from easystat import engine
 
 st.set_page_config(page_title="二要因分散分析(対応なし)", layout="wide")
 
@@ -28,27 +25,17 @@ except Exception as e:
     st.warning("画像ファイルが見つかりません。")
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
 use_demo_data = st.checkbox('デモデータを使用')
 
 # データの読み込み
 df = None
 if use_demo_data:
-    try:
-        df = pd.read_excel('datasets/2way_anova_demo_mix.xlsx', sheet_name=0)
-        st.write(df.head())
-    except FileNotFoundError:
-        st.error("デモデータファイルが見つかりません。パスを確認してください。")
+    df = common.load_demo_data('datasets/2way_anova_demo_mix.xlsx')
 else:
-    if uploaded_file is not None:
-        try:
-            if uploaded_file.type == 'text/csv':
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
-            st.write(df.head())
-        except Exception as e:
-            st.error(f"ファイル読み込み中にエラーが発生しました: {e}")
+    df = common.load_data(uploaded_file)
+if df is not None:
+    st.write(df.head())
 
 # mark_significance 関数の定義
 def mark_significance(p):
@@ -103,6 +90,17 @@ if df is not None:
                 else:
                     return "n.s."
             
+            # 平方和のタイプ（タイプIIIは効果コーディングで計算）
+            sum_sq_types = {'タイプII': 2, 'タイプIII': 3}
+            sum_sq_label = st.selectbox('平方和のタイプ', list(sum_sq_types.keys()))
+
+            # 計画行列を一度だけ作り、全従属変数の分散分析をまとめて計算
+            try:
+                anova_tables = engine.anova_twoway(df, factor1, factor2, dep_vars, typ=sum_sq_types.get(sum_sq_label, 2))
+                anova_error = None
+            except Exception as e:
+                anova_tables, anova_error = {}, e
+
             # 各従属変数について解析
             for dv in dep_vars:
                 st.markdown(f"## 従属変数: {dv}")
@@ -129,21 +127,18 @@ if df is not None:
                 
                 # ② 二要因分散分析の実行
                 st.write("【二要因分散分析の実行】")
-                try:
-                    formula = f'Q("{dv}") ~ C(Q("{factor1}")) * C(Q("{factor2}"))'
-                    model = smf.ols(formula, data=df).fit()
-                    anova_results = sm.stats.anova_lm(model, typ=2)
-                    st.write(anova_results.style.format("{:.2f}"))
-                except Exception as e:
-                    st.error(f"二要因分散分析実行中にエラーが発生しました: {e}")
+                if dv not in anova_tables:
+                    st.error(f"二要因分散分析実行中にエラーが発生しました: {anova_error or '有効なデータがありません'}")
                     continue
+                anova_results = anova_tables[dv]
+                st.write(anova_results.style.format("{:.2f}"))
                 
                 # ③ ANOVA結果から解釈の補助を表示
                 st.subheader("【解釈の補助】")
                 df_anova = anova_results.copy()
                 df_anova['sign'] = df_anova['PR(>F)'].apply(mark_significance)
                 for effect in df_anova.index:
-                    if effect == 'Residual':
+                    if effect in ('Intercept', 'Residual'):
                         continue
                     p_value = df_anova.loc[effect, 'PR(>F)']
                     sign = df_anova.loc[effect, 'sign']
@@ -165,9 +160,9 @@ if df is not None:
 
                     # 主効果と交互作用のp値を取得
                     effect_names = {
-                        "factor1": f'C(Q("{factor1}"))',
-                        "factor2": f'C(Q("{factor2}"))',
-                        "interaction": f'C(Q("{factor1}")):C(Q("{factor2}"))'
+                        "factor1": factor1,
+                        "factor2": factor2,
+                        "interaction": f"{factor1}:{factor2}"
                     }
 
                     anova_ai_results = {
@@ -192,11 +187,7 @@ if df is not None:
                 # Interaction列を作成（因子の組み合わせ）
                 df['Interaction'] = df[factor1].astype(str) + "_" + df[factor2].astype(str)
                 try:
-                    tukey_result = pairwise_tukeyhsd(endog=df[dv], groups=df['Interaction'])
-                    tukey_df = pd.DataFrame(
-                        data=tukey_result._results_table.data[1:],
-                        columns=tukey_result._results_table.data[0]
-                    )
+                    tukey_df = engine.posthoc_table(df, 'Interaction', [dv]).drop(columns='variable')
                     st.write(tukey_df.style.format({
                         'meandiff': '{:.2f}',
                         'p-adj': '{:.2f}',
@@ -268,9 +259,9 @@ if df is not None:
                 
                 # ANOVA結果から各効果の有意性を抽出
                 effect_names = {
-                    "factor1": f'C(Q("{factor1}"))',
-                    "factor2": f'C(Q("{factor2}"))',
-                    "interaction": f'C(Q("{factor1}")):C(Q("{factor2}"))'
+                    "factor1": factor1,
+                    "factor2": factor2,
+                    "interaction": f"{factor1}:{factor2}"
                 }
                 sig_factor1 = interpret_p(anova_results.loc[effect_names["factor1"], 'PR(>F)']) if effect_names["factor1"] in anova_results.index else "n.s."
                 sig_factor2 = interpret_p(anova_results.loc[effect_names["factor2"], 'PR(>F)']) if effect_names["factor2"] in anova_results.index else "n.s."
@@ -296,3 +287,5 @@ if df is not None:
             
             common.display_copyright()
             common.display_special_thanks()
+
+common.display_startup_report()
@@ -1,13 +1,11 @@
 import numpy as np
 import pandas as pd
-import pingouin as pg
 import plotly.graph_objects as go
 import streamlit as st
 from PIL import Image
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
 
 import common
-
+from easystat import engine
 
 st.set_page_config(page_title="二要因混合分散分析", layout="wide")
 
@@ -26,27 +24,17 @@ except Exception as e:
     st.warning("画像ファイルが見つかりません。")
 
 # ファイルアップローダー
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
 use_demo_data = st.checkbox('デモデータを使用')
 
 # データ読み込み
 df = None
 if use_demo_data:
-    try:
-        df = pd.read_excel('datasets/2way_anova_demo_mix.xlsx', sheet_name=0)
-        st.write(df.head())
-    except FileNotFoundError:
-        st.error("デモデータファイルが見つかりません。パスを確認してください。")
+    df = common.load_demo_data('datasets/2way_anova_demo_mix.xlsx')
 else:
-    if uploaded_file is not None:
-        try:
-            if uploaded_file.type == 'text/csv':
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
-            st.write(df.head())
-        except Exception as e:
-            st.error(f"ファイル読み込み中にエラーが発生しました: {e}")
+    df = common.load_data(uploaded_file)
+if df is not None:
+    st.write(df.head())
 
 # p値の解釈用関数
 def interpret_p(p):
@@ -173,37 +161,39 @@ if df is not None:
         st.write("これらの変数に前後の差があるか検定します。")
         
         final_tables = []
+
+        # 全変数ペアの混合ANOVAをワイド形式のまままとめて計算
+        try:
+            aov_tables = engine.mixed_anova(df, selected_between, list(zip(pre_vars, post_vars)))
+            aov_error = None
+        except Exception as e:
+            aov_tables, aov_error = [], e
         
         # 各変数ペアごとに処理
         for i, (pre, post) in enumerate(zip(pre_vars, post_vars)):
             st.markdown(f"## 分析対象変数ペア {i+1}: {pre}（前測） と {post}（後測）")
             
             # ワイド→ロング変換
-            n = len(df)
-            df_long = pd.DataFrame()
-            df_long[subject_col] = np.repeat(df[subject_col].values, 2)
-            df_long[selected_between] = np.repeat(df[selected_between].values, 2)
-            df_long["Time"] = ["前", "後"] * n
-            df_long["value"] = np.concatenate([df[pre].values, df[post].values])
+            df_long = engine.wide_to_long(df, subject_col, selected_between, [pre, post], ["前", "後"])
             
             st.write("【セルごとの要約統計量】")
             desc = df_long.groupby([selected_between, "Time"])["value"].agg(["count", "mean", "std", "min", "max"]).reset_index()
             st.write(desc.style.format({"mean": "{:.2f}", "std": "{:.2f}", "min": "{:.2f}", "max": "{:.2f}"}))
             
             st.write("【混合ANOVAの実行】")
-            try:
-                aov = pg.mixed_anova(dv="value", within="Time", between=selected_between, subject=subject_col, data=df_long)
-                st.write(aov)
-            except Exception as e:
-                st.error(f"混合ANOVA実行中にエラーが発生しました: {e}")
+            if aov_error is not None:
+                st.error(f"混合ANOVA実行中にエラーが発生しました: {aov_error}")
+                continue
+            aov = aov_tables[i]
+            if aov is None:
+                st.error("混合ANOVA実行中にエラーが発生しました: 欠損値を除くと有効な被験者が不足しています")
                 continue
+            st.write(aov)
             
             st.write("【多重比較（Tukey HSDテスト）】")
             df_long["Interaction"] = df_long[selected_between].astype(str) + "_" + df_long["Time"]
             try:
-                tukey = pairwise_tukeyhsd(endog=df_long["value"], groups=df_long["Interaction"])
-                tukey_df = pd.DataFrame(data=tukey._results_table.data[1:],
-                                        columns=tukey._results_table.data[0])
+                tukey_df = engine.posthoc_table(df_long, "Interaction", ["value"]).drop(columns="variable")
                 st.write(tukey_df)
             except Exception as e:
                 st.error(f"Tukey HSDテスト実行中にエラーが発生しました: {e}")
@@ -292,10 +282,7 @@ if df is not None:
             
             # 各条件ごとに Tukey HSD を実施して、ブラケットとアノテーションを追加（前測）
             try:
-                tukey_pre = pairwise_tukeyhsd(endog=df_long[df_long["Time"]=="前"]["value"],
-                                              groups=df_long[df_long["Time"]=="前"][selected_between])
-                tukey_pre_df = pd.DataFrame(data=tukey_pre._results_table.data[1:],
-                                            columns=tukey_pre._results_table.data[0])
+                tukey_pre_df = engine.posthoc_table(df_long[df_long["Time"] == "前"], selected_between, ["value"])
             except Exception as e:
                 st.error(f"Tukey HSDテスト（前測）実行中にエラーが発生しました: {e}")
                 tukey_pre_df = pd.DataFrame()
@@ -316,10 +303,7 @@ if df is not None:
             
             # 後測の比較
             try:
-                tukey_post = pairwise_tukeyhsd(endog=df_long[df_long["Time"]=="後"]["value"],
-                                               groups=df_long[df_long["Time"]=="後"][selected_between])
-                tukey_post_df = pd.DataFrame(data=tukey_post._results_table.data[1:],
-                                             columns=tukey_post._results_table.data[0])
+                tukey_post_df = engine.posthoc_table(df_long[df_long["Time"] == "後"], selected_between, ["value"])
             except Exception as e:
                 st.error(f"Tukey HSDテスト（後測）実行中にエラーが発生しました: {e}")
                 tukey_post_df = pd.DataFrame()
@@ -447,3 +431,5 @@ if df is not None:
         
         common.display_copyright()
         common.display_special_thanks()
+
+common.display_startup_report()
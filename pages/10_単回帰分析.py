@@ -1,10 +1,13 @@
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-import statsmodels.api as sm
 import streamlit as st
 
 import common
+from easystat.lazy import lazy_import
+
+# 重いライブラリは使う時点で読み込む
+sm = lazy_import('statsmodels.api')
 
 
 st.set_page_config(page_title="単回帰分析", layout="wide")
@@ -18,18 +21,14 @@ st.write("")
 st.write("説明変数と目的変数の関係を単回帰分析を使用して分析する補助を行います。")
 st.write("")
 
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
 use_demo_data = st.checkbox('デモデータを使用')
 
 input_df = None
 if use_demo_data:
-    input_df = pd.read_excel('datasets/correlation_demo.xlsx', sheet_name=0)
+    input_df = common.load_demo_data('datasets/correlation_demo.xlsx')
 else:
-    if uploaded_file is not None:
-        if uploaded_file.type == 'text/csv':
-            input_df = pd.read_csv(uploaded_file)
-        else:
-            input_df = pd.read_excel(uploaded_file)
+    input_df = common.load_data(uploaded_file)
 
 feature_col = None
 target_col = None
@@ -151,3 +150,4 @@ if input_df is not None:
 # フッター
 common.display_copyright()
 common.display_special_thanks()
+common.display_startup_report()
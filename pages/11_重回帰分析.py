@@ -1,22 +1,17 @@
-import itertools
-import os
 import json
-import requests
 
-import matplotlib.font_manager as font_manager
-import matplotlib.patches as mpatches
-import matplotlib.pyplot as plt
-import japanize_matplotlib
-import networkx as nx
 import numpy as np
 import pandas as pd
-import statsmodels.api as sm
 import streamlit as st
-from scipy import stats
-from sklearn.metrics import r2_score
-from sklearn.preprocessing import StandardScaler
 
 import common
+from easystat import engine
+from easystat.lazy import lazy_import
+
+# 重いライブラリは使う時点で読み込む
+plt = lazy_import('matplotlib.pyplot', requires=('japanize_matplotlib',))
+nx = lazy_import('networkx')
+requests = lazy_import('requests')
 
 st.set_page_config(page_title='重回帰分析', layout='wide')
 
@@ -252,18 +247,15 @@ elif enable_ai_interpretation and not gemini_api_key:
 
 st.write("")
 
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
 use_demo_data = st.checkbox('デモデータを使用')
 
 input_df = None
 if use_demo_data:
-    input_df = pd.read_excel('datasets/multiple_regression_demo.xlsx', sheet_name=0)
-elif uploaded_file is not None:
-    if uploaded_file.type == 'text/csv':
-        input_df = pd.read_csv(uploaded_file)
-    else:
-        input_df = pd.read_excel(uploaded_file)
-        
+    input_df = common.load_demo_data('datasets/multiple_regression_demo.xlsx')
+else:
+    input_df = common.load_data(uploaded_file)
+
 if input_df is not None:
     st.subheader('元のデータ')
     st.write(input_df)
@@ -305,6 +297,30 @@ if input_df is not None:
     if selected_interactions:
         st.write(f"交互作用項: {[name for _, _, name in selected_interactions]}")
        
+    show_standardized_ci = st.checkbox('標準化係数の標準誤差と95%信頼区間を表示する')
+    bootstrap = common.bootstrap_options('決定係数と係数のブートストラップ信頼区間を表示する')
+
+    # モデル探索（変数選択）
+    if st.checkbox('モデル探索（変数選択）を行う'):
+        search_methods = {'ステップワイズ': 'stepwise', '前進選択': 'forward', '後退除去': 'backward', '総当たり': 'exhaustive'}
+        search_criteria = {'AIC': 'aic', 'BIC': 'bic', '調整済みR²': 'adj_r2'}
+        search_method = st.selectbox('探索方法', list(search_methods))
+        search_criterion = st.selectbox('評価基準', list(search_criteria))
+        if st.button('モデル探索の実行') and len(X_columns) > 0:
+            for y_column in y_columns:
+                try:
+                    search = engine.model_search(input_df, X_columns, y_column, selected_interactions,
+                                                 method=search_methods[search_method],
+                                                 criterion=search_criteria[search_criterion])
+                except ValueError as e:
+                    st.error(f"目的変数 {y_column} のモデル探索に失敗しました: {e}")
+                    continue
+                st.subheader(f"モデル探索の結果：目的変数 {y_column}")
+                st.write(f"選ばれた説明変数（{search_method}・{search_criterion}、n = {search.n_obs}）: "
+                         f"{', '.join(search.selected) if search.selected else '（定数項のみ）'}")
+                st.dataframe(search.history.style.format(
+                    {'AIC': '{:.2f}', 'BIC': '{:.2f}', '調整済みR²': '{:.3f}', 'R²': '{:.3f}'}))
+
     # 重回帰分析の実施
     if st.button('重回帰分析の実行'):
 
@@ -312,20 +328,10 @@ if input_df is not None:
             # 結果をセッション状態に保存するためのキー
             results_key = "regression_results"
 
-            # 元の説明変数のコピー
-            X_original = input_df[X_columns].copy()
+            # 全目的変数の重回帰分析（交互作用項はユーザーが選択したもののみ）
+            ols_results = engine.ols_multi(input_df, X_columns, y_columns, selected_interactions,
+                                           standardized_ci=show_standardized_ci)
 
-            # 交互作用項の生成（ユーザーが選択したもののみ）
-            X = X_original.copy()
-            interaction_terms = []
-            if selected_interactions:
-                for var1, var2, interaction_name in selected_interactions:
-                    X[interaction_name] = X_original[var1] * X_original[var2]
-                    interaction_terms.append(interaction_name)
-
-            # すべての説明変数（交互作用項を含む）
-            X_all_columns = X.columns.tolist()
-            
             # 結果をまとめるリストを初期化
             all_nodes = set()
             all_edges = []
@@ -340,78 +346,12 @@ if input_df is not None:
             individual_results = []
 
             for y_column in y_columns:
-                y = input_df[y_column]
-
-                # 欠損値を含む行を削除（説明変数と目的変数の両方を考慮）
-                data_for_analysis = pd.concat([X, y], axis=1).dropna()
-                X_clean = data_for_analysis[X.columns]
-                y_clean = data_for_analysis[y_column]
-
-                if len(X_clean) == 0:
+                if y_column not in ols_results:
                     st.error(f"目的変数 {y_column} の分析でデータが不足しています。欠損値を確認してください。")
                     continue
+                result = ols_results[y_column]
+                coefficients = result.coefficients.copy()
 
-                # 元のデータで回帰分析（偏回帰係数用）
-                X_with_const = sm.add_constant(X_clean)
-                model = sm.OLS(y_clean, X_with_const).fit()
-
-                # 偏回帰係数の取得
-                unstandardized_coefs = model.params.values
-
-                # 標準化係数の計算（元の変数のみ）
-                # 方法: β_standardized = β × (SD_X / SD_Y)
-                # ただし、元の変数のみを標準化して回帰分析を行う
-                X_original_clean = X_clean[X_columns]
-
-                scaler_X = StandardScaler()
-                scaler_y = StandardScaler()
-
-                X_original_standardized = scaler_X.fit_transform(X_original_clean)
-                y_standardized = scaler_y.fit_transform(y_clean.values.reshape(-1, 1)).flatten()
-
-                # 標準化されたデータで回帰分析（定数項なし、元の変数のみ）
-                model_standardized = sm.OLS(y_standardized, X_original_standardized).fit()
-                standardized_coefs_original = model_standardized.params
-
-                # 交互作用項の標準化係数を計算（β × SD_X / SD_Y の方法）
-                standardized_coefs_list = list(standardized_coefs_original)
-                if interaction_terms:
-                    sd_y = y_clean.std()
-                    for interaction_name in interaction_terms:
-                        sd_x_interaction = X_clean[interaction_name].std()
-                        # 対応する偏回帰係数のインデックスを取得
-                        var_idx = list(X.columns).index(interaction_name)
-                        beta_unstd = model.params[var_idx + 1]  # +1 は定数項の分
-                        beta_std = beta_unstd * (sd_x_interaction / sd_y)
-                        standardized_coefs_list.append(beta_std)
-
-                # 偏回帰係数と標準化係数をデータフレームにまとめる
-                coefficients = pd.DataFrame({
-                    "変数": X_with_const.columns,
-                    "偏回帰係数": unstandardized_coefs,
-                    "標準化係数": np.insert(standardized_coefs_list, 0, np.nan)  # 定数項にnanを挿入
-                })
-
-                coefficients['p値'] = model.pvalues.values
-                
-                # 有意判定の追加
-                def significance(p):
-                    if p < 0.01:
-                        return '**'
-                    elif p < 0.05:
-                        return '*'
-                    elif p < 0.1:
-                        return '†'
-                    else:
-                        return 'n.s.'
-                coefficients['Sign'] = coefficients['p値'].apply(significance)
-                
-                # 'const'（定数項）を削除
-                coefficients = coefficients[coefficients['変数'] != 'const']
-                
-                # インデックスをリセットして、行番号を非表示に
-                coefficients = coefficients.reset_index(drop=True)
-                
                 # 実数を小数点第2位まで表示、整数はそのまま
                 def format_numbers(x):
                     if pd.isnull(x):
@@ -427,11 +367,11 @@ if input_df is not None:
                 st.dataframe(coefficients)
                 
                 # 決定係数、F値、自由度、p値を取得
-                r2 = model.rsquared
-                f_value = model.fvalue
-                df_model = int(model.df_model)
-                df_resid = int(model.df_resid)
-                p_value = model.f_pvalue
+                r2 = result.r2
+                f_value = result.f_value
+                df_model = result.df_model
+                df_resid = result.df_resid
+                p_value = result.f_pvalue
                 
                 # 統計量を表示（実数は小数点第2位まで）
                 summary_df = pd.DataFrame({
@@ -443,12 +383,17 @@ if input_df is not None:
                 st.dataframe(summary_df)
                 
                 # 数理モデルの表示
-                intercept = model.params[0]
-                coefs = model.params[1:]
-                equation_terms = [f"{coef:.2f} × {var}" for coef, var in zip(coefs, X_with_const.columns[1:])]
+                intercept = result.intercept
+                equation_terms = [f"{coef:.2f} × {var}" for coef, var in zip(result.coefficients['偏回帰係数'], result.coefficients['変数'])]
                 equation = f"{y_column} = {intercept:.2f} + " + " + ".join(equation_terms)
                 st.write("数理モデル：")
                 st.write(equation)
+
+                bootstrap_df = None
+                if bootstrap:
+                    st.write('【ブートストラップ信頼区間】')
+                    bootstrap_df = engine.bootstrap_ols(input_df, X_columns, y_column, selected_interactions, **bootstrap)
+                    common.show_bootstrap_table(bootstrap_df, bootstrap)
                 
                 # AI解釈機能の追加
                 if gemini_api_key and enable_ai_interpretation:
@@ -512,7 +457,8 @@ if input_df is not None:
                     'y_column': y_column,
                     'coefficients': coefficients.copy(),
                     'summary_df': summary_df.copy(),
-                    'equation': equation
+                    'equation': equation,
+                    'bootstrap': (bootstrap_df, bootstrap),
                 })
 
                 # パス図の作成
@@ -811,6 +757,10 @@ if results_key in st.session_state:
         st.dataframe(summary_df)
         st.write("数理モデル：")
         st.write(equation)
+        bootstrap_df, bootstrap_settings = result.get('bootstrap', (None, None))
+        if bootstrap_df is not None:
+            st.write('【ブートストラップ信頼区間】')
+            common.show_bootstrap_table(bootstrap_df, bootstrap_settings)
         
         # AI解釈機能
         if gemini_api_key and enable_ai_interpretation:
@@ -990,3 +940,4 @@ st.write('')
 # フッター
 common.display_copyright()
 common.display_special_thanks()
+common.display_startup_report()
@@ -1,18 +1,13 @@
 import io
 
-import japanize_matplotlib
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 from PIL import Image
-from factor_analyzer import FactorAnalyzer
-from factor_analyzer.factor_analyzer import calculate_kmo, calculate_bartlett_sphericity
-from scipy.stats import chi2
 
 import common
+from easystat import engine
 
 
 st.set_page_config(page_title="因子分析", layout="wide")
@@ -23,37 +18,15 @@ st.title("因子分析")
 common.display_header()
 st.write("データから因子構造を抽出し、因子負荷量、適合度指標、信頼性係数、そして因子平均を算出・ダウンロードできます。")
 
-# --- データ読み込み処理の関数化 ---
-@st.cache_data
-def load_data(file):
-    """
-    アップロードされたファイルを読み込み、DataFrameを返す
-    """
-    try:
-        if file.type == 'text/csv':
-            return pd.read_csv(file)
-        elif file.type in ['application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'application/vnd.ms-excel']:
-            return pd.read_excel(file)
-        else:
-            st.error("対応していないファイル形式です。")
-            return None
-    except Exception as e:
-        st.error(f"データの読み込み中にエラーが発生しました: {str(e)}")
-        return None
-
 # --- データのアップロードまたはデモデータの利用 ---
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
 use_demo_data = st.checkbox('デモデータを使用')
 
 df = None
 if use_demo_data:
-    try:
-        df = pd.read_excel('datasets/factor_analysis_demo.xlsx', sheet_name=0)
-    except Exception as e:
-        st.error(f"デモデータの読み込みに失敗しました: {str(e)}")
+    df = common.load_demo_data('datasets/factor_analysis_demo.xlsx')
 else:
-    if uploaded_file is not None:
-        df = load_data(uploaded_file)
+    df = common.load_data(uploaded_file)
 
 if df is not None:
     # --- データプレビュー（折りたたみ表示） ---
@@ -112,8 +85,7 @@ if df is not None:
             
             # --- KMOとBartlettの球面性検定 ---
             try:
-                kmo_all, kmo_model = calculate_kmo(df[selected_vars])
-                chi_square_value, p_value = calculate_bartlett_sphericity(df[selected_vars])
+                kmo_model, chi_square_value, p_value = engine.sampling_adequacy(df[selected_vars])
                 st.write("KMO値:", round(kmo_model, 3))
                 st.write("Bartlettの球面性検定:")
                 st.write(f"カイ二乗値: {round(chi_square_value, 3)}, p値: {round(p_value, 3)}")
@@ -122,19 +94,19 @@ if df is not None:
 
             # --- 因子分析の実行 ---
             try:
-                fa = FactorAnalyzer(
-                    rotation=rotation_dict[rotation],
+                fa_result = engine.factor_analysis(
+                    df[selected_vars],
                     n_factors=n_factors,
-                    method=method_dict[method]
+                    method=method_dict[method],
+                    rotation=rotation_dict[rotation]
                 )
-                fa.fit(df[selected_vars])
             except Exception as e:
                 st.error(f"因子分析の実行中にエラーが発生しました: {str(e)}")
             else:
                 # --- スクリープロットの作成 ---
                 st.subheader("スクリープロット")
                 try:
-                    ev, v = fa.get_eigenvalues()
+                    ev = fa_result.eigenvalues
                     fig_scree = go.Figure()
                     fig_scree.add_trace(go.Scatter(x=list(range(1, len(ev)+1)), y=ev,
                                                  mode='lines+markers',
@@ -147,59 +119,20 @@ if df is not None:
                 except Exception as e:
                     st.error(f"スクリープロットの作成中にエラーが発生しました: {str(e)}")
 
-                # --- 因子負荷量の計算と表示 ---
+                # --- 因子負荷量の表示 ---
                 st.subheader("因子負荷量")
-                try:
-                    loadings = pd.DataFrame(
-                        fa.loadings_,
-                        columns=[f'Factor{i+1}' for i in range(n_factors)],
-                        index=selected_vars
-                    )
-                    # 共通性の計算
-                    communalities = fa.get_communalities()
-                    loadings['共通性'] = communalities
+                loadings = fa_result.loadings
+                factor_assignments = fa_result.assignments
 
-                    # 各項目の最大負荷量を持つ因子とその値を特定（各項目は最も寄与する因子に割り当て）
-                    factor_assignments = {f'Factor{i+1}': [] for i in range(n_factors)}
-                    for idx in loadings.index:
-                        factor_loadings = loadings.loc[idx, [f'Factor{i+1}' for i in range(n_factors)]]
-                        max_factor = factor_loadings.abs().idxmax()
-                        if abs(factor_loadings[max_factor]) >= 0.4:
-                            factor_assignments[max_factor].append(idx)
-                    
-                    # 表示用：各因子に割り当てられた項目一覧を表示
-                    st.write("各因子に割り当てられた項目（負荷量0.4以上の場合）:")
-                    st.write(factor_assignments)
-                    
-                    # ※信頼性係数等で利用するために、最終的な表示用DataFrameも作成
-                    max_loading_info = []
-                    for factor, items in factor_assignments.items():
-                        for item in items:
-                            max_loading_info.append({
-                                '項目': item,
-                                '因子番号': factor,
-                                '負荷量': loadings.loc[item, factor]
-                            })
-                    final_loadings = pd.DataFrame(max_loading_info)
-                    final_loadings.set_index('項目', inplace=True)
-                    
-                    st.dataframe(final_loadings.style.format(formatter={'負荷量': '{:.3f}'}))
-                except Exception as e:
-                    st.error(f"因子負荷量の計算・表示中にエラーが発生しました: {str(e)}")
+                # 表示用：各因子に割り当てられた項目一覧を表示
+                st.write("各因子に割り当てられた項目（負荷量0.4以上の場合）:")
+                st.write(factor_assignments)
+                st.dataframe(fa_result.final_loadings.style.format(formatter={'負荷量': '{:.3f}'}))
 
                 # --- 因子間相関の表示 ---
                 st.subheader("因子間相関")
-                if hasattr(fa, 'corr_'):
-                    try:
-                        corr_matrix = fa.corr_[:n_factors, :n_factors]
-                        factor_corr = pd.DataFrame(
-                            corr_matrix,
-                            columns=[f'Factor{i+1}' for i in range(n_factors)],
-                            index=[f'Factor{i+1}' for i in range(n_factors)]
-                        )
-                        st.dataframe(factor_corr.round(3))
-                    except Exception as e:
-                        st.error(f"因子間相関の計算中にエラーが発生しました: {str(e)}")
+                if fa_result.factor_corr is not None:
+                    st.dataframe(fa_result.factor_corr.round(3))
                 else:
                     st.info("※ バリマックス回転を選択した場合、因子間相関は直交を仮定するため表示されません")
                 
@@ -207,40 +140,11 @@ if df is not None:
                 if method == '最尤法':
                     st.subheader("適合度指標（最尤法）")
                     try:
-                        # 変数数
-                        p = len(selected_vars)
-                        # サンプルサイズ
-                        N_samples = len(df)
-                        
-                        # サンプル相関行列 S (p×p)
-                        S = df[selected_vars].corr().values
-                        
-                        # モデルが再現する相関行列 Σ_model の計算
-                        Lambda = fa.loadings_
-                        communalities = fa.get_communalities()
-                        uniquenesses = 1 - communalities
-                        Psi = np.diag(uniquenesses)
-                        Sigma_model = np.dot(Lambda, Lambda.T) + Psi
-                        
-                        # 不一致関数 F の計算
-                        det_Sigma_model = np.linalg.det(Sigma_model)
-                        det_S = np.linalg.det(S)
-                        if det_Sigma_model <= 0 or det_S <= 0:
-                            raise ValueError("行列式が非正値です。標本サイズや変数の分散を確認してください。")
-                        
-                        F_val = np.log(det_Sigma_model) + np.trace(np.dot(np.linalg.inv(Sigma_model), S)) - np.log(det_S) - p
-                        # カイ二乗統計量の計算
-                        chi_square = (N_samples - 1 - (2*p + 5)/6) * F_val
-                        # 自由度の計算：df = 0.5 * [(p - m)² - p - m]
-                        df_model = 0.5 * ((p - n_factors)**2 - p - n_factors)
-                        # p値の計算（自由度が正の場合）
-                        if df_model > 0:
-                            p_value_model = 1 - chi2.cdf(chi_square, df_model)
-                            # RMSEA の計算：RMSEA = sqrt(max(chi_square - df, 0) / (df*(N-1)))
-                            rmsea = np.sqrt(max(chi_square - df_model, 0) / (df_model * (N_samples - 1)))
-                        else:
-                            p_value_model = np.nan
-                            rmsea = np.nan
+                        fit = engine.ml_fit_indices(df[selected_vars], fa_result)
+                        chi_square = fit['chi_square']
+                        df_model = fit['df']
+                        p_value_model = fit['p_value']
+                        rmsea = fit['rmsea']
                         
                         col1, col2 = st.columns(2)
                         with col1:
@@ -279,25 +183,12 @@ if df is not None:
                 # --- 信頼性係数（Cronbachのα）の計算 ---
                 st.subheader("信頼性係数")
                 
-                def calculate_cronbach_alpha(items):
-                    try:
-                        if len(items.columns) <= 1:
-                            return np.nan
-                        corr_matrix = items.corr()
-                        n = len(items.columns)
-                        mean_corr = (corr_matrix.values.sum() - n) / (n * (n-1))
-                        alpha = (n * mean_corr) / (1 + (n-1) * mean_corr)
-                        return alpha
-                    except Exception as e:
-                        st.error(f"Cronbachのα計算中にエラーが発生しました: {str(e)}")
-                        return np.nan
-                
                 for i in range(n_factors):
                     mask = loadings[f'Factor{i+1}'].abs() >= 0.4
                     factor_vars = loadings.index[mask].tolist()
                     if len(factor_vars) > 1:
                         factor_items = df[factor_vars]
-                        alpha = calculate_cronbach_alpha(factor_items)
+                        alpha = engine.cronbach_alpha(factor_items)
                         if not np.isnan(alpha):
                             st.write(f"Factor{i+1} α係数:", round(alpha, 3))
                         else:
@@ -309,7 +200,7 @@ if df is not None:
                 if enable_ai_interpretation and gemini_api_key:
                     try:
                         # 固有値から寄与率を計算
-                        ev, _ = fa.get_eigenvalues()
+                        ev = fa_result.eigenvalues
                         total_variance = np.sum(ev)
                         variance_explained = [(ev[i] / total_variance * 100) for i in range(n_factors)]
                         cumulative_variance = [sum(variance_explained[:i+1]) for i in range(n_factors)]
@@ -336,12 +227,7 @@ if df is not None:
                 try:
                     # 事前に作成した factor_assignments を利用し、
                     # 各因子に割り当てられた項目の平均値を計算
-                    factor_means_df = pd.DataFrame(index=df.index)
-                    for factor, items in factor_assignments.items():
-                        if len(items) > 0:
-                            factor_means_df[f'{factor}_mean'] = df[items].mean(axis=1)
-                        else:
-                            factor_means_df[f'{factor}_mean'] = np.nan
+                    factor_means_df = engine.factor_means(df, factor_assignments)
                     
                     # 元のデータから、分析に使用した項目を削除
                     df_remaining = df.drop(columns=selected_vars)
@@ -368,3 +254,4 @@ if df is not None:
 # --- フッター表示 ---
 common.display_copyright()
 common.display_special_thanks()
+common.display_startup_report()
@@ -3,10 +3,13 @@ import io
 import pandas as pd
 import streamlit as st
 from PIL import Image
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
 
 import common
+from easystat import engine
+from easystat.lazy import lazy_import
+
+# 重いライブラリは使う時点で読み込む
+plt = lazy_import('matplotlib.pyplot', requires=('japanize_matplotlib',))
 
 
 common.set_font()
@@ -24,39 +27,14 @@ st.write("iPad等でも分析を行うことができます")
 st.write("")
 
 # --- ファイルアップロード・デモデータの読み込み ---
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
 use_demo_data = st.checkbox("デモデータを使用")
 
-@st.cache_data
-def load_data(file):
-    """
-    アップロードされたファイルを読み込み、DataFrameとして返す関数
-    ExcelまたはCSV形式に対応
-    """
-    try:
-        if file.type == "text/csv":
-            return pd.read_csv(file)
-        elif file.type in [
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            "application/vnd.ms-excel",
-        ]:
-            return pd.read_excel(file)
-        else:
-            st.error("対応していないファイル形式です。")
-            return None
-    except Exception as e:
-        st.error(f"データの読み込み中にエラーが発生しました: {e}")
-        return None
-
 df = None
 if use_demo_data:
-    try:
-        # ※ デモデータのファイルパスは適宜変更してください
-        df = pd.read_excel("datasets/factor_analysis_demo.xlsx", sheet_name=0)
-    except Exception as e:
-        st.error(f"デモデータの読み込みに失敗しました: {e}")
-elif uploaded_file is not None:
-    df = load_data(uploaded_file)
+    df = common.load_demo_data("datasets/factor_analysis_demo.xlsx")
+else:
+    df = common.load_data(uploaded_file)
 
 if df is not None:
     st.write("【入力データ】")
@@ -79,31 +57,26 @@ if df is not None:
             st.dataframe(df_selected.head())
 
             # --- PCAの実行 ---
-            scaler = StandardScaler()
-            df_scaled = scaler.fit_transform(df_selected)
-            
             # 主成分の数は選択可能（上限は選択変数数と8のうち小さい方）
             n_components = st.slider("主成分の数を選択してください", 1, min(len(selected_vars), 8))
-            pca = PCA(n_components=n_components)
-            components = pca.fit_transform(df_scaled)
+            pca_result = engine.pca(df_selected, n_components)
+            components = pca_result.scores.values
             
             # --- 説明分散比率の表示 ---
             explained_df = pd.DataFrame({
                 "主成分": [f"PC{i+1}" for i in range(n_components)],
-                "説明分散比率": pca.explained_variance_ratio_
+                "説明分散比率": pca_result.explained_variance_ratio
             })
             st.subheader("【各主成分の説明分散比率】")
             st.dataframe(explained_df.style.format({"説明分散比率": "{:.3f}"}))
             
             # --- 主成分得点の表示 ---
-            pc_df = pd.DataFrame(components, columns=[f"PC{i+1}" for i in range(n_components)])
+            pc_df = pca_result.scores
             st.subheader("【各サンプルの主成分得点】")
             st.dataframe(pc_df.style.format("{:.3f}"))
             
             # --- 主成分のロードings（係数）の表示 ---
-            loading_df = pd.DataFrame(pca.components_.T,
-                                      index=selected_vars,
-                                      columns=[f"PC{i+1}" for i in range(n_components)])
+            loading_df = pca_result.loadings
             st.write("【各主成分のロードings（係数）】")
             st.dataframe(loading_df.style.format("{:.3f}"))
             
@@ -122,7 +95,6 @@ if df is not None:
             # === 追加機能：バイプロットの表示（主成分が2つ以上の場合） ===
             if n_components >= 2:
                 st.subheader("バイプロット (PC1 vs PC2)")
-                import matplotlib.pyplot as plt
                 fig, ax = plt.subplots(figsize=(8,6))
                 # 主成分得点の散布図
                 ax.scatter(components[:,0], components[:,1], alpha=0.5)
@@ -145,7 +117,7 @@ if df is not None:
             if enable_ai_interpretation and gemini_api_key:
                 try:
                     # 寄与率をパーセント表記に変換
-                    variance_explained = (pca.explained_variance_ratio_ * 100).tolist()
+                    variance_explained = (pca_result.explained_variance_ratio * 100).tolist()
                     cumulative_variance = [sum(variance_explained[:i+1]) for i in range(n_components)]
                     
                     pca_results = {
@@ -181,3 +153,4 @@ if df is not None:
 # --- フッター表示 ---
 common.display_copyright()
 common.display_special_thanks()
+common.display_startup_report()
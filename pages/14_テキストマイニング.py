@@ -1,23 +1,103 @@
+import colorsys
+import hashlib
 import os
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
-import japanize_matplotlib
-import matplotlib.pyplot as plt
-import networkx as nx
-import nlplot
 import numpy as np
 import pandas as pd
-import plotly.express as px
 import streamlit as st
 from PIL import Image
-from janome.tokenizer import Tokenizer
-from wordcloud import WordCloud
 
 import common
+from easystat import engine
+from easystat.lazy import lazy_import
+
+# 重いライブラリは使う時点で読み込む
+plt = lazy_import('matplotlib.pyplot', requires=('japanize_matplotlib',))
+go = lazy_import('plotly.graph_objects')
+px = lazy_import('plotly.express')
+wordcloud = lazy_import('wordcloud')
 
 
 common.set_font()
 
+
+def community_colors(n):
+    """コミュニティごとの色（HLS 色空間で色相を等間隔に分割）"""
+    hues = (np.linspace(0, 1, n + 1)[:-1] + 0.01) % 1
+    return ['rgb({},{},{})'.format(*[x * 256 for x in colorsys.hls_to_rgb(h, 0.6, 0.65)]) for h in hues]
+
+
+def render_wordclouds(jobs, cache):
+    """ワードクラウドの画像（配列）をまとめて作る
+
+    jobs は 名前 → (度数, 幅, 高さ, 最大単語数)。度数のハッシュ・大きさ・最大単語数が
+    同じ画像はキャッシュを使い、残りはスレッドで並行に描画する。
+    """
+    keys = {}
+    for name, (frequencies, width, height, max_words) in jobs.items():
+        digest = hashlib.blake2b(
+            '\n'.join(f'{word}\t{count}' for word, count in frequencies.items()).encode('utf-8'),
+            digest_size=16,
+        ).digest()
+        keys[name] = (digest, width, height, max_words, font_path)
+    images = {name: cache.get(key) for name, key in keys.items()}
+    missing = [name for name, image in images.items() if image is None]
+    WordCloud = wordcloud.WordCloud
+
+    def draw(name):
+        frequencies, width, height, max_words = jobs[name]
+        return WordCloud(
+            width=width, height=height, max_words=max_words,
+            background_color='white', font_path=font_path,
+        ).generate_from_frequencies(frequencies).to_array()
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(len(missing), os.cpu_count() or 1)) as pool:
+            for name, image in zip(missing, pool.map(draw, missing)):
+                images[name] = image
+                cache.put(keys[name], image)
+    return images
+
+
+def show_wordcloud(image):
+    fig, ax = plt.subplots()
+    ax.imshow(image, interpolation='bilinear')
+    ax.axis('off')
+    st.pyplot(fig)
+
+
+def network_figure(network, title, sizing, width, height):
+    """共起ネットワークの Plotly 図（ノードの大きさは次数、色はコミュニティ）
+
+    配置は力学モデルで求め、同じ構造のグラフはセッション内で再計算しない。
+    """
+    xy = network.layout(cache=common.get_layout_cache())
+    edge_x, edge_y = [], []
+    for i, j in network.edge_index:
+        edge_x += [xy[i, 0], xy[j, 0], None]
+        edge_y += [xy[i, 1], xy[j, 1], None]
+    degree = network.nodes['次数'].to_numpy(dtype=float)
+    span = degree.max() - degree.min()
+    sizes = (degree - degree.min()) / span * sizing if span > 0 else np.zeros(len(degree))
+    colors = community_colors(network.nodes['コミュニティ'].nunique())
+    fig = go.Figure([
+        go.Scatter(x=edge_x, y=edge_y, mode='lines', line=dict(width=1.2, color='#ece8e8'),
+                   hoverinfo='skip'),
+        go.Scatter(x=xy[:, 0], y=xy[:, 1], mode='markers+text', textposition='bottom center',
+                   text=network.nodes['単語'], hoverinfo='text',
+                   marker=dict(size=sizes, color=[colors[c] for c in network.nodes['コミュニティ']],
+                               line=dict(width=0.5, color='#ece8e8'))),
+    ])
+    axis = dict(showline=False, zeroline=False, showgrid=False, showticklabels=False, title='')
+    fig.update_layout(
+        title=title, font=dict(family='Arial', size=12), width=width, height=height,
+        showlegend=False, xaxis=axis, yaxis=axis, margin=dict(l=40, r=40, b=85, t=100, pad=0),
+        hovermode='closest', plot_bgcolor='#ffffff',
+    )
+    return fig
+
+
 # ワードクラウド用のフォントパス設定
 # システムフォントを探す
 font_candidates = [
@@ -69,28 +149,20 @@ except FileNotFoundError:
     pass
 
 # ファイルアップロードとデモデータ選択
-uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=["csv", "xlsx"])
+uploaded_file = st.file_uploader("CSVまたはExcelファイルを選択してください", type=common.SUPPORTED_FILE_TYPES)
 use_demo_data = st.checkbox('デモデータを使用')
 
 df = None
 if use_demo_data:
-    try:
-        df = pd.read_excel('datasets/textmining_demo.xlsx', sheet_name=0)
+    df = common.load_demo_data('datasets/textmining_demo.xlsx')
+    if df is not None:
         st.write("デモデータ:")
         st.write(df.head())
-    except FileNotFoundError:
-        st.error("デモデータファイル 'textmining_demo.xlsx' が見つかりません。")
 else:
-    if uploaded_file is not None:
-        try:
-            if uploaded_file.type == 'text/csv':
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
-            st.write("アップロードデータ:")
-            st.write(df.head())
-        except Exception as e:
-            st.error(f"ファイル読み込みエラー: {e}")
+    df = common.load_data(uploaded_file)
+    if df is not None:
+        st.write("アップロードデータ:")
+        st.write(df.head())
 
 # データフレームが有効な場合のみ解析開始
 if df is not None and not df.empty:
@@ -110,22 +182,18 @@ if df is not None and not df.empty:
         default_index = len(text_cols) - 1 if text_cols else 0
         selected_text = st.selectbox('記述変数を選択してください', text_cols, index=default_index)
 
-        st.subheader('全体の分析')
-        tokenizer = Tokenizer()
-
-        def extract_words(text):
-            if pd.isnull(text):
-                return ""
-            tokens = tokenizer.tokenize(text)
-            return ' '.join(
-                token.base_form
-                for token in tokens
-                if token.part_of_speech.split(',')[0] in ["名詞", "動詞", "形容詞", "副詞"]
-            )
+        # MeCab（unidic-lite）が使える環境では形態素解析器を選べるようにする
+        backend = 'janome'
+        if engine.mecab_available():
+            backends = {'Janome': 'janome', 'MeCab（unidic-lite）': 'mecab'}
+            backend = backends[st.selectbox('形態素解析器', list(backends))]
 
-        df['tokenized_text'] = df[selected_text].apply(extract_words)
-        total_tokens = df['tokenized_text'].str.split().apply(len).sum()
-        st.write(f"トークン化後の総単語数: {total_tokens}")
+        st.subheader('全体の分析')
+        # 形態素解析の結果はセッション内で保持し、解析済みの文書は再解析しない
+        token_store = common.get_token_store()
+        result = engine.text_mining(df, selected_text, store=token_store, backend=backend)
+        df['tokenized_text'] = result.tokenized
+        st.write(f"トークン化後の総単語数: {result.total_tokens}")
 
         # 共起が発生しない場合のテスト行追加
         if not df['tokenized_text'].str.strip().any():
@@ -136,62 +204,41 @@ if df is not None and not df.empty:
                     selected_text: ["テスト テスト テキスト テキスト"]
                 })
             ], ignore_index=True)
-            df['tokenized_text'] = df[selected_text].apply(extract_words)
+            result = engine.text_mining(df, selected_text, store=token_store, backend=backend)
+            df['tokenized_text'] = result.tokenized
 
-        # NLPlot 初期化
-        npt = nlplot.NLPlot(df, target_col='tokenized_text')
-        stopwords_list = npt.get_stopword()
-        words = ' '.join(df['tokenized_text'])
+        # 度数・共起は文書-単語行列から求める（上位10語と度数5以下の語は共起から除く）
+        matrix = result.matrix
+        stopwords_list = matrix.stopwords()
 
         # ワードクラウド
         st.subheader('【ワードクラウド】')
         max_words = st.slider(
-            '最大単語数', 10, max(len(set(words.split())), 10), 50
+            '最大単語数', 10, max(len(result.frequencies), 10), 50
         )
-        if words:
-            wc = WordCloud(
-                width=800, height=400, max_words=max_words,
-                background_color='white', font_path=font_path,
-                collocations=False, stopwords=set(stopwords_list)
-            ).generate(words)
-            fig_wc, ax_wc = plt.subplots()
-            ax_wc.imshow(wc, interpolation='bilinear')
-            ax_wc.axis('off')
-            st.pyplot(fig_wc)
+        # ワードクラウドは全体とカテゴリ別をまとめて描画する（度数は文書-単語行列から）
+        category_frequencies = matrix.group_frequencies(df[selected_category])
+        jobs = {None: (engine.wordcloud_frequencies(result.frequencies, stopwords_list), 800, 400, max_words)}
+        for cat, table in category_frequencies.items():
+            jobs[cat] = (engine.wordcloud_frequencies(table, stopwords_list), 600, 300, 50)
+        images = render_wordclouds(
+            {name: job for name, job in jobs.items() if job[0]}, common.get_wordcloud_cache())
+        if None in images:
+            show_wordcloud(images[None])
 
         # 全体の共起ネットワーク
         st.subheader('【共起ネットワーク（全体）】')
-        npt.build_graph(stopwords=stopwords_list, min_edge_frequency=1)
-        fig_net = npt.co_network(
-            title='全体の共起ネットワーク', sizing=100,
-            node_size='adjacency_frequency', color_palette='hls',
-            width=1000, height=600, save=False
-        )
-        if fig_net is not None:
-            st.plotly_chart(fig_net, use_container_width=True)
+        # 描画する辺は共起度数の上位に絞る（KH Coder の既定と同じ60）
+        max_edges = st.slider('描画する共起の数（上位）', 10, 300, 60)
+        network = matrix.cooccurrence(stopwords_list, min_edge_frequency=1, max_edges=max_edges)
+        if len(network):
+            st.plotly_chart(network_figure(network, '全体の共起ネットワーク', sizing=100, width=1000, height=600),
+                            use_container_width=True)
         else:
-            # フォールバック: KH Coder デフォルト Top 60
-            edges = sorted(
-                npt.graph.edges(data=True),
-                key=lambda x: x[2].get('weight',1), reverse=True
-            )[:60]
-            subG = nx.Graph()
-            subG.add_nodes_from(npt.graph.nodes(data=True))
-            subG.add_edges_from([(u,v) for u,v,_ in edges])
-            pos = nx.kamada_kawai_layout(subG)
-            fig_nx, ax_nx = plt.subplots(figsize=(8,6))
-            nx.draw(subG, pos, with_labels=True,
-                    font_family='IPAexGothic', node_size=300,
-                    edge_color='gray')
-            ax_nx.set_title('全体の共起ネットワーク (Top60)')
-            ax_nx.axis('off')
-            st.pyplot(fig_nx)
+            st.info('共起ネットワークを描画できる単語の組がありません。')
 
         # 単語度数バー
-        freq = Counter(words.split())
-        df_freq = pd.DataFrame(
-            freq.items(), columns=['単語','度数']
-        ).sort_values(by='度数', ascending=False)
+        df_freq = result.frequencies
         if not df_freq.empty:
             fig_bar = px.bar(
                 df_freq.head(20), x='単語', y='度数',
@@ -205,7 +252,7 @@ if df is not None and not df.empty:
                 # top_wordsをリスト形式で取得
                 top_words = [(row["単語"], row["度数"]) for _, row in df_freq.head(30).iterrows()]
                 n_documents = len(df)
-                n_unique_words = len(freq)
+                n_unique_words = len(df_freq)
                 
                 text_results = {
                     'top_words': top_words,
@@ -224,49 +271,23 @@ if df is not None and not df.empty:
                 st.warning(f"AI解釈の生成中にエラーが発生しました: {str(e)}")
 
         # カテゴリ별分析と描画
-        for cat, grp in df.groupby(selected_category):
+        # カテゴリごとの文書は全体の解析結果から切り出す（再解析しない）
+        for cat, rows in df.groupby(selected_category).indices.items():
             st.subheader(f'＜カテゴリ：{cat}＞')
-            grp['tokenized_text'] = grp[selected_text].apply(extract_words)
-            words_cat = ' '.join(grp['tokenized_text'])
 
             # カテゴリ별ワードクラウド
-            if words_cat:
-                wc_cat = WordCloud(
-                    width=600, height=300, max_words=50,
-                    background_color='white', font_path=font_path,
-                    collocations=False, stopwords=set(stopwords_list)
-                ).generate(words_cat)
-                fig_c, ax_c = plt.subplots()
-                ax_c.imshow(wc_cat, interpolation='bilinear')
-                ax_c.axis('off')
-                st.pyplot(fig_c)
+            if cat in images:
+                show_wordcloud(images[cat])
 
             # カテゴリ별共起ネットワーク
-            npt_cat = nlplot.NLPlot(grp, target_col='tokenized_text')
-            npt_cat.build_graph(stopwords=stopwords_list, min_edge_frequency=1)
-            fig_cat = npt_cat.co_network(
-                title=f'{cat}の共起ネットワーク', sizing=80,
-                node_size='adjacency_frequency', color_palette='hls',
-                width=800, height=500, save=False
-            )
-            if fig_cat is not None:
-                st.plotly_chart(fig_cat, use_container_width=True)
+            network_cat = matrix.take(rows).cooccurrence(stopwords_list, min_edge_frequency=1, max_edges=max_edges)
+            if len(network_cat):
+                st.plotly_chart(network_figure(network_cat, f'{cat}の共起ネットワーク', sizing=80, width=800, height=500),
+                                use_container_width=True)
             else:
-                edges_cat = sorted(
-                    npt_cat.graph.edges(data=True),
-                    key=lambda x: x[2].get('weight',1), reverse=True
-                )[:60]
-                subG_cat = nx.Graph()
-                subG_cat.add_nodes_from(npt_cat.graph.nodes(data=True))
-                subG_cat.add_edges_from([(u,v) for u,v,_ in edges_cat])
-                pos_cat = nx.kamada_kawai_layout(subG_cat)
-                fig_nx2, ax_nx2 = plt.subplots(figsize=(6,5))
-                nx.draw(subG_cat, pos_cat, with_labels=True,
-                        font_family='IPAexGothic', node_size=300)
-                ax_nx2.set_title(f'{cat}の共起ネットワーク (Top60)')
-                ax_nx2.axis('off')
-                st.pyplot(fig_nx2)
+                st.info('共起ネットワークを描画できる単語の組がありません。')
 
 # フッター
 common.display_copyright()
 common.display_special_thanks()
+common.display_startup_report()
@@ -0,0 +1,121 @@
+"""ブートストラップ信頼区間と scipy.stats.bootstrap の比較"""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from easystat import engine
+from easystat.engine.bootstrap import bca_interval, percentile_interval
+
+
+def _d_one_sample(x, axis=-1):
+    return x.mean(axis=axis) / x.std(axis=axis, ddof=1)
+
+
+def _d_two_sample(x, y, axis=-1):
+    pooled = (x.var(axis=axis, ddof=1) * (x.shape[axis] - 1) + y.var(axis=axis, ddof=1) * (y.shape[axis] - 1))
+    return (x.mean(axis=axis) - y.mean(axis=axis)) / np.sqrt(pooled / (x.shape[axis] + y.shape[axis] - 2))
+
+
+@pytest.fixture
+def paired():
+    rng = np.random.default_rng(1)
+    pre = rng.normal(10, 2, 25)
+    return pd.DataFrame({'pre': pre, 'post': pre - 0.8 + rng.normal(0, 1.5, 25)})
+
+
+@pytest.fixture
+def two_groups():
+    rng = np.random.default_rng(2)
+    return pd.DataFrame({
+        'group': ['A'] * 20 + ['B'] * 24,
+        'y': np.r_[rng.normal(1.0, 1, 20), rng.normal(0.0, 1.5, 24)],
+    })
+
+
+@pytest.mark.parametrize('method', ['BCa', 'percentile'])
+def test_interval_formulas_match_scipy(paired, method):
+    # 同じリサンプルの分布とジャックナイフ値から、scipy と同じ区間になる
+    diff = (paired['pre'] - paired['post']).to_numpy()
+    res = stats.bootstrap((diff,), _d_one_sample, n_resamples=999, method=method, random_state=0)
+    boot = res.bootstrap_distribution[:, None]
+    estimate = np.array([_d_one_sample(diff)])
+    if method == 'BCa':
+        jackknife = np.array([_d_one_sample(np.delete(diff, i)) for i in range(len(diff))])[:, None]
+        lower, upper = bca_interval(boot, estimate, jackknife)
+    else:
+        lower, upper = percentile_interval(boot)
+    np.testing.assert_allclose([lower[0], upper[0]], list(res.confidence_interval), rtol=1e-10)
+
+
+@pytest.mark.parametrize('method', ['bca', 'percentile'])
+def test_d_rel_matches_scipy(paired, method):
+    table = engine.bootstrap_d_rel(paired, ['pre'], ['post'], n_boot=5000, method=method, seed=0)
+    diff = (paired['pre'] - paired['post']).to_numpy()
+    res = stats.bootstrap((diff,), _d_one_sample, n_resamples=5000,
+                          method='BCa' if method == 'bca' else 'percentile', random_state=0)
+    row = table.iloc[0]
+    assert row['推定値'] == pytest.approx(_d_one_sample(diff))
+    assert row['SE'] == pytest.approx(res.standard_error, rel=0.1)
+    assert row['95%CI下限'] == pytest.approx(res.confidence_interval.low, abs=0.08)
+    assert row['95%CI上限'] == pytest.approx(res.confidence_interval.high, abs=0.08)
+
+
+def test_d_ind_matches_scipy(two_groups):
+    table = engine.bootstrap_d_ind(two_groups, 'group', ['y'], ['A', 'B'], n_boot=5000,
+                                   method='percentile', seed=0)
+    x = two_groups.loc[two_groups['group'] == 'A', 'y'].to_numpy()
+    y = two_groups.loc[two_groups['group'] == 'B', 'y'].to_numpy()
+    res = stats.bootstrap((x, y), _d_two_sample, n_resamples=5000, method='percentile', random_state=0)
+    row = table.iloc[0]
+    assert row['推定値'] == pytest.approx(_d_two_sample(x, y))
+    assert row['95%CI下限'] == pytest.approx(res.confidence_interval.low, abs=0.08)
+    assert row['95%CI上限'] == pytest.approx(res.confidence_interval.high, abs=0.08)
+
+
+def test_sign_is_folded_consistently(two_groups):
+    # 群の順序を入れ替えても、推定値と区間は同じ（推定値は正の向きにそろう）
+    forward = engine.bootstrap_d_ind(two_groups, 'group', ['y'], ['A', 'B'], n_boot=1000, seed=0)
+    backward = engine.bootstrap_d_ind(two_groups, 'group', ['y'], ['B', 'A'], n_boot=1000, seed=0)
+    assert forward.iloc[0, 0] > 0
+    np.testing.assert_allclose(backward.iloc[0, [0, 2, 3]], forward.iloc[0, [0, 2, 3]], atol=0.05)
+
+
+@pytest.mark.parametrize('method', ['bca', 'percentile'])
+def test_null_effect_intervals_contain_zero(method):
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({'group': ['A'] * 30 + ['B'] * 30, 'y': rng.normal(size=60)})
+    row = engine.bootstrap_d_ind(df, 'group', ['y'], ['A', 'B'], method=method, seed=0).iloc[0]
+    assert row['95%CI下限'] < 0 < row['95%CI上限']
+    assert row['95%CI下限'] <= row['推定値'] <= row['95%CI上限']
+
+    wide = pd.DataFrame({'pre': rng.normal(size=30), 'post': rng.normal(size=30)})
+    row = engine.bootstrap_d_rel(wide, ['pre'], ['post'], method=method, seed=0).iloc[0]
+    assert row['95%CI下限'] < 0 < row['95%CI上限']
+
+
+def test_eta_squared_interval_contains_estimate():
+    for seed in range(20):
+        rng = np.random.default_rng(seed)
+        df = pd.DataFrame({'group': np.repeat(['a', 'b', 'c'], 15), 'y': rng.normal(size=45)})
+        row = engine.bootstrap_eta_squared(df, 'group', ['y'], seed=0).iloc[0]
+        assert row['95%CI下限'] <= row['推定値'] <= row['95%CI上限']
+
+
+def test_bca_falls_back_to_percentile_for_extreme_bias():
+    # 全てのリサンプルが推定値より大きい場合（z0 = -∞）
+    boot = np.linspace(1.0, 2.0, 1000)[:, None]
+    lower, upper = bca_interval(boot, np.array([0.5]), np.linspace(0.4, 0.6, 20)[:, None])
+    expected = percentile_interval(boot)
+    np.testing.assert_allclose([lower[0], upper[0]], [expected[0][0], expected[1][0]])
+
+
+def test_reproducible_across_chunks(paired, monkeypatch):
+    # チャンクごとの乱数は seed から派生するため、同じ seed なら同じ結果になる
+    first = engine.bootstrap_d_rel(paired, ['pre'], ['post'], n_boot=2000, seed=3)
+    second = engine.bootstrap_d_rel(paired, ['pre'], ['post'], n_boot=2000, seed=3)
+    pd.testing.assert_frame_equal(first, second)
+    monkeypatch.setattr('easystat.engine.bootstrap._CHUNK_ELEMENTS', 25 * 100)
+    chunked = engine.bootstrap_d_rel(paired, ['pre'], ['post'], n_boot=2000, seed=3)
+    assert chunked.iloc[0, 0] == first.iloc[0, 0]
+    assert chunked.iloc[0, 1] == pytest.approx(first.iloc[0, 1], rel=0.1)
@@ -0,0 +1,33 @@
+"""多重比較の分布関数と scipy.stats.studentized_range の比較"""
+import numpy as np
+import pytest
+from scipy import stats
+
+from easystat.engine import studentized_range_isf, studentized_range_sf
+
+
+@pytest.mark.parametrize('k', [2, 3, 5, 10, 20])
+@pytest.mark.parametrize('df', [2, 5, 10, 30, 120])
+def test_sf_matches_scipy(k, df):
+    q = np.array([1.0, 3.0, 5.0, 8.0])
+    expected = stats.studentized_range.sf(q, k, df)
+    np.testing.assert_allclose(studentized_range_sf(q, k, df), expected, rtol=1e-4)
+
+
+@pytest.mark.parametrize('k, df', [(2, 5), (3, 10), (5, 20), (10, 60)])
+@pytest.mark.parametrize('p', [0.1, 0.05, 0.01, 0.001])
+def test_isf_matches_scipy(k, df, p):
+    q = studentized_range_isf(p, k, df)
+    assert stats.studentized_range.sf(q, k, df) == pytest.approx(p, rel=1e-4)
+
+
+def test_tail_accuracy():
+    # 自由度が小さいときの裾（S が 0 付近に広がる場合）
+    assert studentized_range_sf(12.0, 3, 10) == pytest.approx(stats.studentized_range.sf(12.0, 3, 10), rel=1e-4)
+    assert studentized_range_isf(0.001, 3, 10) == pytest.approx(7.41058, abs=1e-4)
+    assert studentized_range_isf(0.001, 2, 5) == pytest.approx(9.71399, abs=1e-4)
+
+
+def test_invalid_arguments_are_nan():
+    sf = studentized_range_sf([np.nan, 3.0, 3.0], [3, 1, 3], [10, 10, 0])
+    assert np.isnan(sf).all()